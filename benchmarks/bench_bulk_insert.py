@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+批量导入基准测试：逐行 register_user / add_goods vs bulk_register_users / bulk_add_goods
+
+逐行接口每行单独取连接、加锁并提交一次；批量接口在一个事务内 executemany 插入，
+只提交一次。输出每种方式的总耗时和每秒插入行数。用法：
+
+    python benchmarks/bench_bulk_insert.py [--rows 2000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.database import Database
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def report(name, rows, elapsed):
+    print(f"{name:<22} | {elapsed * 1000:>10.1f} | {rows / elapsed:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量导入基准测试')
+    parser.add_argument('--rows', type=int, default=2000, help='每种方式导入的行数')
+    args = parser.parse_args()
+    rows = args.rows
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'))
+        seller_id = db.register_user('bench_seller', '123456')['user_id']
+        goods = {'name': '二手教材', 'category': '学习资料', 'price': 25.0,
+                 'description': '九成新，无笔记', 'seller_id': seller_id}
+
+        print(f"每种方式导入 {rows} 行")
+        print(f"{'方式':<20} | {'总耗时 ms':>10} | {'行/秒':>10}")
+        print('-' * 48)
+
+        elapsed = timed(lambda: [db.register_user(f'single_{i}', '123456') for i in range(rows)])
+        report('register_user 逐行', rows, elapsed)
+        result = {}
+        elapsed = timed(lambda: result.update(db.bulk_register_users(
+            [{'username': f'bulk_{i}', 'password': '123456'} for i in range(rows)])))
+        assert result['inserted'] == rows
+        report('bulk_register_users', rows, elapsed)
+
+        elapsed = timed(lambda: [db.add_goods(**goods) for _ in range(rows)])
+        report('add_goods 逐行', rows, elapsed)
+        elapsed = timed(lambda: result.update(db.bulk_add_goods([goods] * rows)))
+        assert result['inserted'] == rows
+        report('bulk_add_goods', rows, elapsed)
+
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
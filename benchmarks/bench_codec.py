@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+编解码基准测试：10k 件商品的 get_all_goods 响应
+
+对比旧路径（serialize_data 后为求长度和发送各 encode 一次）、JSON编解码器和
+msgpack编解码器（需安装 msgpack）的编码/解码耗时与字节数。用法：
+
+    python benchmarks/bench_codec.py [--items 10000] [--repeat 20]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.codec import CODECS
+from common.utils import get_current_time, serialize_data, deserialize_data
+from server.database import Database
+
+
+def build_response(items):
+    """用真实的 get_all_goods 查询结果构造响应"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'))
+        db.register_user('bench_seller', '123456')
+        seller_id = db.login_user('bench_seller', '123456')['user_id']
+        conn = db.get_connection()
+        try:
+            now = get_current_time()
+            conn.executemany('''
+                INSERT INTO goods (name, category, price, description, seller_id, publish_time)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(f'二手教材 第{i}册', '学习资料', 10.0 + i % 90, '九成新，无笔记，可小刀', seller_id, now)
+                  for i in range(items)])
+            conn.commit()
+        finally:
+            conn.close()
+        response = {'success': True, 'goods': db.get_all_goods()}
+        db.close()
+    return response
+
+
+def legacy_encode(response):
+    """旧路径：长度和发送各 encode 一次"""
+    response_data = serialize_data(response)
+    len(response_data.encode('utf-8'))
+    return response_data.encode('utf-8')
+
+
+def legacy_decode(data):
+    return deserialize_data(data.decode('utf-8'))
+
+
+def timed(func, arg, repeat):
+    """返回 (中位耗时毫秒, 最后一次的结果)"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(arg)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='编解码基准测试')
+    parser.add_argument('--items', type=int, default=10000, help='商品数量')
+    parser.add_argument('--repeat', type=int, default=20, help='每项测量的重复次数')
+    args = parser.parse_args()
+
+    response = build_response(args.items)
+    candidates = [('旧路径(JSON)', legacy_encode, legacy_decode)]
+    candidates += [(name, codec.encode, codec.decode) for name, codec in CODECS.items()]
+    if 'msgpack' not in CODECS:
+        print('未安装 msgpack，仅对比JSON（pip install msgpack）\n')
+
+    print(f"{len(response['goods'])} 件商品的 get_all_goods 响应")
+    print(f"{'编码':<14} | {'编码 ms':>8} | {'解码 ms':>8} | {'字节数':>10}")
+    print('-' * 50)
+    for name, encode, decode in candidates:
+        encode_ms, payload = timed(encode, response, args.repeat)
+        decode_ms, decoded = timed(decode, payload, args.repeat)
+        assert len(decoded['goods']) == len(response['goods'])
+        print(f"{name:<14} | {encode_ms:>8.2f} | {decode_ms:>8.2f} | {len(payload):>10}")
+
+
+if __name__ == "__main__":
+    main()
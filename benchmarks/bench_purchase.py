@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+购买延迟基准测试：全量扫描查找商品 vs 按主键查找
+
+旧实现每次购买先 get_all_goods() 再线性查找目标商品，耗时随商品总数增长；
+新实现在购买事务内按主键读取卖家和价格，耗时应与商品总数无关。用法：
+
+    python benchmarks/bench_purchase.py [--sizes 1000,10000,50000] [--purchases 50]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.utils import get_current_time
+from server.database import Database
+
+
+def build_catalogue(db, size):
+    """批量生成 size 件在售商品，返回 (买家ID, 商品ID列表)"""
+    db.register_user('bench_seller', '123456')
+    db.register_user('bench_buyer', '123456')
+    seller_id = db.login_user('bench_seller', '123456')['user_id']
+    buyer_id = db.login_user('bench_buyer', '123456')['user_id']
+    db.recharge_balance(buyer_id, 10 ** 9)
+
+    conn = db.get_connection()
+    try:
+        now = get_current_time()
+        conn.executemany('''
+            INSERT INTO goods (name, category, price, description, seller_id, publish_time)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(f'商品{i}', '其他', 1.0, '基准测试', seller_id, now) for i in range(size)])
+        conn.commit()
+        goods_ids = [row[0] for row in conn.execute('SELECT goods_id FROM goods')]
+    finally:
+        conn.close()
+    return buyer_id, goods_ids
+
+
+def purchase_by_scan(db, goods_id, buyer_id):
+    """旧实现：扫描全部在售商品找到目标后再购买"""
+    target = next((g for g in db.get_all_goods() if g['goods_id'] == goods_id), None)
+    if target is None:
+        return {'success': False}
+    return db.purchase_goods(goods_id, buyer_id)
+
+
+def measure(func, db, goods_ids, buyer_id, count):
+    """返回每次购买的延迟中位数（毫秒）"""
+    samples = []
+    for goods_id in random.sample(goods_ids, count):
+        start = time.perf_counter()
+        result = func(db, goods_id, buyer_id)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert result['success'], result
+        goods_ids.remove(goods_id)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='购买延迟基准测试')
+    parser.add_argument('--sizes', default='1000,10000,50000', help='商品总数列表，逗号分隔')
+    parser.add_argument('--purchases', type=int, default=50, help='每组测量的购买次数')
+    args = parser.parse_args()
+
+    print(f"{'商品总数':>8} | {'全量扫描 ms':>12} | {'主键查找 ms':>12}")
+    print('-' * 40)
+    for size in [int(s) for s in args.sizes.split(',')]:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(os.path.join(tmp, 'bench.db'))
+            buyer_id, goods_ids = build_catalogue(db, size)
+            scan_ms = measure(purchase_by_scan, db, goods_ids, buyer_id, args.purchases)
+            direct_ms = measure(Database.purchase_goods, db, goods_ids, buyer_id, args.purchases)
+            db.close()
+        print(f"{size:>8} | {scan_ms:>12.2f} | {direct_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
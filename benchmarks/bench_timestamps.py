@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+时间范围查询基准测试：时间字符串 vs 整数时间戳
+
+生成分布在一年内的订单，统计随机7天窗口内的订单数：
+- substr(create_time, 1, 10) 按日期比较：无法使用索引，每次扫描全表
+- create_time 字符串范围：走字符串索引，逐字节比较
+- create_ts 整数范围：走 idx_orders_create_ts
+另外测量 migrate_timestamps() 分批回填全部订单的耗时。用法：
+
+    python benchmarks/bench_timestamps.py [--rows 200000] [--queries 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.database import Database
+from common.utils import format_timestamp
+
+DAY = 86400
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def report(name, queries, elapsed):
+    print(f"{name:<28} | {elapsed * 1000:>10.1f} | {elapsed * 1000000 / queries:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='时间范围查询基准测试')
+    parser.add_argument('--rows', type=int, default=200000, help='订单行数')
+    parser.add_argument('--queries', type=int, default=200, help='每种方式的查询次数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'))
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        end = int(time.time())
+        start = end - 365 * DAY
+        rows = []
+        for i in range(args.rows):
+            ts = random.randint(start, end)
+            rows.append((f'ORD{i:010d}', 1, 1, 1, 10.0, 'completed', format_timestamp(ts), ts))
+        cursor.executemany('''
+            INSERT INTO orders (order_id, goods_id, buyer_id, seller_id, price, status, create_time, create_ts)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        # 对照组：迁移前的字符串索引
+        cursor.execute('CREATE INDEX IF NOT EXISTS bench_orders_time ON orders(create_time)')
+        conn.commit()
+
+        windows = []
+        for _ in range(args.queries):
+            low = random.randint(start, end - 7 * DAY)
+            windows.append((low, low + 7 * DAY))
+
+        def by_substr():
+            for low, high in windows:
+                cursor.execute('''
+                    SELECT COUNT(*) FROM orders
+                    WHERE substr(create_time, 1, 10) >= ? AND substr(create_time, 1, 10) < ?
+                ''', (format_timestamp(low)[:10], format_timestamp(high)[:10]))
+                cursor.fetchone()
+
+        def by_text():
+            for low, high in windows:
+                cursor.execute('''
+                    SELECT COUNT(*) FROM orders WHERE create_time >= ? AND create_time < ?
+                ''', (format_timestamp(low), format_timestamp(high)))
+                cursor.fetchone()
+
+        def by_ts():
+            for low, high in windows:
+                cursor.execute('''
+                    SELECT COUNT(*) FROM orders WHERE create_ts >= ? AND create_ts < ?
+                ''', (low, high))
+                cursor.fetchone()
+
+        print(f"{args.rows} 行订单，{args.queries} 次随机7天范围查询")
+        print(f"{'方式':<26} | {'总耗时 ms':>10} | {'每次 us':>12}")
+        print('-' * 58)
+        report('substr(create_time) 日期', args.queries, timed(by_substr))
+        report('create_time 字符串索引', args.queries, timed(by_text))
+        report('create_ts 整数索引', args.queries, timed(by_ts))
+
+        # 模拟旧数据库：清空时间戳后在线回填
+        cursor.execute("DELETE FROM schema_migrations WHERE name = 'integer_timestamps'")
+        cursor.execute('UPDATE orders SET create_ts = NULL')
+        conn.commit()
+        conn.close()
+        db._timestamps_ready = False
+        result = {}
+        elapsed = timed(lambda: result.update(db.migrate_timestamps(pause=0)))
+        assert result['success'], result['message']
+        print(f"\nmigrate_timestamps 回填 {result['updated']} 行: {elapsed * 1000:.1f} ms")
+
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
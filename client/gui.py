@@ -1,23 +1,36 @@
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
-from tkinter import messagebox, END, VERTICAL, HORIZONTAL
+from tkinter import messagebox, END, VERTICAL
 from client.network_client import NetworkClient
-from common.config import ADMIN_ROLE
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib
+from client.ui_tasks import TaskRunner
+from client.virtual_table import VirtualTable
+from common.config import ADMIN_ROLE, EVENT_POLL_INTERVAL_MS
+from common.protocol import (EVENT_BALANCE_CHANGED, EVENT_GOODS_ADDED, EVENT_GOODS_SOLD,
+                             EVENT_GOODS_REMOVED, EVENT_FORCE_LOGOUT)
+import platform
+from datetime import date, timedelta
 
 
-# 设置matplotlib中文字体
-import platform
-system = platform.system()
-if system == 'Windows':
-    matplotlib.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'Arial Unicode MS']
-elif system == 'Darwin':  # macOS
-    matplotlib.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'Heiti TC']
-else:  # Linux
-    matplotlib.rcParams['font.sans-serif'] = ['DejaVu Sans', 'Liberation Sans']
-matplotlib.rcParams['axes.unicode_minus'] = False
+def load_charts():
+    """按需导入 matplotlib - 只有统计看板用到图表，启动时导入会拖慢登录窗口的出现
+    
+    不导入 pyplot（会加载全部绘图接口并选择后端），直接使用 Figure 和 Tk 画布。
+    重复调用只是取模块缓存。
+    """
+    import matplotlib
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    
+    # 设置matplotlib中文字体
+    system = platform.system()
+    if system == 'Windows':
+        matplotlib.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'Arial Unicode MS']
+    elif system == 'Darwin':  # macOS
+        matplotlib.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'Heiti TC']
+    else:  # Linux
+        matplotlib.rcParams['font.sans-serif'] = ['DejaVu Sans', 'Liberation Sans']
+    matplotlib.rcParams['axes.unicode_minus'] = False
+    return Figure, FigureCanvasTkAgg, matplotlib.colormaps
 
 class SecondHandSystemGUI:
     def __init__(self):
@@ -27,6 +40,8 @@ class SecondHandSystemGUI:
         self.center_window(self.root)
         
         self.network_client = NetworkClient()
+        # 网络请求都在后台线程执行，结果交回主线程更新界面
+        self.tasks = TaskRunner(self.root)
         self.current_user = None
         
         self.login_window()
@@ -75,8 +90,9 @@ class SecondHandSystemGUI:
         btn_frame = tb.Frame(login_frame)
         btn_frame.pack(fill=X, pady=10)
         
-        tb.Button(btn_frame, text="登录", bootstyle="primary", 
-                 command=self.login, width=12).pack(side=LEFT, padx=(0, 10))
+        self.login_button = tb.Button(btn_frame, text="登录", bootstyle="primary",
+                                      command=self.login, width=12)
+        self.login_button.pack(side=LEFT, padx=(0, 10))
         tb.Button(btn_frame, text="注册新账号", bootstyle="success-outline", 
                  command=self.register_window, width=12).pack(side=LEFT)
         
@@ -130,19 +146,25 @@ class SecondHandSystemGUI:
                 messagebox.showerror("错误", "两次输入的密码不一致")
                 return
             
-            if not self.network_client.connected and not self.network_client.connect():
-                messagebox.showerror("错误", "无法连接到服务器\n请确保服务器已启动")
-                return
-                
-            res = self.network_client.register(username, password, contact)
-            if res['success']:
-                messagebox.showinfo("成功", "注册成功！请登录")
-                reg_win.destroy()
-            else:
-                messagebox.showerror("错误", res['message'])
+            def do_register():
+                if not self.ensure_connected():
+                    return None
+                return self.network_client.register(username, password, contact)
+            
+            def on_registered(res):
+                if res is None:
+                    messagebox.showerror("错误", "无法连接到服务器\n请确保服务器已启动")
+                elif res['success']:
+                    messagebox.showinfo("成功", "注册成功！请登录")
+                    reg_win.destroy()
+                else:
+                    messagebox.showerror("错误", res['message'])
+            
+            self.tasks.submit(do_register, on_done=on_registered, owner=reg_win, busy=[register_btn])
         
-        tb.Button(form_frame, text="立即注册", bootstyle="success", 
-                 command=submit_register).pack(fill=X, pady=30)
+        register_btn = tb.Button(form_frame, text="立即注册", bootstyle="success",
+                                 command=submit_register)
+        register_btn.pack(fill=X, pady=30)
 
     def login(self):
         """登录处理"""
@@ -153,16 +175,26 @@ class SecondHandSystemGUI:
             messagebox.showwarning("提示", "请输入完整的登录信息")
             return
         
-        if not self.network_client.connected and not self.network_client.connect():
+        def do_login():
+            if not self.ensure_connected():
+                return None
+            return self.network_client.login(username, password)
+        
+        self.tasks.submit(do_login, on_done=lambda result: self.on_login(username, result),
+                          owner=self.login_button, key='login', busy=[self.login_button])
+    
+    def on_login(self, username, result):
+        """登录结果（主线程）"""
+        if result is None:
             messagebox.showerror("连接失败", "无法连接到服务器\n请检查服务器是否已启动")
             return
         
-        result = self.network_client.login(username, password)
         if result['success']:
             self.current_user = result['user']
             messagebox.showinfo("欢迎", f"欢迎回来，{username}！")
             if self.check_force_logout(result):
                 return
+            self.start_event_processing()
             if self.current_user['role'] == ADMIN_ROLE:
                 self.admin_main_window()
             else:
@@ -220,7 +252,7 @@ class SecondHandSystemGUI:
             ("发布商品", "success", self.add_goods_window),
             ("我的商品", "info", self.my_goods_window),
             ("我的订单", "warning", self.my_orders_window),
-            ("刷新列表", "secondary", self.refresh_goods_list),
+            ("刷新列表", "secondary", self.show_all_goods),
         ]
         
         for text, style, cmd in menu_items:
@@ -235,50 +267,36 @@ class SecondHandSystemGUI:
         toolbar = tb.Frame(right_content, padding=(0, 0, 0, 10))
         toolbar.pack(fill=X)
         
-        tb.Label(toolbar, text="🛒 商品市场", 
+        tb.Label(toolbar, text="🛒 商品市场",
                 font=("微软雅黑", 14, "bold")).pack(side=LEFT)
+        self.goods_status = tb.Label(toolbar, text="", bootstyle="secondary")
+        self.goods_status.pack(side=LEFT, padx=10)
         
-        tb.Button(toolbar, text="🔍 搜索", bootstyle="info-outline", 
+        tb.Button(toolbar, text="🔍 搜索", bootstyle="info-outline",
                  command=self.search_goods_window).pack(side=RIGHT, padx=5)
-        tb.Button(toolbar, text="💳 购买选中", bootstyle="warning", 
-                 command=self.buy_goods).pack(side=RIGHT)
-        
-        # 商品表格
-        table_frame = tb.Frame(right_content)
-        table_frame.pack(fill=BOTH, expand=True)
-        
-        cols = ("ID", "名称", "类别", "价格", "卖家", "发布时间")
-        self.goods_tree = tb.Treeview(table_frame, columns=cols, 
-                                      show="headings", bootstyle="info")
-        
-        # 隐藏ID列但保留数据
-        self.goods_tree.column("ID", width=0, stretch=False)
-        self.goods_tree.heading("ID", text="")
-        
-        widths = {"名称": 200, "类别": 100, "价格": 100, "卖家": 120, "发布时间": 150}
-        for col in cols[1:]:
-            self.goods_tree.heading(col, text=col)
-            self.goods_tree.column(col, width=widths.get(col, 100))
-        
-        scrollbar_y = tb.Scrollbar(table_frame, orient=VERTICAL, 
-                                   command=self.goods_tree.yview)
-        scrollbar_x = tb.Scrollbar(table_frame, orient=HORIZONTAL, 
-                                   command=self.goods_tree.xview)
-        self.goods_tree.configure(yscrollcommand=scrollbar_y.set, 
-                                 xscrollcommand=scrollbar_x.set)
-        
-        self.goods_tree.grid(row=0, column=0, sticky="nsew")
-        scrollbar_y.grid(row=0, column=1, sticky="ns")
-        scrollbar_x.grid(row=1, column=0, sticky="ew")
-        
-        table_frame.grid_rowconfigure(0, weight=1)
-        table_frame.grid_columnconfigure(0, weight=1)
+        self.buy_button = tb.Button(toolbar, text="💳 购买选中", bootstyle="warning",
+                                    command=self.buy_goods)
+        self.buy_button.pack(side=RIGHT)
+        
+        # 商品表格（虚拟化：只渲染可见行，滚动到末尾附近时加载下一页）
+        self.goods_table = VirtualTable(
+            right_content,
+            columns=[("名称", "name", 200), ("类别", "category", 100), ("价格", "price", 100),
+                     ("卖家", "seller_name", 120), ("发布时间", "publish_time", 150)],
+            format_row=self._goods_row_values, key=lambda goods: goods['goods_id'],
+            on_need_more=self.load_more_goods, bootstyle="info", horizontal=True)
+        self.goods_table.pack(fill=BOTH, expand=True)
+        
+        # 分页状态：搜索关键词、筛选条件、下一页游标、增量同步版本号
+        self.goods_keyword = None
+        self.goods_filters = {}
+        self.goods_cursor = None
+        self.goods_has_more = False
+        self.goods_loading = False
+        self.goods_version = None
         
         self.refresh_balance()
         self.refresh_goods_list()
-        
-        # 启动定期刷新余额的定时器
-        self.schedule_balance_refresh()
 
     # =================== 用户功能窗口 ===================
     
@@ -349,23 +367,22 @@ class SecondHandSystemGUI:
                 messagebox.showerror("错误", "价格必须是大于0的数字")
                 return
             
-            result = self.network_client.add_goods(
-                name, category, price, description, 
-                self.current_user['user_id']
-            )
+            def on_added(result):
+                if result['success']:
+                    messagebox.showinfo("成功", "商品发布成功！")
+                    win.destroy()
+                    self.sync_goods_changes()
+                else:
+                    messagebox.showerror("失败", result.get('message', '发布失败'))
             
-            if result['success']:
-                messagebox.showinfo("成功", "商品发布成功！")
-                win.destroy()
-                self.refresh_goods_list()
-            else:
-                messagebox.showerror("失败", result.get('message', '发布失败'))
+            self.tasks.submit(self.network_client.add_goods, name, category, price, description,
+                              self.current_user['user_id'], on_done=on_added, owner=win, busy=[submit_btn])
         
         btn_frame = tb.Frame(layout)
         btn_frame.pack(fill=X)
         
-        tb.Button(btn_frame, text="确认发布", bootstyle="success", 
-                 command=submit).pack(side=LEFT, fill=X, expand=True, padx=(0, 5))
+        submit_btn = tb.Button(btn_frame, text="确认发布", bootstyle="success", command=submit)
+        submit_btn.pack(side=LEFT, fill=X, expand=True, padx=(0, 5))
         tb.Button(btn_frame, text="取消", bootstyle="secondary", 
                  command=win.destroy).pack(side=RIGHT, fill=X, expand=True, padx=(5, 0))
 
@@ -406,18 +423,24 @@ class SecondHandSystemGUI:
         scrollbar.pack(side=RIGHT, fill=Y)
         
         # 加载数据
-        result = self.network_client.get_user_goods(self.current_user['user_id'])
-        if result['success']:
-            status_map = {"available": "在售", "sold": "已售", "removed": "已下架"}
-            for goods in result['goods']:
-                tree.insert("", "end", values=(
-                    goods['goods_id'],
-                    goods['name'],
-                    goods['category'],
-                    f"¥{goods['price']:.2f}",
-                    status_map.get(goods['status'], goods['status']),
-                    goods['publish_time']
-                ))
+        loading = self.show_loading(table_frame)
+        
+        def show_goods(result):
+            loading.destroy()
+            if result['success']:
+                status_map = {"available": "在售", "sold": "已售", "removed": "已下架"}
+                for goods in result['goods']:
+                    tree.insert("", "end", values=(
+                        goods['goods_id'],
+                        goods['name'],
+                        goods['category'],
+                        f"¥{goods['price']:.2f}",
+                        status_map.get(goods['status'], goods['status']),
+                        goods['publish_time']
+                    ))
+        
+        self.tasks.submit(self.network_client.get_user_goods, self.current_user['user_id'],
+                          on_done=show_goods, owner=win)
         
         # 操作按钮
         btn_frame = tb.Frame(win, padding=10)
@@ -438,17 +461,21 @@ class SecondHandSystemGUI:
                 messagebox.showinfo("提示", "只能下架在售商品")
                 return
             
-            if messagebox.askyesno("确认", f"确定要下架商品「{goods_name}」吗？"):
-                result = self.network_client.remove_goods(goods_id)
+            def on_removed(result):
                 if result['success']:
                     messagebox.showinfo("成功", "商品已下架")
                     win.destroy()
+                    self.sync_goods_changes()
                     self.my_goods_window()
                 else:
                     messagebox.showerror("失败", result.get('message', '下架失败'))
+            
+            if messagebox.askyesno("确认", f"确定要下架商品「{goods_name}」吗？"):
+                self.tasks.submit(self.network_client.remove_goods, goods_id,
+                                  on_done=on_removed, owner=win, busy=[remove_btn])
         
-        tb.Button(btn_frame, text="下架选中", bootstyle="danger", 
-                 command=remove_selected).pack(side=LEFT, padx=5)
+        remove_btn = tb.Button(btn_frame, text="下架选中", bootstyle="danger", command=remove_selected)
+        remove_btn.pack(side=LEFT, padx=5)
         tb.Button(btn_frame, text="刷新", bootstyle="info", 
                  command=lambda: [win.destroy(), self.my_goods_window()]).pack(side=LEFT, padx=5)
         tb.Button(btn_frame, text="关闭", bootstyle="secondary", 
@@ -489,19 +516,25 @@ class SecondHandSystemGUI:
         scrollbar.pack(side=RIGHT, fill=Y)
         
         # 加载数据
-        result = self.network_client.get_user_orders(self.current_user['user_id'])
-        if result['success']:
-            status_map = {"pending": "待处理", "completed": "已完成", "cancelled": "已取消"}
-            for order in result['orders']:
-                tree.insert("", "end", values=(
-                    order['order_id'],
-                    order['goods_name'],
-                    f"¥{order['price']:.2f}",
-                    order['buyer_name'],
-                    order['seller_name'],
-                    status_map.get(order['status'], order['status']),
-                    order['create_time']
-                ))
+        loading = self.show_loading(table_frame)
+        
+        def show_orders(result):
+            loading.destroy()
+            if result['success']:
+                status_map = {"pending": "待处理", "completed": "已完成", "cancelled": "已取消"}
+                for order in result['orders']:
+                    tree.insert("", "end", values=(
+                        order['order_id'],
+                        order['goods_name'],
+                        f"¥{order['price']:.2f}",
+                        order['buyer_name'],
+                        order['seller_name'],
+                        status_map.get(order['status'], order['status']),
+                        order['create_time']
+                    ))
+        
+        self.tasks.submit(self.network_client.get_user_orders, self.current_user['user_id'],
+                          on_done=show_orders, owner=win)
         
         # 关闭按钮
         tb.Button(win, text="关闭", bootstyle="secondary", 
@@ -509,42 +542,49 @@ class SecondHandSystemGUI:
 
     def buy_goods(self):
         """购买商品"""
-        sel = self.goods_tree.selection()
-        if not sel:
+        goods = self.goods_table.selected()
+        if goods is None:
             messagebox.showwarning("提示", "请先选择要购买的商品")
             return
         
-        item = self.goods_tree.item(sel[0])
-        goods_id = item['values'][0]
-        name = item['values'][1]
-        price = float(item['values'][3].replace('¥', ''))
-        
-        # 获取商品详情确认卖家
-        all_goods = self.network_client.get_all_goods()['goods']
-        target_goods = next((g for g in all_goods if g['goods_id'] == goods_id), None)
+        goods_id = goods['goods_id']
+        listed_price = goods['price']
         
-        if not target_goods:
-            messagebox.showerror("错误", "商品不存在")
-            return
-        
-        if target_goods['seller_id'] == self.current_user['user_id']:
-            messagebox.showwarning("提示", "不能购买自己发布的商品")
-            return
-        
-        if messagebox.askyesno("确认购买", 
-                              f"商品：{name}\n价格：¥{price:.2f}\n\n确认购买吗？"):
-            result = self.network_client.purchase_goods(goods_id, self.current_user['user_id'])
-            
+        def on_purchased(result):
             # 检查是否被强制退出
             if self.check_force_logout(result):
                 return
-                
+            
             if result['success']:
                 messagebox.showinfo("成功", "购买成功！")
-                self.refresh_goods_list()
-                self.refresh_balance()
+                self.sync_goods_changes()
+                self.set_balance(result['new_balance'])
             else:
                 messagebox.showerror("失败", result['message'])
+        
+        def on_goods(result):
+            target_goods = result.get('goods') if result['success'] else None
+            
+            if not target_goods or target_goods['status'] != 'available':
+                messagebox.showerror("错误", "商品不存在")
+                return
+            
+            if target_goods['seller_id'] == self.current_user['user_id']:
+                messagebox.showwarning("提示", "不能购买自己发布的商品")
+                return
+            
+            # 按服务器返回的最新价格确认（即实际扣款金额），列表中的价格可能已过期
+            price = target_goods['price']
+            message = f"商品：{target_goods['name']}\n价格：¥{price:.2f}\n\n确认购买吗？"
+            if price != listed_price:
+                message = f"注意：商品价格已由 ¥{listed_price:.2f} 变为 ¥{price:.2f}\n\n" + message
+            if messagebox.askyesno("确认购买", message):
+                self.tasks.submit(self.network_client.purchase_goods, goods_id, self.current_user['user_id'],
+                                  on_done=on_purchased, owner=self.goods_table, busy=[self.buy_button])
+        
+        # 获取商品详情确认卖家
+        self.tasks.submit(self.network_client.get_goods, goods_id,
+                          on_done=on_goods, owner=self.goods_table, busy=[self.buy_button])
 
     def recharge_window(self):
         """充值窗口"""
@@ -562,9 +602,11 @@ class SecondHandSystemGUI:
                 bootstyle="warning").pack(pady=(0, 30))
         
         # 当前余额
-        current_balance = self.get_current_balance()
-        tb.Label(frame, text=f"当前余额：¥{current_balance:.2f}", 
-                font=("微软雅黑", 11)).pack(pady=(0, 20))
+        balance_label = tb.Label(frame, text="当前余额：加载中...",
+                                 font=("微软雅黑", 11))
+        balance_label.pack(pady=(0, 20))
+        self.fetch_balance(lambda balance: balance_label.config(text=f"当前余额：¥{balance:.2f}"),
+                           owner=win)
         
         # 充值金额
         tb.Label(frame, text="充值金额 (¥)", 
@@ -590,17 +632,19 @@ class SecondHandSystemGUI:
                 messagebox.showerror("错误", "请输入有效的充值金额")
                 return
             
-            result = self.network_client.recharge_balance(
-                self.current_user['user_id'], amount)
-            if result['success']:
-                messagebox.showinfo("成功", f"充值成功！\n{result['message']}")
-                self.refresh_balance()
-                win.destroy()
-            else:
-                messagebox.showerror("失败", result.get('message', '充值失败'))
+            def on_recharged(result):
+                if result['success']:
+                    messagebox.showinfo("成功", f"充值成功！\n{result['message']}")
+                    self.set_balance(result['balance'])
+                    win.destroy()
+                else:
+                    messagebox.showerror("失败", result.get('message', '充值失败'))
+            
+            self.tasks.submit(self.network_client.recharge_balance, self.current_user['user_id'], amount,
+                              on_done=on_recharged, owner=win, busy=[recharge_btn])
         
-        tb.Button(frame, text="确认充值", bootstyle="success", 
-                 command=submit_recharge).pack(fill=X)
+        recharge_btn = tb.Button(frame, text="确认充值", bootstyle="success", command=submit_recharge)
+        recharge_btn.pack(fill=X)
 
     def search_goods_window(self):
         """搜索商品窗口"""
@@ -629,35 +673,14 @@ class SecondHandSystemGUI:
         cat_cb.pack(fill=X, pady=(0, 20))
         
         def do_search():
-            keyword = keyword_entry.get().strip().lower()
+            keyword = keyword_entry.get().strip()
             category = cat_cb.get()
             
-            # 清空当前列表
-            for item in self.goods_tree.get_children():
-                self.goods_tree.delete(item)
-            
-            # 获取所有商品并过滤
-            result = self.network_client.get_all_goods()
-            # 接上文 search_goods_window 函数
-            if result['success']:
-                for goods in result['goods']:
-                    # 关键词过滤
-                    if keyword and keyword not in goods['name'].lower():
-                        continue
-                    # 类别过滤
-                    if category != "全部" and goods['category'] != category:
-                        continue
-                    
-                    self.goods_tree.insert("", "end", values=(
-                        goods['goods_id'],
-                        goods['name'],
-                        goods['category'],
-                        f"¥{goods['price']:.2f}",
-                        goods['seller_name'],
-                        goods['publish_time']
-                    ))
-            
-            messagebox.showinfo("完成", "搜索完成")
+            # 关键词走服务器全文索引，类别作为筛选条件；结果随滚动分页加载
+            self.goods_keyword = keyword or None
+            self.goods_filters = {'category': category} if category != "全部" else {}
+            # 结果在后台加载，列表上方显示加载状态
+            self.refresh_goods_list()
             win.destroy()
         
         tb.Button(frame, text="搜索", bootstyle="primary", 
@@ -689,22 +712,27 @@ class SecondHandSystemGUI:
         stats_frame = tb.Frame(dashboard)
         stats_frame.pack(fill=X, pady=(0, 30))
         
-        # 获取统计数据
-        users_result = self.network_client.get_all_users()
-        goods_result = self.network_client.get_all_goods()
-        orders_result = self.network_client.get_all_orders()
-        
         stats = [
-            ("用户数", len(users_result.get('users', [])), "primary"),
-            ("商品数", len(goods_result.get('goods', [])), "success"),
-            ("订单数", len(orders_result.get('orders', [])), "info"),
+            ("用户数", 'users', "primary"),
+            ("商品数", 'goods', "success"),
+            ("订单数", 'orders', "info"),
         ]
         
-        for title, value, color in stats:
+        value_labels = {}
+        for title, key, color in stats:
             card = tb.Labelframe(stats_frame, text=title, bootstyle=color, padding=20)
             card.pack(side=LEFT, fill=X, expand=True, padx=10)
-            tb.Label(card, text=str(value), font=("Arial", 32, "bold"), 
-                    bootstyle=color).pack()
+            value_labels[key] = tb.Label(card, text="…", font=("Arial", 32, "bold"),
+                                         bootstyle=color)
+            value_labels[key].pack()
+        
+        def show_stats(result):
+            if result['success']:
+                for _, key, _ in stats:
+                    value_labels[key].config(text=str(result['summary'][key]['total']))
+        
+        # 获取统计数据 - 服务器读计数表返回概况，响应大小与数据量无关
+        self.tasks.submit(self.network_client.get_system_summary, on_done=show_stats, owner=stats_frame)
         
         # 功能按钮区
         tb.Label(dashboard, text="管理功能", 
@@ -748,66 +776,66 @@ class SecondHandSystemGUI:
         table_frame = tb.Frame(win, padding=10)
         table_frame.pack(fill=BOTH, expand=True)
         
-        cols = ("ID", "用户名", "角色", "联系方式", "余额", "注册时间")
-        tree = tb.Treeview(table_frame, columns=cols, show="headings")
-        
-        tree.column("ID", width=50)
-        widths = {"用户名": 120, "角色": 80, "联系方式": 150, "余额": 100, "注册时间": 150}
-        for col in cols:
-            tree.heading(col, text=col)
-            if col in widths:
-                tree.column(col, width=widths[col])
+        role_map = {"user": "普通用户", "admin": "管理员"}
         
-        scrollbar = tb.Scrollbar(table_frame, orient=VERTICAL, command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
+        def user_row(user):
+            return (
+                user['user_id'],
+                user['username'],
+                role_map.get(user['role'], user['role']),
+                user.get('contact', ''),
+                f"¥{user.get('balance', 0):.2f}",
+                user['created_at']
+            )
         
-        tree.pack(side=LEFT, fill=BOTH, expand=True)
-        scrollbar.pack(side=RIGHT, fill=Y)
+        table = VirtualTable(
+            table_frame,
+            columns=[("ID", "user_id", 50), ("用户名", "username", 120), ("角色", "role", 80),
+                     ("联系方式", "contact", 150), ("余额", "balance", 100), ("注册时间", "created_at", 150)],
+            format_row=user_row, key=lambda user: user['user_id'])
+        table.pack(fill=BOTH, expand=True)
         
         # 加载数据
-        result = self.network_client.get_all_users()
-        if result['success']:
-            role_map = {"user": "普通用户", "admin": "管理员"}
-            for user in result['users']:
-                tree.insert("", "end", values=(
-                    user['user_id'],
-                    user['username'],
-                    role_map.get(user['role'], user['role']),
-                    user.get('contact', ''),
-                    f"¥{user.get('balance', 0):.2f}",
-                    user['created_at']
-                ))
+        loading = self.show_loading(table_frame)
+        
+        def show_users(result):
+            loading.destroy()
+            if result['success']:
+                table.set_rows(result['users'])
+        
+        self.tasks.submit(self.network_client.get_all_users, on_done=show_users, owner=win)
         
         # 操作按钮
         btn_frame = tb.Frame(win, padding=10)
         btn_frame.pack(fill=X)
         
         def delete_user():
-            sel = tree.selection()
-            if not sel:
+            user = table.selected()
+            if user is None:
                 messagebox.showwarning("提示", "请选择要删除的用户")
                 return
             
-            item = tree.item(sel[0])
-            user_id = item['values'][0]
-            username = item['values'][1]
-            role = item['values'][2]
+            user_id = user['user_id']
+            username = user['username']
             
-            if role == "管理员":
+            if user['role'] == ADMIN_ROLE:
                 messagebox.showwarning("提示", "不能删除管理员账户")
                 return
             
-            if messagebox.askyesno("确认", f"确定要删除用户「{username}」吗？\n此操作将同时删除该用户的商品和订单"):
-                result = self.network_client.delete_user(user_id)
+            def on_deleted(result):
                 if result['success']:
                     messagebox.showinfo("成功", result['message'])
                     win.destroy()
                     self.manage_users_window()
                 else:
                     messagebox.showerror("失败", result.get('message', '删除失败'))
+            
+            if messagebox.askyesno("确认", f"确定要删除用户「{username}」吗？\n此操作将同时删除该用户的商品和订单"):
+                self.tasks.submit(self.network_client.delete_user, user_id,
+                                  on_done=on_deleted, owner=win, busy=[delete_btn])
         
-        tb.Button(btn_frame, text="删除选中", bootstyle="danger", 
-                 command=delete_user).pack(side=LEFT, padx=5)
+        delete_btn = tb.Button(btn_frame, text="删除选中", bootstyle="danger", command=delete_user)
+        delete_btn.pack(side=LEFT, padx=5)
         tb.Button(btn_frame, text="刷新", bootstyle="info", 
                  command=lambda: [win.destroy(), self.manage_users_window()]).pack(side=LEFT, padx=5)
         tb.Button(btn_frame, text="关闭", bootstyle="secondary", 
@@ -832,62 +860,64 @@ class SecondHandSystemGUI:
         table_frame = tb.Frame(win, padding=10)
         table_frame.pack(fill=BOTH, expand=True)
         
-        cols = ("ID", "名称", "类别", "价格", "卖家", "状态", "发布时间")
-        tree = tb.Treeview(table_frame, columns=cols, show="headings")
+        status_map = {"available": "在售", "sold": "已售", "removed": "已下架"}
+        
+        def goods_row(goods):
+            return (
+                goods['goods_id'],
+                goods['name'],
+                goods['category'],
+                f"¥{goods['price']:.2f}",
+                goods['seller_name'],
+                status_map.get(goods['status'], goods['status']),
+                goods['publish_time']
+            )
         
-        tree.column("ID", width=50)
-        widths = {"名称": 200, "类别": 100, "价格": 100, "卖家": 120, "状态": 80, "发布时间": 150}
-        for col in cols:
-            tree.heading(col, text=col)
-            if col in widths:
-                tree.column(col, width=widths[col])
+        table = VirtualTable(
+            table_frame,
+            columns=[("ID", "goods_id", 50), ("名称", "name", 200), ("类别", "category", 100),
+                     ("价格", "price", 100), ("卖家", "seller_name", 120), ("状态", "status", 80),
+                     ("发布时间", "publish_time", 150)],
+            format_row=goods_row, key=lambda goods: goods['goods_id'])
+        table.pack(fill=BOTH, expand=True)
         
-        scrollbar = tb.Scrollbar(table_frame, orient=VERTICAL, command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
+        # 加载所有商品
+        loading = self.show_loading(table_frame)
         
-        tree.pack(side=LEFT, fill=BOTH, expand=True)
-        scrollbar.pack(side=RIGHT, fill=Y)
+        def show_goods(result):
+            loading.destroy()
+            if result['success']:
+                table.set_rows(result['goods'])
         
-        # 加载所有商品
-        result = self.network_client.get_all_goods()
-        if result['success']:
-            status_map = {"available": "在售", "sold": "已售", "removed": "已下架"}
-            for goods in result['goods']:
-                tree.insert("", "end", values=(
-                    goods['goods_id'],
-                    goods['name'],
-                    goods['category'],
-                    f"¥{goods['price']:.2f}",
-                    goods['seller_name'],
-                    status_map.get(goods['status'], goods['status']),
-                    goods['publish_time']
-                ))
+        self.tasks.submit(self.network_client.get_all_goods, on_done=show_goods, owner=win)
         
         # 操作按钮
         btn_frame = tb.Frame(win, padding=10)
         btn_frame.pack(fill=X)
         
         def remove_goods():
-            sel = tree.selection()
-            if not sel:
+            goods = table.selected()
+            if goods is None:
                 messagebox.showwarning("提示", "请选择要下架的商品")
                 return
             
-            item = tree.item(sel[0])
-            goods_id = item['values'][0]
-            goods_name = item['values'][1]
+            goods_id = goods['goods_id']
+            goods_name = goods['name']
             
-            if messagebox.askyesno("确认", f"确定要下架商品「{goods_name}」吗？"):
-                result = self.network_client.remove_goods(goods_id)
+            def on_removed(result):
                 if result['success']:
                     messagebox.showinfo("成功", result['message'])
                     win.destroy()
                     self.manage_goods_window()
                 else:
                     messagebox.showerror("失败", result.get('message', '下架失败'))
+            
+            if messagebox.askyesno("确认", f"确定要下架商品「{goods_name}」吗？"):
+                self.tasks.submit(self.network_client.remove_goods, goods_id,
+                                  on_done=on_removed, owner=win, busy=[remove_btn])
         
-        tb.Button(btn_frame, text="下架选中", bootstyle="danger", 
-                 command=remove_goods).pack(side=LEFT, padx=5)
+        remove_btn = tb.Button(btn_frame, text="下架选中", bootstyle="danger", command=remove_goods)
+        remove_btn.pack(side=LEFT, padx=5)
         tb.Button(btn_frame, text="刷新", bootstyle="info", 
                  command=lambda: [win.destroy(), self.manage_goods_window()]).pack(side=LEFT, padx=5)
         tb.Button(btn_frame, text="关闭", bootstyle="secondary", 
@@ -912,47 +942,48 @@ class SecondHandSystemGUI:
         table_frame = tb.Frame(win, padding=10)
         table_frame.pack(fill=BOTH, expand=True)
         
-        cols = ("订单号", "商品名称", "价格", "买家", "卖家", "状态", "创建时间")
-        tree = tb.Treeview(table_frame, columns=cols, show="headings")
+        status_map = {"pending": "待处理", "completed": "已完成", "cancelled": "已取消"}
+        
+        def order_row(order):
+            return (
+                order['order_id'],
+                order['goods_name'],
+                f"¥{order['price']:.2f}",
+                order['buyer_name'],
+                order['seller_name'],
+                status_map.get(order['status'], order['status']),
+                order['create_time']
+            )
         
-        widths = {"订单号": 100, "商品名称": 180, "价格": 100, 
-                 "买家": 120, "卖家": 120, "状态": 80, "创建时间": 150}
-        for col in cols:
-            tree.heading(col, text=col)
-            tree.column(col, width=widths.get(col, 100))
+        table = VirtualTable(
+            table_frame,
+            columns=[("订单号", "order_id", 100), ("商品名称", "goods_name", 180), ("价格", "price", 100),
+                     ("买家", "buyer_name", 120), ("卖家", "seller_name", 120), ("状态", "status", 80),
+                     ("创建时间", "create_time", 150)],
+            format_row=order_row, key=lambda order: order['order_id'])
+        table.pack(fill=BOTH, expand=True)
         
-        scrollbar = tb.Scrollbar(table_frame, orient=VERTICAL, command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
-        
-        tree.pack(side=LEFT, fill=BOTH, expand=True)
-        scrollbar.pack(side=RIGHT, fill=Y)
+        # 统计信息
+        stats_label = tb.Label(win, text="", font=("微软雅黑", 10), bootstyle="info")
+        stats_label.pack(pady=5)
         
         # 加载数据
-        result = self.network_client.get_all_orders()
-        if result['success']:
-            status_map = {"pending": "待处理", "completed": "已完成", "cancelled": "已取消"}
-            total_amount = 0
-            for order in result['orders']:
-                tree.insert("", "end", values=(
-                    order['order_id'],
-                    order['goods_name'],
-                    f"¥{order['price']:.2f}",
-                    order['buyer_name'],
-                    order['seller_name'],
-                    status_map.get(order['status'], order['status']),
-                    order['create_time']
-                ))
-                if order['status'] != 'cancelled':
-                    total_amount += order['price']
-            
-            # 统计信息
-            stats_label = tb.Label(win, 
-                                  text=f"总订单数: {len(result['orders'])}  |  总交易额: ¥{total_amount:.2f}",
-                                  font=("微软雅黑", 10), bootstyle="info")
-            stats_label.pack(pady=5)
+        loading = self.show_loading(table_frame)
+        
+        def show_orders(result):
+            loading.destroy()
+            if result['success']:
+                table.set_rows(result['orders'])
+                total_amount = sum(order['price'] for order in result['orders']
+                                   if order['status'] != 'cancelled')
+                
+                stats_label.config(
+                    text=f"总订单数: {len(result['orders'])}  |  总交易额: ¥{total_amount:.2f}")
+        
+        self.tasks.submit(self.network_client.get_all_orders, on_done=show_orders, owner=win)
         
         # 关闭按钮
-        tb.Button(win, text="关闭", bootstyle="secondary", 
+        tb.Button(win, text="关闭", bootstyle="secondary",
                  command=win.destroy).pack(pady=10)
 
     def show_statistics_window(self):
@@ -970,105 +1001,179 @@ class SecondHandSystemGUI:
                 font=("微软雅黑", 16, "bold"), 
                 bootstyle="inverse-warning").pack()
         
-        # 获取数据
-        cat_res = self.network_client.get_goods_category_stats()
-        sales_res = self.network_client.get_daily_sales_stats()
-        
-        if not cat_res['success'] or not sales_res['success']:
-            messagebox.showerror("错误", "获取统计数据失败")
-            return
-        
-        cat_data = cat_res['stats']
-        sales_data = sales_res['stats']
+        loading = self.show_loading(stats_win, "正在加载统计数据...")
         
-        # 创建Notebook标签页
-        notebook = tb.Notebook(stats_win)
-        notebook.pack(fill=BOTH, expand=True, padx=10, pady=10)
+        def fetch_stats():
+            # matplotlib 在工作线程中随数据一起加载，不占用主线程
+            charts = load_charts()
+            return charts, self.network_client.pipeline([
+                ('get_goods_category_stats', None), ('get_sales_stats', {'granularity': 'day'}),
+                ('get_system_summary', None)])
         
-        # 页面1: 商品类别分布
-        tab1 = tb.Frame(notebook)
-        notebook.add(tab1, text="商品类别分布")
-        
-        if cat_data:
-            fig1 = plt.Figure(figsize=(10, 6), dpi=100)
-            ax1 = fig1.add_subplot(111)
+        def show_charts(loaded):
+            loading.destroy()
+            (Figure, FigureCanvasTkAgg, colormaps), results = loaded
+            cat_res, sales_res, summary_res = results
             
-            labels = list(cat_data.keys())
-            sizes = list(cat_data.values())
-            colors = plt.cm.Set3(range(len(labels)))
+            if not cat_res['success']:
+                messagebox.showerror("错误", "获取统计数据失败")
+                return
             
-            wedges, texts, autotexts = ax1.pie(sizes, labels=labels, autopct='%1.1f%%',
-                                                startangle=90, colors=colors,
-                                                textprops={'fontsize': 10})
+            cat_data = cat_res['stats']
             
-            for autotext in autotexts:
-                autotext.set_color('white')
-                autotext.set_fontweight('bold')
+            # 创建Notebook标签页
+            notebook = tb.Notebook(stats_win)
+            notebook.pack(fill=BOTH, expand=True, padx=10, pady=10)
             
-            ax1.set_title('各类别商品数量分布', fontsize=14, fontweight='bold', pad=20)
+            # 页面1: 商品类别分布
+            tab1 = tb.Frame(notebook)
+            notebook.add(tab1, text="商品类别分布")
             
-            canvas1 = FigureCanvasTkAgg(fig1, tab1)
-            canvas1.get_tk_widget().pack(fill=BOTH, expand=True, padx=10, pady=10)
-        else:
-            tb.Label(tab1, text="暂无商品数据", 
-                    font=("微软雅黑", 14)).pack(expand=True)
-        
-        # 页面2: 交易额趋势
-        tab2 = tb.Frame(notebook)
-        notebook.add(tab2, text="交易额趋势")
-        
-        if sales_data:
-            fig2 = plt.Figure(figsize=(10, 6), dpi=100)
-            ax2 = fig2.add_subplot(111)
+            if cat_data:
+                fig1 = Figure(figsize=(10, 6), dpi=100)
+                ax1 = fig1.add_subplot(111)
+                
+                labels = list(cat_data.keys())
+                sizes = list(cat_data.values())
+                colors = colormaps['Set3'](range(len(labels)))
+                
+                wedges, texts, autotexts = ax1.pie(sizes, labels=labels, autopct='%1.1f%%',
+                                                    startangle=90, colors=colors,
+                                                    textprops={'fontsize': 10})
+                
+                for autotext in autotexts:
+                    autotext.set_color('white')
+                    autotext.set_fontweight('bold')
+                
+                ax1.set_title('各类别商品数量分布', fontsize=14, fontweight='bold', pad=20)
+                
+                canvas1 = FigureCanvasTkAgg(fig1, tab1)
+                canvas1.get_tk_widget().pack(fill=BOTH, expand=True, padx=10, pady=10)
+            else:
+                tb.Label(tab1, text="暂无商品数据", 
+                        font=("微软雅黑", 14)).pack(expand=True)
             
-            dates = [item[0][5:] for item in sales_data]
-            amounts = [item[1] for item in sales_data]
+            # 页面2: 交易额趋势（可选时间范围和粒度，只读服务器的日/周/月汇总表）
+            tab2 = tb.Frame(notebook)
+            notebook.add(tab2, text="交易额趋势")
             
-            bars = ax2.bar(dates, amounts, color='#3498db', alpha=0.8, edgecolor='#2980b9', linewidth=1.5)
-            ax2.set_title('近7日交易金额趋势', fontsize=14, fontweight='bold', pad=20)
-            ax2.set_xlabel('日期', fontsize=11)
-            ax2.set_ylabel('金额 (¥)', fontsize=11)
-            ax2.grid(axis='y', alpha=0.3, linestyle='--')
+            controls = tb.Frame(tab2, padding=(10, 10, 10, 0))
+            controls.pack(fill=X)
+            today = date.today()
             
-            for bar in bars:
-                height = bar.get_height()
-                ax2.text(bar.get_x() + bar.get_width()/2., height,
-                        f'¥{height:.0f}',
-                        ha='center', va='bottom', fontsize=9)
+            tb.Label(controls, text="开始").pack(side=LEFT)
+            start_entry = tb.DateEntry(controls, dateformat='%Y-%m-%d', width=12,
+                                       startdate=today - timedelta(days=6))
+            start_entry.pack(side=LEFT, padx=(5, 15))
+            tb.Label(controls, text="结束").pack(side=LEFT)
+            end_entry = tb.DateEntry(controls, dateformat='%Y-%m-%d', width=12, startdate=today)
+            end_entry.pack(side=LEFT, padx=(5, 15))
+            tb.Label(controls, text="粒度").pack(side=LEFT)
+            granularities = {"按日": "day", "按周": "week", "按月": "month"}
+            gran_cb = tb.Combobox(controls, values=list(granularities), state="readonly", width=6)
+            gran_cb.current(0)
+            gran_cb.pack(side=LEFT, padx=(5, 15))
             
-            plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
-            fig2.tight_layout()
+            chart_frame = tb.Frame(tab2)
+            chart_frame.pack(fill=BOTH, expand=True)
             
-            canvas2 = FigureCanvasTkAgg(fig2, tab2)
-            canvas2.get_tk_widget().pack(fill=BOTH, expand=True, padx=10, pady=10)
-        else:
-            tb.Label(tab2, text="暂无交易数据", 
-                    font=("微软雅黑", 14)).pack(expand=True)
-        
-        # 页面3: 综合统计
-        tab3 = tb.Frame(notebook, padding=20)
-        notebook.add(tab3, text="综合统计")
-        
-        users_result = self.network_client.get_all_users()
-        goods_result = self.network_client.get_all_goods()
-        orders_result = self.network_client.get_all_orders()
-        
-        stats_data = [
-            ("总用户数", len(users_result.get('users', [])), "primary"),
-            ("总商品数", len(goods_result.get('goods', [])), "success"),
-            ("总订单数", len(orders_result.get('orders', [])), "info"),
-            ("总交易额", f"¥{sum(o['price'] for o in orders_result.get('orders', []) if o['status'] != 'cancelled'):.2f}", "warning"),
-        ]
+            def draw_sales(result):
+                for child in chart_frame.winfo_children():
+                    child.destroy()
+                
+                if not result['success']:
+                    tb.Label(chart_frame, text=result.get('message', '获取统计数据失败'),
+                            font=("微软雅黑", 14)).pack(expand=True)
+                    return
+                
+                stats = result['stats']
+                if not any(item['order_count'] for item in stats):
+                    tb.Label(chart_frame, text="暂无交易数据", 
+                            font=("微软雅黑", 14)).pack(expand=True)
+                    return
+                
+                fig2 = Figure(figsize=(10, 6), dpi=100)
+                ax2 = fig2.add_subplot(111)
+                
+                monthly = result['granularity'] == 'month'
+                labels = [item['period'][:7] if monthly else item['period'][5:] for item in stats]
+                amounts = [item['total_amount'] for item in stats]
+                positions = range(len(labels))
+                
+                bars = ax2.bar(positions, amounts, color='#3498db', alpha=0.8, edgecolor='#2980b9', linewidth=1.5)
+                gran_name = {v: k for k, v in granularities.items()}[result['granularity']]
+                ax2.set_title(f"{stats[0]['period']} 至 {stats[-1]['period']} 交易金额趋势（{gran_name}）",
+                              fontsize=14, fontweight='bold', pad=20)
+                ax2.set_xlabel('日期', fontsize=11)
+                ax2.set_ylabel('金额 (¥)', fontsize=11)
+                ax2.grid(axis='y', alpha=0.3, linestyle='--')
+                
+                # 周期较多时只标注部分刻度，柱顶金额也不再逐个标出
+                step = max(1, len(labels) // 15)
+                ax2.set_xticks(positions[::step])
+                ax2.set_xticklabels(labels[::step])
+                if len(bars) <= 31:
+                    for bar in bars:
+                        height = bar.get_height()
+                        ax2.text(bar.get_x() + bar.get_width()/2., height,
+                                f'¥{height:.0f}',
+                                ha='center', va='bottom', fontsize=9)
+                
+                ax2.tick_params(axis='x', labelrotation=45)
+                fig2.tight_layout()
+                
+                canvas2 = FigureCanvasTkAgg(fig2, chart_frame)
+                canvas2.get_tk_widget().pack(fill=BOTH, expand=True, padx=10, pady=10)
+            
+            def query_sales():
+                self.tasks.submit(self.network_client.get_sales_stats, start_entry.entry.get(),
+                                  end_entry.entry.get(), granularities[gran_cb.get()],
+                                  on_done=draw_sales, owner=chart_frame, key='sales_chart', busy=[query_btn])
+            
+            def apply_preset(days, gran):
+                for entry, day in ((start_entry, today - timedelta(days=days)), (end_entry, today)):
+                    entry.entry.delete(0, END)
+                    entry.entry.insert(0, day.isoformat())
+                gran_cb.set(gran)
+                query_sales()
+            
+            query_btn = tb.Button(controls, text="查询", bootstyle="primary", command=query_sales)
+            query_btn.pack(side=LEFT)
+            presets = [("近12个月", 364, "按月"), ("近12周", 83, "按周"), ("近30天", 29, "按日"), ("近7天", 6, "按日")]
+            for text, days, gran in presets:
+                tb.Button(controls, text=text, bootstyle="secondary-outline",
+                         command=lambda d=days, g=gran: apply_preset(d, g)).pack(side=RIGHT, padx=2)
+            
+            draw_sales(sales_res)
+            
+            # 页面3: 综合统计
+            tab3 = tb.Frame(notebook, padding=20)
+            notebook.add(tab3, text="综合统计")
+            
+            summary = summary_res.get('summary') or {}
+            stats_data = [
+                ("总用户数", summary.get('users', {}).get('total', '-'), "primary"),
+                ("总商品数", summary.get('goods', {}).get('total', '-'), "success"),
+                ("总订单数", summary.get('orders', {}).get('total', '-'), "info"),
+                ("总交易额", f"¥{summary.get('revenue', 0):.2f}", "warning"),
+            ]
+            
+            for i, (title, value, color) in enumerate(stats_data):
+                card = tb.Labelframe(tab3, text=title, bootstyle=color, padding=30)
+                card.grid(row=i//2, column=i%2, padx=20, pady=20, sticky="ew")
+                tb.Label(card, text=str(value), 
+                        font=("Arial", 28, "bold"), 
+                        bootstyle=color).pack()
+            
+            tab3.grid_columnconfigure(0, weight=1)
+            tab3.grid_columnconfigure(1, weight=1)
         
-        for i, (title, value, color) in enumerate(stats_data):
-            card = tb.Labelframe(tab3, text=title, bootstyle=color, padding=30)
-            card.grid(row=i//2, column=i%2, padx=20, pady=20, sticky="ew")
-            tb.Label(card, text=str(value), 
-                    font=("Arial", 28, "bold"), 
-                    bootstyle=color).pack()
+        # 获取数据 - 三个请求管线化发送，只等一次往返
+        def on_failed(e):
+            loading.destroy()
+            messagebox.showerror("错误", f"加载统计看板失败: {e}")
         
-        tab3.grid_columnconfigure(0, weight=1)
-        tab3.grid_columnconfigure(1, weight=1)
+        self.tasks.submit(fetch_stats, on_done=show_charts, on_error=on_failed, owner=stats_win)
 
     def generate_mock_data_window(self):
         """生成模拟测试数据窗口"""
@@ -1131,129 +1236,132 @@ class SecondHandSystemGUI:
         log_scroll.pack(side=RIGHT, fill=Y)
         
         def log(msg):
-            """输出日志"""
-            log_text.insert(END, f"{msg}\n")
-            log_text.see(END)
-            log_text.update()
+            """输出日志（主线程）"""
+            if log_text.winfo_exists():
+                log_text.insert(END, f"{msg}\n")
+                log_text.see(END)
         
-        def start_generate():
-            """开始生成数据"""
+        def post_log(msg):
+            """在工作线程中输出日志"""
+            self.tasks.post(log, msg)
+        
+        def generate(n_users, n_goods, n_orders):
+            """生成数据（在工作线程中执行，界面保持响应）"""
             import random
-            import time
-            from datetime import datetime, timedelta
             
-            log_text.delete("1.0", END)
-            log("=" * 60)
-            log("开始生成测试数据...")
-            log("=" * 60 + "\n")
+            # 生成用户 - 批量注册（一个事务）后用一个批量请求充值
+            post_log(f"[1/3] 生成用户数据 (目标: {n_users}个)")
+            accounts = [{'username': f"user_{random.randint(1000, 9999)}", 'password': "123456",
+                         'contact': f"138{random.randint(10000000, 99999999)}"} for _ in range(n_users)]
+            result = self.network_client.bulk_register_users(accounts)
+            
+            # 注册结果直接返回用户ID，无需再登录（登录会替换当前管理员会话）
+            registered = [(account['username'], item['user_id'])
+                          for account, item in zip(accounts, result.get('results', []))
+                          if 'user_id' in item]
+            user_ids = [user_id for _, user_id in registered]
             
+            # 随机充值
+            balances = [random.randint(100, 5000) for _ in registered]
+            if registered:
+                self.network_client.batch(
+                    [('recharge_balance', {'user_id': user_id, 'amount': balance})
+                     for (_, user_id), balance in zip(registered, balances)])
+            for (username, _), balance in zip(registered, balances):
+                post_log(f"  ✓ 创建用户: {username}, 充值: ¥{balance}")
+            
+            post_log(f"  完成! 成功创建 {len(user_ids)} 个用户\n")
+            
+            # 生成商品
+            post_log(f"[2/3] 生成商品数据 (目标: {n_goods}个)")
+            categories = ["学习资料", "电子产品", "生活用品", "运动器材", "服饰鞋包", "其他"]
+            goods_names = {
+                "学习资料": ["高等数学", "大学物理", "计算机组成原理", "数据结构", "操作系统"],
+                "电子产品": ["iPhone", "小米手机", "华为平板", "机械键盘", "蓝牙耳机"],
+                "生活用品": ["台灯", "床上四件套", "保温杯", "雨伞", "收纳箱"],
+                "运动器材": ["篮球", "羽毛球拍", "跑步鞋", "瑜伽垫", "哑铃"],
+                "服饰鞋包": ["休闲鞋", "双肩包", "T恤", "牛仔裤", "外套"],
+                "其他": ["书签", "明信片", "手办", "海报", "钥匙扣"]
+            }
+            
+            goods_ids = []
+            if not user_ids:
+                post_log("  ⚠ 没有可用用户，跳过商品生成")
+            else:
+                new_goods = []
+                for i in range(n_goods):
+                    category = random.choice(categories)
+                    new_goods.append({
+                        'name': random.choice(goods_names[category]),
+                        'category': category,
+                        'price': round(random.uniform(10, 500), 2),
+                        'description': f"闲置转让，{random.choice(['九成新', '全新', '八成新', '七成新'])}",
+                        'seller_id': random.choice(user_ids)
+                    })
+                result = self.network_client.bulk_add_goods(new_goods)
+                for goods, item in zip(new_goods, result.get('results', [])):
+                    if 'goods_id' in item:
+                        goods_ids.append(item['goods_id'])
+                        post_log(f"  ✓ 发布商品: {goods['name']} ({goods['category']}) - ¥{goods['price']}")
+            
+            post_log(f"  完成! 成功发布 {len(goods_ids)} 件商品\n")
+            
+            # 生成订单 - 先选出互不相同的商品和买家，再一次批量购买
+            post_log(f"[3/3] 生成订单数据 (目标: {n_orders}个)")
+            all_goods = self.network_client.get_all_goods()
+            
+            if all_goods['success'] and all_goods['goods'] and len(user_ids) > 1:
+                picked = random.sample(all_goods['goods'], min(n_orders, len(all_goods['goods'])))
+                purchases = [(goods, random.choice([uid for uid in user_ids if uid != goods['seller_id']]))
+                             for goods in picked]
+                result = self.network_client.batch(
+                    [('purchase_goods', {'goods_id': goods['goods_id'], 'buyer_id': buyer_id})
+                     for goods, buyer_id in purchases])
+                order_success = 0
+                for (goods, _), item in zip(purchases, result.get('results', [])):
+                    if item.get('success'):
+                        order_success += 1
+                        post_log(f"  ✓ 创建订单: {goods['name']} - ¥{goods['price']}")
+                
+                post_log(f"  完成! 成功创建 {order_success} 个订单\n")
+            else:
+                post_log("  ⚠ 没有可用商品，跳过订单生成\n")
+            
+            post_log("=" * 60)
+            post_log("数据生成完成!")
+            post_log(f"用户: {len(user_ids)}个 | 商品: {len(goods_ids)}个")
+            post_log("=" * 60)
+        
+        def on_generated(_):
+            messagebox.showinfo("完成", "测试数据生成完成!\n请刷新相关页面查看")
+        
+        def on_failed(e):
+            log(f"\n❌ 错误: {str(e)}")
+            messagebox.showerror("错误", f"生成数据时出错:\n{str(e)}")
+        
+        def start_generate():
+            """开始生成数据"""
             try:
                 n_users = int(user_count.get())
                 n_goods = int(goods_count.get())
                 n_orders = int(order_count.get())
-                
-                # 生成用户
-                log(f"[1/3] 生成用户数据 (目标: {n_users}个)")
-                user_ids = []
-                for i in range(n_users):
-                    username = f"user_{random.randint(1000, 9999)}"
-                    password = "123456"
-                    contact = f"138{random.randint(10000000, 99999999)}"
-                    
-                    result = self.network_client.register(username, password, contact)
-                    if result['success']:
-                        # 获取用户ID
-                        login_result = self.network_client.login(username, password)
-                        if login_result['success']:
-                            user_id = login_result['user']['user_id']
-                            user_ids.append(user_id)
-                            
-                            # 随机充值
-                            balance = random.randint(100, 5000)
-                            self.network_client.recharge_balance(user_id, balance)
-                            log(f"  ✓ 创建用户: {username}, 充值: ¥{balance}")
-                    time.sleep(0.1)
-                
-                log(f"  完成! 成功创建 {len(user_ids)} 个用户\n")
-                
-                # 生成商品
-                log(f"[2/3] 生成商品数据 (目标: {n_goods}个)")
-                categories = ["学习资料", "电子产品", "生活用品", "运动器材", "服饰鞋包", "其他"]
-                goods_names = {
-                    "学习资料": ["高等数学", "大学物理", "计算机组成原理", "数据结构", "操作系统"],
-                    "电子产品": ["iPhone", "小米手机", "华为平板", "机械键盘", "蓝牙耳机"],
-                    "生活用品": ["台灯", "床上四件套", "保温杯", "雨伞", "收纳箱"],
-                    "运动器材": ["篮球", "羽毛球拍", "跑步鞋", "瑜伽垫", "哑铃"],
-                    "服饰鞋包": ["休闲鞋", "双肩包", "T恤", "牛仔裤", "外套"],
-                    "其他": ["书签", "明信片", "手办", "海报", "钥匙扣"]
-                }
-                
-                goods_ids = []
-                for i in range(n_goods):
-                    if not user_ids:
-                        log("  ⚠ 没有可用用户，跳过商品生成")
-                        break
-                    
-                    seller_id = random.choice(user_ids)
-                    category = random.choice(categories)
-                    name = random.choice(goods_names[category])
-                    price = round(random.uniform(10, 500), 2)
-                    description = f"闲置转让，{random.choice(['九成新', '全新', '八成新', '七成新'])}"
-                    
-                    result = self.network_client.add_goods(name, category, price, description, seller_id)
-                    if result['success']:
-                        goods_ids.append(result['goods_id'])
-                        log(f"  ✓ 发布商品: {name} ({category}) - ¥{price}")
-                    time.sleep(0.1)
-                
-                log(f"  完成! 成功发布 {len(goods_ids)} 件商品\n")
-                
-                # 生成订单
-                log(f"[3/3] 生成订单数据 (目标: {n_orders}个)")
-                self.refresh_goods_list()
-                all_goods = self.network_client.get_all_goods()
-                
-                if all_goods['success'] and all_goods['goods']:
-                    order_success = 0
-                    for i in range(min(n_orders, len(all_goods['goods']))):
-                        if not user_ids:
-                            break
-                        
-                        goods = random.choice(all_goods['goods'])
-                        buyer_id = random.choice([uid for uid in user_ids if uid != goods['seller_id']])
-                        
-                        result = self.network_client.purchase_goods(goods['goods_id'], buyer_id)
-                        if result['success']:
-                            order_success += 1
-                            log(f"  ✓ 创建订单: {goods['name']} - ¥{goods['price']}")
-                        
-                        # 重新获取可用商品
-                        all_goods = self.network_client.get_all_goods()
-                        if not all_goods['goods']:
-                            break
-                        time.sleep(0.1)
-                    
-                    log(f"  完成! 成功创建 {order_success} 个订单\n")
-                else:
-                    log("  ⚠ 没有可用商品，跳过订单生成\n")
-                
-                log("=" * 60)
-                log("数据生成完成!")
-                log(f"用户: {len(user_ids)}个 | 商品: {len(goods_ids)}个")
-                log("=" * 60)
-                
-                messagebox.showinfo("完成", "测试数据生成完成!\n请刷新相关页面查看")
-                
-            except Exception as e:
-                log(f"\n❌ 错误: {str(e)}")
-                messagebox.showerror("错误", f"生成数据时出错:\n{str(e)}")
+            except ValueError:
+                messagebox.showerror("错误", "请输入有效的数量")
+                return
+            
+            log_text.delete("1.0", END)
+            log("=" * 60)
+            log("开始生成测试数据...")
+            log("=" * 60 + "\n")
+            self.tasks.submit(generate, n_users, n_goods, n_orders,
+                              on_done=on_generated, on_error=on_failed, owner=win, busy=[start_btn])
         
         # 操作按钮
         btn_frame = tb.Frame(content)
         btn_frame.pack(fill=X)
         
-        tb.Button(btn_frame, text="开始生成", bootstyle="success", 
-                 command=start_generate).pack(side=LEFT, fill=X, expand=True, padx=(0, 5))
+        start_btn = tb.Button(btn_frame, text="开始生成", bootstyle="success", command=start_generate)
+        start_btn.pack(side=LEFT, fill=X, expand=True, padx=(0, 5))
         tb.Button(btn_frame, text="清空日志", bootstyle="warning-outline", 
                  command=lambda: log_text.delete("1.0", END)).pack(side=LEFT, fill=X, expand=True, padx=5)
         tb.Button(btn_frame, text="关闭", bootstyle="secondary", 
@@ -1261,40 +1369,173 @@ class SecondHandSystemGUI:
 
     # =================== 辅助函数 ===================
     
+    def show_loading(self, parent, text="加载中..."):
+        """在 parent 中央显示加载提示，数据到达后由调用方 destroy()"""
+        label = tb.Label(parent, text=f"⏳ {text}", font=("微软雅黑", 11), bootstyle="secondary")
+        label.place(relx=0.5, rely=0.5, anchor=CENTER)
+        return label
+    
+    def ensure_connected(self):
+        """未连接时先连接服务器（在工作线程中调用），返回是否已连接"""
+        return self.network_client.connected or self.network_client.connect()
+    
     def refresh_goods_list(self):
-        """刷新商品列表"""
-        if not hasattr(self, 'goods_tree'):
+        """刷新商品列表（进行中的分页加载和增量同步结果已过期，一并取消）"""
+        if not hasattr(self, 'goods_table') or not self.goods_table.winfo_exists():
+            return
+        
+        if not self.network_client.active:
             return
         
-        if not self.network_client.connected:
+        self.tasks.cancel_key('goods_page')
+        self.tasks.cancel_key('goods_sync')
+        self.goods_cursor = None
+        self.goods_has_more = True
+        self.goods_loading = False
+        self.goods_version = None
+        # 清空只重置数据数组，不逐行删除
+        self.goods_table.clear()
+        self.load_more_goods()
+
+    def show_all_goods(self):
+        """清除搜索和筛选条件并刷新商品列表"""
+        self.goods_keyword = None
+        self.goods_filters = {}
+        self.refresh_goods_list()
+
+    def load_more_goods(self):
+        """加载下一页商品并追加到列表末尾"""
+        if not self.goods_has_more or self.goods_loading:
             return
         
-        for item in self.goods_tree.get_children():
-            self.goods_tree.delete(item)
+        self.goods_loading = True
+        self.goods_status.config(text="加载中...")
+        keyword, cursor, filters = self.goods_keyword, self.goods_cursor, dict(self.goods_filters)
+        if keyword:
+            request = lambda: self.network_client.search_goods(keyword, offset=cursor or 0, **filters)
+        else:
+            request = lambda: self.network_client.get_goods_page(cursor, **filters)
+        self.tasks.submit(request, on_done=self.on_goods_page, on_error=self.on_goods_page_error,
+                          owner=self.goods_table, key='goods_page')
+    
+    def on_goods_page_error(self, error):
+        self.goods_loading = False
+        self.goods_status.config(text="加载失败")
+    
+    def on_goods_page(self, result):
+        """一页商品到达（主线程）：追加到列表末尾"""
+        self.goods_loading = False
+        self.goods_status.config(text="")
+        if not result['success']:
+            self.goods_has_more = False
+            return
         
-        result = self.network_client.get_all_goods()
-        if result['success']:
+        if not self.goods_keyword and self.goods_cursor is None:
+            # 首页的版本号作为增量同步的起点
+            self.goods_version = result.get('version')
+        
+        self.goods_cursor = result['next_offset'] if self.goods_keyword else result['next_cursor']
+        self.goods_has_more = self.goods_cursor is not None
+        # 增量同步时已插入过的商品就地更新
+        self.goods_table.append(result['goods'])
+
+    def _goods_row_values(self, goods):
+        """商品市场表格的一行"""
+        return (
+            goods['name'],
+            goods['category'],
+            f"¥{goods['price']:.2f}",
+            goods['seller_name'],
+            goods['publish_time']
+        )
+
+    def _goods_matches_filters(self, goods):
+        """商品是否符合当前的类别/价格筛选条件"""
+        filters = self.goods_filters
+        if filters.get('category') and goods['category'] != filters['category']:
+            return False
+        if filters.get('min_price') is not None and goods['price'] < filters['min_price']:
+            return False
+        if filters.get('max_price') is not None and goods['price'] > filters['max_price']:
+            return False
+        return True
+
+    def sync_goods_changes(self):
+        """增量同步商品列表 - 只拉取上次同步之后变化的商品，并在现有行上增删改
+        
+        搜索结果按相关度排序，无法就地合并，仍整体刷新。
+        """
+        if not hasattr(self, 'goods_table') or not self.goods_table.winfo_exists():
+            return
+        if not self.network_client.active:
+            return
+        
+        if self.goods_keyword or self.goods_version is None:
+            self.refresh_goods_list()
+            return
+        
+        # 同时只保留最新一次同步；被取消的同步没有推进版本号，新的同步会重新拉取
+        self.tasks.submit(self.fetch_goods_changes, self.goods_version,
+                          on_done=self.apply_goods_changes, owner=self.goods_table, key='goods_sync')
+    
+    def fetch_goods_changes(self, since_version):
+        """拉取 since_version 之后的全部变化（工作线程中执行），返回各批结果"""
+        batches = []
+        while True:
+            result = self.network_client.get_goods_changes(since_version)
+            if not result.get('success'):
+                break
+            batches.append(result)
+            since_version = result['version']
+            if not result['has_more']:
+                break
+        return batches
+    
+    def apply_goods_changes(self, batches):
+        """把增量同步的结果合并到列表（主线程）"""
+        for result in batches:
+            self.goods_table.remove(result['sold'] + result['removed'])
+            
             for goods in result['goods']:
-                self.goods_tree.insert("", "end", values=(
-                    goods['goods_id'],
-                    goods['name'],
-                    goods['category'],
-                    f"¥{goods['price']:.2f}",
-                    goods['seller_name'],
-                    goods['publish_time']
-                ))
+                self._apply_goods_change(goods)
+            
+            self.goods_version = result['version']
 
-    def get_current_balance(self):
-        """获取当前余额"""
-        if not self.current_user:
-            return 0.0
-        result = self.network_client.get_user_balance(self.current_user['user_id'])
-        return result.get('balance', 0.0) if result.get('success') else 0.0
+    def _apply_goods_change(self, goods):
+        """把一件在售商品的最新状态合并到列表中（按发布时间倒序插入）"""
+        if not self._goods_matches_filters(goods):
+            self.goods_table.remove([goods['goods_id']])
+            return
+        
+        if self.goods_table.update(goods):
+            return
+        
+        key = (goods['publish_time'], goods['goods_id'])
+        if self.goods_has_more and key < (self.goods_cursor['publish_time'], self.goods_cursor['goods_id']):
+            # 还未加载到的位置，之后滚动分页时自然会加载
+            return
+        
+        rows = self.goods_table.rows
+        index = next((i for i, row in enumerate(rows) if (row['publish_time'], row['goods_id']) < key), len(rows))
+        self.goods_table.insert(index, goods)
 
+    def fetch_balance(self, on_done, owner=None):
+        """后台获取当前余额，完成后在主线程调用 on_done(余额)"""
+        if not self.current_user:
+            return
+        self.tasks.submit(
+            self.network_client.get_user_balance, self.current_user['user_id'],
+            on_done=lambda result: on_done(result.get('balance', 0.0) if result.get('success') else 0.0),
+            owner=owner)
+    
     def refresh_balance(self):
         """刷新余额显示"""
-        if hasattr(self, 'balance_label'):
-            balance = self.get_current_balance()
+        if hasattr(self, 'balance_label') and self.balance_label.winfo_exists():
+            self.fetch_balance(self.set_balance, owner=self.balance_label)
+
+    def set_balance(self, balance):
+        """更新余额显示（余额来自操作结果或服务器推送，无需再请求）"""
+        if hasattr(self, 'balance_label') and self.balance_label.winfo_exists():
             self.balance_label.config(text=f"¥{balance:.2f}")
 
     def check_force_logout(self, response):
@@ -1306,22 +1547,48 @@ class SecondHandSystemGUI:
             return True
         return False
         
-    def schedule_balance_refresh(self):
-        """定期刷新余额"""
-        if hasattr(self, 'balance_label') and self.current_user:
-            self.refresh_balance()
-            # 每30秒刷新一次余额
-            self.root.after(30000, self.schedule_balance_refresh)
+    def start_event_processing(self):
+        """开始处理服务器推送的事件（登录后调用，重复调用不会产生多个定时器）"""
+        if getattr(self, 'event_job', None):
+            self.root.after_cancel(self.event_job)
+        self.event_job = self.root.after(EVENT_POLL_INTERVAL_MS, self.process_server_events)
+
+    def process_server_events(self):
+        """在Tk主线程中处理读线程收到的推送事件：余额变化、商品上架/售出/下架、强制退出"""
+        self.event_job = None
+        if not self.current_user:
+            return
+        
+        goods_changed = False
+        for message in self.network_client.poll_events():
+            event, data = message['event'], message['data']
+            if event == EVENT_FORCE_LOGOUT:
+                messagebox.showerror("账户已被删除", data.get('message', '您的账户已被管理员删除'))
+                self.current_user = None
+                self.network_client.disconnect()
+                self.login_window()
+                return
+            if event == EVENT_BALANCE_CHANGED:
+                self.set_balance(data['balance'])
+            elif event in (EVENT_GOODS_ADDED, EVENT_GOODS_SOLD, EVENT_GOODS_REMOVED):
+                goods_changed = True
+        
+        # 同一批事件只做一次增量同步
+        if goods_changed:
+            self.sync_goods_changes()
+        
+        self.event_job = self.root.after(EVENT_POLL_INTERVAL_MS, self.process_server_events)
 
     def logout(self):
         """退出登录"""
         self.current_user = None
-        self.network_client.disconnect()
+        self.network_client.logout()
         self.login_window()
 
     def run(self):
         """运行应用"""
         self.root.mainloop()
+        self.tasks.shutdown()
 
 if __name__ == "__main__":
     app = SecondHandSystemGUI()
@@ -1,76 +1,405 @@
 import socket
-import json
-from common.config import SERVER_HOST, SERVER_PORT, BUFFER_SIZE
-from common.utils import serialize_data, deserialize_data
+import queue
+import random
+import threading
+import time
+import itertools
+import uuid
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from common.config import (SERVER_HOST, SERVER_PORT, BUFFER_SIZE, GOODS_PAGE_SIZE,
+                           COMPRESSION_THRESHOLD, COMPRESSION_LEVEL, BATCH_TIMEOUT,
+                           CONNECT_TIMEOUT, REQUEST_TIMEOUT, RECONNECT_ATTEMPTS,
+                           RECONNECT_BASE_DELAY, RECONNECT_MAX_DELAY, REQUEST_RETRIES,
+                           KEEPALIVE_IDLE, KEEPALIVE_INTERVAL, KEEPALIVE_PROBES)
+from common.protocol import (HEADER_SIZE, REQUEST_ID_SIZE, EVENT_REQUEST_ID, COMPRESSION_ZLIB,
+                             pack_frame, attach_request_id, unpack_header, unpack_request_id,
+                             compress_payload, decompress_payload, is_event, EVENT_FORCE_LOGOUT)
+from common.codec import JSON_CODEC, available_codecs, get_codec
+
+# 请求ID为32位无符号整数，0 保留给推送事件
+MAX_REQUEST_ID = 0xFFFFFFFF
+
+# 批量导入/批量请求在服务器端的超时为 BATCH_TIMEOUT，客户端多等一个普通请求的超时
+BULK_REQUEST_TIMEOUT = BATCH_TIMEOUT + REQUEST_TIMEOUT
+
+# 不修改数据的动作：因网络错误（断线、超时）失败时重连后可以安全地重发
+RETRYABLE_ACTIONS = frozenset({
+    'hello', 'login', 'resume_session',
+    'get_all_goods', 'get_goods_page', 'get_goods_changes', 'get_goods', 'search_goods',
+    'get_user_goods', 'get_user_orders', 'get_user_balance',
+    'get_all_users', 'get_all_orders', 'get_goods_category_stats', 'get_system_summary',
+    'get_daily_sales_stats', 'get_sales_stats', 'get_server_stats',
+})
+
+# 服务器支持幂等键的写动作：自动附带 idempotency_key，重发时服务器返回首次执行的结果，
+# 因此与只读动作一样可以在网络错误后重试
+IDEMPOTENT_ACTIONS = frozenset({'purchase_goods', 'recharge_balance', 'add_goods'})
+
+
+def _network_error(message):
+    """客户端生成的网络错误响应（服务器未处理或结果未知），network_error 用于判断能否重试"""
+    return {'success': False, 'message': message, 'network_error': True}
 
 class NetworkClient:
     def __init__(self):
         self.client = None
         self.connected = False
+        # 服务器推送的事件，由GUI线程通过 poll_events() 取出处理
+        self.events = queue.Queue()
+        self.force_logout_message = None
+        # 登录时服务器签发的会话令牌，重连后凭它恢复登录状态
+        self.session_token = None
+        self.codec = JSON_CODEC
+        self.compression = False
+        self.request_ids = False
+        # 等待响应的请求：启用请求ID时按ID查找，否则按发送顺序（服务器按序返回）
+        self._pending = {}
+        self._pending_fifo = deque()
+        self._ids = itertools.count(1)
+        self._send_lock = threading.Lock()
+        # 自动重连：成功连接后启用，主动断开（退出登录、强制下线）后停用
+        self._auto_reconnect = False
+        self._reconnect_lock = threading.Lock()
+        self._retry_after = 0.0  # 一轮重连全部失败后，此时刻之前的请求直接失败
+        self._stats_lock = threading.Lock()
+        self._stats = {'connects': 0, 'reconnects': 0, 'reconnect_failures': 0,
+                       'connection_lost': 0, 'timeouts': 0, 'retries': 0}
     
     def connect(self):
-        """连接到服务器"""
+        """连接到服务器，并启动后台读线程"""
         try:
-            self.client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.client.connect((SERVER_HOST, SERVER_PORT))
+            self.client = socket.create_connection((SERVER_HOST, SERVER_PORT), timeout=CONNECT_TIMEOUT)
+            # 读线程阻塞读取，空闲连接不算超时；等待响应的超时由 send_request 按请求判断
+            self.client.settimeout(None)
+            # 管线化请求连续发出多个小帧，关闭Nagle以免等待上一帧的确认
+            self.client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # 空闲时由系统探测对端是否还在（如校园网断线后服务器已无响应），探测失败时读线程
+            # 出错、连接判定失效；单个请求超时不断开连接，断线只靠这里和读写错误发现
+            self.client.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            for option, value in (('TCP_KEEPIDLE', KEEPALIVE_IDLE), ('TCP_KEEPINTVL', KEEPALIVE_INTERVAL),
+                                  ('TCP_KEEPCNT', KEEPALIVE_PROBES)):
+                if hasattr(socket, option):
+                    self.client.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
             self.connected = True
+            self.force_logout_message = None
+            self.codec = JSON_CODEC
+            self.compression = False
+            self.request_ids = False
+            self.events = queue.Queue()
+            self._pending = {}
+            self._pending_fifo = deque()
+            threading.Thread(target=self._read_loop,
+                             args=(self.client, self._pending, self._pending_fifo),
+                             daemon=True).start()
+            # 握手阶段的请求无响应说明连接不可用，放弃这条连接
+            if self._negotiate().get('network_error'):
+                self._connection_lost(self.client)
+            if self.session_token and self.connected and self.resume_session().get('network_error'):
+                self._connection_lost(self.client)
+            if not self.connected:
+                raise ConnectionError('握手过程中连接已断开')
+            self._auto_reconnect = True
+            self._count('connects')
             return True
         except Exception as e:
             print(f"连接服务器失败: {e}")
             return False
     
+    def reconnect(self):
+        """断线后自动重连 - 最多 RECONNECT_ATTEMPTS 次，间隔按指数增长并加随机抖动
+        
+        抖动使同一时刻断线的大量客户端（如校园网闪断）错开重连；重连成功后 connect()
+        凭会话令牌恢复登录。一轮全部失败后的一个退避间隔内，其他请求直接失败而不再等待，
+        每个请求的最长耗时因此有上界。多个线程同时发现断线时只有一个执行重连。
+        """
+        if not self._auto_reconnect:
+            return False
+        with self._reconnect_lock:
+            if self.connected:
+                return True
+            if time.monotonic() < self._retry_after:
+                return False
+            for attempt in range(RECONNECT_ATTEMPTS):
+                if attempt:
+                    time.sleep(random.uniform(0, self._backoff(attempt)))
+                if not self._auto_reconnect:
+                    return False
+                if self.connect():
+                    self._count('reconnects')
+                    return True
+            self._count('reconnect_failures')
+            self._retry_after = time.monotonic() + self._backoff(RECONNECT_ATTEMPTS)
+            return False
+    
+    @staticmethod
+    def _backoff(attempt):
+        return min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * 2 ** attempt)
+    
+    @property
+    def active(self):
+        """已连接，或断线后仍会自动重连（界面据此决定是否发起请求）"""
+        return self.connected or self._auto_reconnect
+    
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+    
+    def get_client_stats(self):
+        """客户端连接统计：连接/重连次数、重连失败、连接失效、响应超时和重试次数"""
+        with self._stats_lock:
+            return dict(self._stats, connected=self.connected)
+    
+    def _mark_lost(self, sock):
+        """连接意外失效（读失败、发送失败、握手无响应），每条连接只记录一次"""
+        with self._stats_lock:
+            if sock is not self.client or not self.connected:
+                return False
+            self.connected = False
+            self._stats['connection_lost'] += 1
+            return True
+    
+    def _connection_lost(self, sock):
+        """判定连接失效并关闭，读线程随之结束，该连接上所有在途请求以网络错误结束"""
+        if self._mark_lost(sock):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+    
+    def _negotiate(self):
+        """连接后握手协商编解码器、帧压缩和请求ID；旧服务器不支持 hello 时保持原协议
+        
+        握手在登录前完成，此时服务器不会推送事件，读线程切换协议不存在竞争。返回握手响应。
+        """
+        response = self._wait(self.client, self.send_request_async('hello', {'codecs': available_codecs(),
+                                               'compression': [COMPRESSION_ZLIB],
+                                               'request_ids': True}), REQUEST_TIMEOUT)
+        if response.get('success'):
+            self.codec = get_codec(response.get('codec')) or JSON_CODEC
+            self.compression = response.get('compression') == COMPRESSION_ZLIB
+            self.request_ids = bool(response.get('request_ids'))
+        return response
+    
+    def resume_session(self):
+        """重连后凭会话令牌恢复登录状态（服务器只查内存会话表，不重新验证密码）
+        
+        令牌失效时清除令牌，之后的请求会提示先登录。
+        """
+        response = self._wait(self.client, self.send_request_async(
+            'resume_session', {'session_token': self.session_token}), REQUEST_TIMEOUT)
+        if not response.get('success') and response.get('session_expired'):
+            self.session_token = None
+        return response
+    
     def disconnect(self):
-        """断开连接"""
+        """主动断开连接（之后不再自动重连）"""
+        self._auto_reconnect = False
         if self.client:
-            self.client.close()
             self.connected = False
+            try:
+                # 先shutdown以唤醒阻塞在recv上的读线程
+                self.client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.client.close()
     
-    def send_request(self, action, data=None):
-        """发送请求到服务器"""
+    def _read_loop(self, sock, pending, pending_fifo):
+        """后台读线程 - 逐帧读取，推送事件放入 events 队列，响应交给对应请求的 Future"""
+        try:
+            while True:
+                header = self._recv_exact(sock, HEADER_SIZE)
+                if not header:
+                    break
+                length, compressed = unpack_header(header)
+                request_id = None
+                if self.request_ids:
+                    id_data = self._recv_exact(sock, REQUEST_ID_SIZE)
+                    if id_data is None:
+                        break
+                    request_id = unpack_request_id(id_data)
+                payload = self._recv_exact(sock, length)
+                if payload is None:
+                    break
+                
+                message = self.codec.decode(decompress_payload(payload) if compressed else payload)
+                if request_id == EVENT_REQUEST_ID or (request_id is None and is_event(message)):
+                    if message['event'] == EVENT_FORCE_LOGOUT:
+                        # 服务器已撤销该用户的会话，令牌不能再用于恢复
+                        self.session_token = None
+                        self.force_logout_message = message['data'].get('message')
+                    self.events.put(message)
+                    continue
+                
+                with self._send_lock:
+                    if request_id is None:
+                        future = pending_fifo.popleft() if pending_fifo else None
+                    else:
+                        future = pending.pop(request_id, None)
+                if future is not None:
+                    future.set_result(message)
+        except (OSError, ValueError) as e:
+            if self.connected and sock is self.client:
+                print(f"接收数据失败: {e}")
+        finally:
+            self._mark_lost(sock)
+            # 连接断开：所有等待中的请求以失败结束
+            with self._send_lock:
+                futures = list(pending.values()) + list(pending_fifo)
+                pending.clear()
+                pending_fifo.clear()
+            for future in futures:
+                future.set_result(_network_error('与服务器的连接已断开'))
+    
+    def poll_events(self):
+        """取出所有已收到的推送事件（不阻塞）"""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+    
+    def send_request_async(self, action, data=None):
+        """发送请求但不等待响应，返回 concurrent.futures.Future，结果为响应字典
+        
+        启用请求ID时多个请求可同时在途，服务器并发处理、乱序返回；
+        有先后依赖的请求（如先登录再查询）应等前一个完成后再发送。
+        """
+        future = Future()
+        sock = self.client
         if not self.connected:
-            return {'success': False, 'message': '未连接到服务器'}
+            future.set_result(_network_error('未连接到服务器'))
+            return future
         
+        request = {'action': action, 'data': data or {}}
+        # 编码一次得到字节，长度头（+ 请求ID）+ 数据一次发送
+        frame = self._build_frame(self.codec.encode(request))
+        with self._send_lock:
+            if self.request_ids:
+                request_id = (next(self._ids) - 1) % MAX_REQUEST_ID + 1
+                frame = attach_request_id(frame, request_id)
+                self._pending[request_id] = future
+                future.request_id = request_id
+            else:
+                self._pending_fifo.append(future)
+            try:
+                sock.sendall(frame)
+            except Exception as e:
+                print(f"发送请求失败: {e}")
+                if self.request_ids:
+                    self._pending.pop(request_id, None)
+                else:
+                    self._pending_fifo.remove(future)
+                future.set_result(_network_error('网络请求失败'))
+                failed = True
+            else:
+                failed = False
+        if failed:
+            # 发送失败说明连接已失效，关闭后下一个请求会自动重连
+            self._connection_lost(sock)
+        return future
+    
+    def _wait(self, sock, future, timeout):
+        """等待响应，超时只让该请求失败，同一连接上的其他在途请求不受影响
+        
+        未启用请求ID时响应按发送顺序匹配，放弃一个请求会使之后的响应错位，只能判定连接失效。
+        """
         try:
-            request = {'action': action, 'data': data or {}}
-            request_data = serialize_data(request)
-            request_bytes = request_data.encode('utf-8')
-            
-            # 发送数据长度头
-            request_length = len(request_bytes)
-            self.client.send(request_length.to_bytes(4, byteorder='big'))
-            # 发送实际数据
-            self.client.send(request_bytes)
-            
-            # 接收响应长度头
-            length_data = self._recv_exact(4)
-            if not length_data:
-                return {'success': False, 'message': '接收响应长度失败'}
-            
-            response_length = int.from_bytes(length_data, byteorder='big')
-            
-            # 接收完整响应数据
-            response_bytes = self._recv_exact(response_length)
-            if not response_bytes:
-                return {'success': False, 'message': '接收响应数据失败'}
-            
-            response = deserialize_data(response_bytes.decode('utf-8'))
-            
-            # 检查是否需要强制退出
-            if response.get('force_logout'):
-                # 断开连接并返回特殊标志
-                self.disconnect()
-                response['force_logout_disconnected'] = True
-            
-            return response
-        except Exception as e:
-            print(f"发送请求失败: {e}")
-            return {'success': False, 'message': '网络请求失败'}
+            return future.result(timeout=max(0.0, timeout))
+        except FutureTimeoutError:
+            self._count('timeouts')
+            if not self._abandon(future):
+                self._connection_lost(sock)
+            return _network_error('服务器响应超时')
     
-    def _recv_exact(self, length):
+    def _abandon(self, future):
+        """放弃一个按请求ID等待的请求：移出等待表，读线程收到它迟到的响应时直接丢弃"""
+        request_id = getattr(future, 'request_id', None)
+        if request_id is None:
+            return False
+        with self._send_lock:
+            if self._pending.get(request_id) is future:
+                del self._pending[request_id]
+        return True
+    
+    def _call(self, requests, timeout):
+        """发送一组请求并等待全部响应 - 未连接时先自动重连，网络错误时全部为只读动作才重试
+        
+        写操作因网络错误失败时服务器可能已经执行，只有带幂等键的才自动重发（沿用同一个键）。
+        """
+        retryable = all(action in RETRYABLE_ACTIONS or (data or {}).get('idempotency_key')
+                        for action, data in requests)
+        retries = REQUEST_RETRIES if retryable else 0
+        for attempt in range(retries + 1):
+            if attempt:
+                self._count('retries')
+            if not self.connected and not self.reconnect():
+                return [_network_error('未连接到服务器') for _ in requests]
+            sock = self.client
+            futures = [self.send_request_async(action, data) for action, data in requests]
+            deadline = time.monotonic() + timeout
+            responses = [self._wait(sock, future, deadline - time.monotonic()) for future in futures]
+            if not any(response.get('network_error') for response in responses):
+                break
+        return responses
+    
+    def send_request(self, action, data=None, timeout=REQUEST_TIMEOUT):
+        """发送请求到服务器，并等待读线程收到对应的响应（最长 timeout 秒）"""
+        if action in IDEMPOTENT_ACTIONS:
+            data = self.with_idempotency_key(data)
+        response = self._call([(action, data)], timeout)[0]
+        
+        # 检查是否收到了强制退出事件
+        if self.force_logout_message:
+            self.disconnect()
+            return {
+                'success': False,
+                'message': self.force_logout_message,
+                'force_logout': True,
+                'force_logout_disconnected': True
+            }
+        return response
+    
+    @staticmethod
+    def with_idempotency_key(data):
+        """为一次写请求生成幂等键（已带键时保持不变），同一次调用的所有重试共用这个键"""
+        data = dict(data or {})
+        data.setdefault('idempotency_key', uuid.uuid4().hex)
+        return data
+    
+    def pipeline(self, requests, timeout=REQUEST_TIMEOUT):
+        """管线化发送多个互不依赖的请求 [(action, data), ...]，按顺序返回各自的响应
+        
+        所有请求先全部发出再统一等待，总耗时约为一次往返而不是 N 次。
+        """
+        return self._call(requests, timeout)
+    
+    def batch(self, requests, transactional=False):
+        """在一个请求中按顺序执行多个动作 [(action, data), ...]，结果在响应的 results 中
+        
+        transactional=True 时全部成功才提交，任一失败则整体回滚。
+        """
+        return self.send_request('batch', {
+            'requests': [{'action': action, 'data': data or {}} for action, data in requests],
+            'transactional': transactional
+        }, timeout=BULK_REQUEST_TIMEOUT)
+    
+    def _build_frame(self, payload):
+        """请求帧 - 服务器支持压缩且超过阈值时压缩（如批量上架）"""
+        if self.compression and len(payload) >= COMPRESSION_THRESHOLD:
+            compressed = compress_payload(payload, COMPRESSION_LEVEL)
+            if compressed is not None:
+                return pack_frame(compressed, compressed=True)
+        return pack_frame(payload)
+    
+    @staticmethod
+    def _recv_exact(sock, length):
         """精确接收指定长度的数据"""
         data = b''
         while len(data) < length:
-            chunk = self.client.recv(length - len(data))
+            chunk = sock.recv(length - len(data))
             if not chunk:
                 return None
             data += chunk
@@ -84,17 +413,66 @@ class NetworkClient:
             'contact': contact
         })
     
+    def bulk_register_users(self, users):
+        """批量注册用户（管理员功能），users 为 [{'username', 'password', 'contact'}, ...]"""
+        return self.send_request('bulk_register_users', {
+            'users': users
+        }, timeout=BULK_REQUEST_TIMEOUT)
+    
     def login(self, username, password):
-        """用户登录"""
-        return self.send_request('login', {
+        """用户登录，成功后记住会话令牌"""
+        response = self.send_request('login', {
             'username': username,
             'password': password
         })
+        if response.get('success'):
+            self.session_token = response.get('session_token')
+        return response
+    
+    def logout(self):
+        """退出登录：撤销会话令牌并断开连接（不等待响应）"""
+        if self.connected and self.session_token:
+            self.send_request_async('logout')
+        self.session_token = None
+        self.disconnect()
     
     def get_all_goods(self):
         """获取所有商品"""
         return self.send_request('get_all_goods')
     
+    def get_goods_page(self, cursor=None, limit=GOODS_PAGE_SIZE, category=None,
+                       min_price=None, max_price=None, seller_id=None):
+        """分页获取在售商品，cursor 传上一页返回的 next_cursor"""
+        return self.send_request('get_goods_page', {
+            'cursor': cursor,
+            'limit': limit,
+            'category': category,
+            'min_price': min_price,
+            'max_price': max_price,
+            'seller_id': seller_id
+        })
+    
+    def get_goods_changes(self, since_version):
+        """增量同步商品，since_version 传上次同步（或首页）返回的 version"""
+        return self.send_request('get_goods_changes', {
+            'since_version': since_version
+        })
+    
+    def get_goods(self, goods_id):
+        """按ID获取单个商品"""
+        return self.send_request('get_goods', {
+            'goods_id': goods_id
+        })
+    
+    def search_goods(self, keyword, category=None, limit=GOODS_PAGE_SIZE, offset=0):
+        """全文搜索在售商品（按相关度排序），offset 传上一页返回的 next_offset"""
+        return self.send_request('search_goods', {
+            'keyword': keyword,
+            'category': category,
+            'limit': limit,
+            'offset': offset
+        })
+    
     def add_goods(self, name, category, price, description, seller_id):
         """添加商品"""
         return self.send_request('add_goods', {
@@ -105,6 +483,12 @@ class NetworkClient:
             'seller_id': seller_id
         })
     
+    def bulk_add_goods(self, goods):
+        """批量发布商品，goods 为 [{'name', 'category', 'price', 'description', 'seller_id'}, ...]"""
+        return self.send_request('bulk_add_goods', {
+            'goods': goods
+        }, timeout=BULK_REQUEST_TIMEOUT)
+    
     def get_user_goods(self, user_id):
         """获取用户商品"""
         return self.send_request('get_user_goods', {
@@ -179,6 +563,22 @@ class NetworkClient:
         """获取商品类别统计"""
         return self.send_request('get_goods_category_stats')
 
+    def check_category_stats(self, repair=False):
+        """检查类别计数与商品表是否一致，repair=True 时重建计数"""
+        return self.send_request('check_category_stats', {'repair': repair})
+
+    def get_system_summary(self):
+        """获取系统概况：用户、商品、订单数量和交易额（不下载完整列表）"""
+        return self.send_request('get_system_summary')
+
     def get_daily_sales_stats(self):
         """获取每日销量统计"""
-        return self.send_request('get_daily_sales_stats')
\ No newline at end of file
+        return self.send_request('get_daily_sales_stats')
+
+    def get_sales_stats(self, start=None, end=None, granularity='day'):
+        """按时间范围和粒度（day/week/month）获取销售统计，日期为 'YYYY-MM-DD'"""
+        return self.send_request('get_sales_stats', {'start': start, 'end': end, 'granularity': granularity})
+
+    def get_server_stats(self):
+        """获取服务器运行统计（连接池命中率等）"""
+        return self.send_request('get_server_stats')
\ No newline at end of file
@@ -0,0 +1,167 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from common.config import GUI_WORKERS, GUI_RESULT_POLL_MS
+
+
+class Task:
+    """一个后台任务的句柄 - cancel() 后即使任务已完成，结果也不会再交回界面"""
+
+    __slots__ = ('future', 'owner', 'key', 'busy', 'on_done', 'on_error', 'cancelled')
+
+    def __init__(self, owner, key, busy, on_done, on_error):
+        self.future = None
+        self.owner = owner
+        self.key = key
+        self.busy = busy
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancelled = False
+
+    def cancel(self):
+        """取消任务：尚未开始的不再执行，已在执行的结果被丢弃"""
+        self.cancelled = True
+
+
+class TaskRunner:
+    """在工作线程中执行网络请求，结果经队列交回Tk主线程处理，界面不会因等待响应而卡住
+
+    - owner：结果所属的窗口/控件，被销毁后其未完成的任务全部取消，回调不再执行
+    - key：同一 key 只保留最新的任务，新任务提交时取消旧任务（如重复点击刷新）
+    - busy：任务执行期间禁用的按钮等控件，完成后恢复
+
+    Tk 不是线程安全的，工作线程中不能操作控件；需要更新界面时用 post() 交回主线程。
+    """
+
+    def __init__(self, root, workers=GUI_WORKERS, poll_ms=GUI_RESULT_POLL_MS):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gui-worker')
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._keyed = {}
+        self._owned = {}  # 控件路径名 -> 该控件的未完成任务
+        self._poll_job = None
+        self._closed = False
+
+    def submit(self, func, *args, on_done=None, on_error=None, owner=None, key=None, busy=()):
+        """在工作线程中执行 func(*args)，完成后在主线程调用 on_done(结果) 或 on_error(异常)"""
+        task = Task(owner, key, [widget for widget in busy if widget is not None], on_done, on_error)
+        if key is not None:
+            stale = self._keyed.get(key)
+            if stale is not None:
+                self._finish(stale)
+                stale.cancel()
+            self._keyed[key] = task
+        if owner is not None:
+            self._watch_owner(owner, task)
+        for widget in task.busy:
+            widget.configure(state='disabled')
+        self.root.configure(cursor='watch')
+
+        with self._lock:
+            self._pending.add(task)
+        task.future = self._executor.submit(self._run, task, func, args)
+        self._schedule_poll()
+        return task
+
+    def post(self, callback, *args):
+        """从工作线程请求在主线程执行 callback(*args)（如追加日志）"""
+        self._results.put((None, callback, args))
+
+    def cancel_key(self, key):
+        """取消某个 key 的未完成任务（如列表整体刷新后旧的分页请求已过期）"""
+        task = self._keyed.get(key)
+        if task is not None:
+            task.cancel()
+            self._finish(task)
+
+    def cancel_owner(self, owner):
+        """取消某个控件的全部未完成任务"""
+        for task in self._owned.pop(str(owner), ()):
+            task.cancel()
+            self._finish(task)
+
+    def _watch_owner(self, owner, task):
+        name = str(owner)
+        if name not in self._owned:
+            self._owned[name] = set()
+            # 绑定在顶层窗口上的 <Destroy> 对其子控件也会触发，只处理 owner 本身
+            owner.bind('<Destroy>', lambda event: event.widget is owner and self.cancel_owner(owner), add='+')
+        self._owned[name].add(task)
+
+    def _run(self, task, func, args):
+        if task.cancelled:
+            # 仍放入结果队列，由主线程统一收尾（恢复忙碌控件等）
+            self._results.put((task, True, None))
+            return
+        try:
+            result = func(*args)
+        except Exception as e:
+            self._results.put((task, False, e))
+        else:
+            self._results.put((task, True, result))
+
+    def _schedule_poll(self):
+        if self._poll_job is None and not self._closed:
+            self._poll_job = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        """在主线程中取出已完成的结果并调用回调"""
+        self._poll_job = None
+        while True:
+            try:
+                task, ok, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if task is None:
+                # post() 提交的界面回调
+                self._call(ok, *value)
+                continue
+            self._finish(task)
+            if task.cancelled or (task.owner is not None and not task.owner.winfo_exists()):
+                continue
+            if ok:
+                if task.on_done is not None:
+                    self._call(task.on_done, value)
+            elif task.on_error is not None:
+                self._call(task.on_error, value)
+            else:
+                print(f"后台任务执行失败: {value}")
+
+        with self._lock:
+            idle = not self._pending
+        if not idle or not self._results.empty():
+            self._schedule_poll()
+
+    def _finish(self, task):
+        """任务结束（完成或取消）：恢复忙碌控件，移出各索引"""
+        with self._lock:
+            if task not in self._pending:
+                return
+            self._pending.discard(task)
+            idle = not self._pending
+        if self._keyed.get(task.key) is task:
+            del self._keyed[task.key]
+        if task.owner is not None:
+            self._owned.get(str(task.owner), set()).discard(task)
+        for widget in task.busy:
+            if widget.winfo_exists():
+                widget.configure(state='normal')
+        if idle and not self._closed:
+            self.root.configure(cursor='')
+
+    @staticmethod
+    def _call(callback, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"界面回调执行失败: {e}")
+
+    def shutdown(self):
+        """关闭工作线程池（不等待进行中的请求）"""
+        self._closed = True
+        for task in list(self._pending):
+            task.cancel()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,257 @@
+import ttkbootstrap as tb
+from tkinter import VERTICAL, HORIZONTAL
+
+
+class VirtualTable(tb.Frame):
+    """虚拟化表格 - Treeview 中只保留一屏的行，滚动时复用这些行显示数据数组中的不同位置
+
+    数据保存在内存数组 rows 中（每行一个 dict），Treeview 的行数只取决于窗口高度，
+    与数据量无关：几万行数据的加载、清空和排序都不再逐行 insert/delete。
+
+    - columns：(标题, 字段名, 列宽) 的序列，点击标题按该字段排序（只排内存数组）
+    - format_row：把一行数据转换为各列显示的值
+    - key：行的唯一标识，用于选中状态跟踪和按标识更新/删除
+    - on_need_more：滚动到距末尾不足一屏时调用，用于从服务器分页加载下一页
+    """
+
+    SCROLL_UNITS = 3  # 鼠标滚轮每格滚动的行数
+
+    def __init__(self, master, columns, format_row, key, on_need_more=None,
+                 bootstyle=None, horizontal=False, **kwargs):
+        super().__init__(master, **kwargs)
+        self.columns = list(columns)
+        self.format_row = format_row
+        self.key = key
+        self.on_need_more = on_need_more
+
+        self.rows = []
+        self._by_key = {}
+        self._offset = 0        # 第一个可见行在 rows 中的下标
+        self._visible = 1       # 一屏可显示的行数
+        self._slots = []        # 复用的 Treeview 行
+        self._shown = 0         # 当前挂在 Treeview 上的行数
+        self._selected = None   # 选中行的 key（与行在屏幕上的位置无关）
+        self._sort_field = None
+        self._sort_reverse = False
+
+        tree_options = {'bootstyle': bootstyle} if bootstyle else {}
+        self.tree = tb.Treeview(self, columns=[field for _, field, _ in self.columns],
+                                show="headings", selectmode="browse", **tree_options)
+        for title, field, width in self.columns:
+            self.tree.heading(field, text=title, command=lambda f=field: self.sort_by(f))
+            self.tree.column(field, width=width, stretch=width > 0)
+
+        self.scrollbar_y = tb.Scrollbar(self, orient=VERTICAL, command=self.yview)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar_y.grid(row=0, column=1, sticky="ns")
+        if horizontal:
+            scrollbar_x = tb.Scrollbar(self, orient=HORIZONTAL, command=self.tree.xview)
+            self.tree.configure(xscrollcommand=scrollbar_x.set)
+            scrollbar_x.grid(row=1, column=0, sticky="ew")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.tree.bind('<Configure>', self._on_resize)
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.tree.bind(sequence, self._on_wheel)
+        keys = {'<Up>': -1, '<Down>': 1, '<Prior>': 'page-up', '<Next>': 'page-down',
+                '<Home>': 'home', '<End>': 'end'}
+        for sequence, move in keys.items():
+            self.tree.bind(sequence, lambda event, m=move: self._on_key(m))
+
+    # ---------- 数据 ----------
+
+    def set_rows(self, rows):
+        """整体替换数据（不逐行删除/插入，只重绘可见行）"""
+        self.rows = list(rows)
+        self._by_key = {self.key(row): row for row in self.rows}
+        self._offset = 0
+        if self._selected not in self._by_key:
+            self._selected = None
+        self._apply_sort()
+        self._render()
+
+    def clear(self):
+        self.set_rows([])
+
+    def append(self, rows):
+        """追加一页数据；已存在的 key 就地更新"""
+        for row in rows:
+            old = self._by_key.get(self.key(row))
+            if old is not None:
+                old.clear()
+                old.update(row)
+            else:
+                self.rows.append(row)
+                self._by_key[self.key(row)] = row
+        self._apply_sort()
+        self._render()
+
+    def insert(self, index, row):
+        """在 index 处插入一行（按列排序时插入位置由排序决定）"""
+        self.rows.insert(index, row)
+        self._by_key[self.key(row)] = row
+        self._apply_sort()
+        self._render()
+
+    def update(self, row):
+        """按 key 就地更新一行，返回该行是否存在"""
+        old = self._by_key.get(self.key(row))
+        if old is None:
+            return False
+        old.clear()
+        old.update(row)
+        self._apply_sort()
+        self._render()
+        return True
+
+    def remove(self, keys):
+        """按 key 删除若干行"""
+        keys = {key for key in keys if key in self._by_key}
+        if not keys:
+            return
+        self.rows = [row for row in self.rows if self.key(row) not in keys]
+        for key in keys:
+            del self._by_key[key]
+        if self._selected in keys:
+            self._selected = None
+        self._render()
+
+    def exists(self, key):
+        return key in self._by_key
+
+    def get(self, key):
+        return self._by_key.get(key)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def selected(self):
+        """当前选中行的数据，未选中时返回 None"""
+        return self._by_key.get(self._selected)
+
+    # ---------- 排序 ----------
+
+    def sort_by(self, field):
+        """按字段排序，重复点击同一列切换升序/降序；只对内存数组排序并重绘可见行"""
+        if self._sort_field == field:
+            self._sort_reverse = not self._sort_reverse
+        else:
+            self._sort_field, self._sort_reverse = field, False
+        for title, column, _ in self.columns:
+            arrow = (" ▼" if self._sort_reverse else " ▲") if column == field else ""
+            self.tree.heading(column, text=title + arrow)
+        self._apply_sort()
+        self._offset = 0
+        self._render()
+
+    def _apply_sort(self):
+        if self._sort_field is None:
+            return
+        field = self._sort_field
+
+        def sort_key(row):
+            # 空值排在最后；数据基本有序时 Timsort 接近线性
+            value = row.get(field)
+            return (value is None, value if value is not None else 0)
+
+        self.rows.sort(key=sort_key, reverse=self._sort_reverse)
+
+    # ---------- 滚动与绘制 ----------
+
+    def yview(self, *args):
+        """滚动条回调：moveto 比例 / scroll 行数或页数"""
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self._scroll_to(int(float(args[1]) * len(self.rows)))
+        elif args[0] == 'scroll':
+            step = self._visible if args[2] == 'pages' else 1
+            self._scroll_to(self._offset + int(args[1]) * step)
+
+    def see(self, index):
+        """滚动使第 index 行可见"""
+        if index < self._offset:
+            self._scroll_to(index)
+        elif index >= self._offset + self._visible:
+            self._scroll_to(index - self._visible + 1)
+
+    def _scroll_to(self, offset):
+        offset = max(0, min(offset, len(self.rows) - self._visible))
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+
+    def _on_resize(self, event):
+        """窗口高度变化时调整复用行的数量（只算完整可见的行，Treeview 自身不会滚动）"""
+        header, row_height = 25, 20
+        if self._shown:
+            bbox = self.tree.bbox(self._slots[0])
+            if bbox:
+                header, row_height = bbox[1], bbox[3]
+        visible = max(1, (event.height - header) // row_height)
+        if visible != self._visible:
+            self._visible = visible
+            self._offset = max(0, min(self._offset, len(self.rows) - visible))
+            self._render()
+
+    def _render(self):
+        """把 rows[offset:offset+visible] 写入复用行，只改动这一屏"""
+        self._offset = max(0, min(self._offset, len(self.rows) - self._visible))
+        count = max(0, min(self._visible, len(self.rows) - self._offset))
+        while len(self._slots) < count:
+            slot = self.tree.insert("", "end")
+            self.tree.detach(slot)
+            self._slots.append(slot)
+        for slot in self._slots[count:self._shown]:
+            self.tree.detach(slot)
+        for index in range(self._shown, count):
+            self.tree.move(self._slots[index], "", index)
+        self._shown = count
+
+        selection = ()
+        for index in range(count):
+            row = self.rows[self._offset + index]
+            self.tree.item(self._slots[index], values=self.format_row(row))
+            if self._selected is not None and self.key(row) == self._selected:
+                selection = (self._slots[index],)
+        self.tree.selection_set(selection)
+
+        total = len(self.rows)
+        if total:
+            self.scrollbar_y.set(self._offset / total, (self._offset + count) / total)
+        else:
+            self.scrollbar_y.set(0, 1)
+
+        if self.on_need_more and self._offset + 2 * self._visible >= total:
+            self.on_need_more()
+
+    def _on_select(self, event):
+        # 选中事件是异步送达的，重绘时选中行滚出屏幕会清空选择，此时保留原选中
+        selection = self.tree.selection()
+        if selection and selection[0] in self._slots[:self._shown]:
+            index = self._offset + self._slots.index(selection[0])
+            self._selected = self.key(self.rows[index])
+
+    def _on_wheel(self, event):
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            self._scroll_to(self._offset - self.SCROLL_UNITS)
+        else:
+            self._scroll_to(self._offset + self.SCROLL_UNITS)
+        return "break"
+
+    def _on_key(self, move):
+        """方向键/翻页键在整个数据数组中移动选中行"""
+        if not self.rows:
+            return "break"
+        row = self.selected()
+        current = self.rows.index(row) if row is not None else self._offset - 1
+        targets = {'page-up': current - self._visible, 'page-down': current + self._visible,
+                   'home': 0, 'end': len(self.rows) - 1}
+        target = targets[move] if move in targets else current + move
+        index = max(0, min(target, len(self.rows) - 1))
+        self._selected = self.key(self.rows[index])
+        self.see(index)
+        self._render()
+        return "break"
@@ -0,0 +1,64 @@
+# 编解码层：连接建立后通过 hello 握手协商，未握手（旧客户端）时使用JSON
+
+import json
+
+try:
+    import msgpack
+except ImportError:  # msgpack 为可选依赖，未安装时只提供JSON
+    msgpack = None
+
+
+class JsonCodec:
+    """JSON编解码（默认，兼容旧客户端）"""
+
+    name = 'json'
+
+    def encode(self, obj):
+        """对象 -> 字节（一次完成序列化和UTF-8编码）"""
+        return json.dumps(obj, ensure_ascii=False, default=str, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, data):
+        """字节 -> 对象，格式错误时抛出 ValueError"""
+        return json.loads(data)
+
+
+class MsgpackCodec:
+    """MessagePack二进制编解码 - 比JSON更紧凑，编解码更快"""
+
+    name = 'msgpack'
+
+    def encode(self, obj):
+        return msgpack.packb(obj, use_bin_type=True, default=str)
+
+    def decode(self, data):
+        try:
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+        except Exception as e:
+            raise ValueError(str(e)) from e
+
+
+JSON_CODEC = JsonCodec()
+
+# 按优先级排列的可用编解码器
+CODECS = {}
+if msgpack is not None:
+    CODECS[MsgpackCodec.name] = MsgpackCodec()
+CODECS[JsonCodec.name] = JSON_CODEC
+
+
+def available_codecs():
+    """本端支持的编解码器名称（按优先级）"""
+    return list(CODECS)
+
+
+def get_codec(name):
+    """按名称获取编解码器，不支持时返回None"""
+    return CODECS.get(name)
+
+
+def negotiate(offered):
+    """服务器端协商：按本端优先级选出对端也支持的编解码器，没有交集时使用JSON"""
+    for name in CODECS:
+        if name in (offered or ()):
+            return CODECS[name]
+    return JSON_CODEC
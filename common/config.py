@@ -8,9 +8,83 @@ SERVER_PORT = 8889
 
 BUFFER_SIZE = 1048576
 
+# 帧压缩配置：双方握手时都支持zlib时，超过阈值的帧压缩后发送
+COMPRESSION_THRESHOLD = 4096   # 字节，小于该长度的帧不压缩
+COMPRESSION_LEVEL = 6          # zlib压缩级别（1最快，9压缩率最高）
+
+# 客户端处理服务器推送事件的间隔（毫秒），只检查本地队列，不产生网络请求
+EVENT_POLL_INTERVAL_MS = 200
+
+# 客户端连接与重试：超时后判定连接已失效，断线后自动重连（指数退避 + 随机抖动）
+CONNECT_TIMEOUT = 5.0         # 建立连接的超时（秒）
+REQUEST_TIMEOUT = 15.0        # 等待单个响应的超时（秒），应大于服务器的 ACTION_TIMEOUT
+RECONNECT_ATTEMPTS = 3        # 每次自动重连最多尝试的次数
+RECONNECT_BASE_DELAY = 0.2    # 重连退避的基础间隔（秒），第 n 次重试前最多等待 base * 2^n
+RECONNECT_MAX_DELAY = 5.0     # 单次退避的最长间隔（秒）
+REQUEST_RETRIES = 2           # 只读请求因网络错误失败后的最多重试次数
+# TCP保活：服务器无响应（如校园网断线）时由系统探测判定连接失效，单个请求超时不会断开连接
+KEEPALIVE_IDLE = 10           # 连接空闲多少秒后开始探测
+KEEPALIVE_INTERVAL = 5        # 探测间隔（秒）
+KEEPALIVE_PROBES = 3          # 连续多少次探测无应答即判定连接失效
+
+# 客户端界面的后台请求：网络请求在工作线程中执行，结果按该间隔交回Tk主线程
+GUI_WORKERS = 4
+GUI_RESULT_POLL_MS = 30
+
+# 客户端启动耗时目标（毫秒）：python main.py client --startup-time 测量到登录窗口显示的时间
+STARTUP_TARGET_MS = 300
+
+# 服务器引擎配置
+SERVER_ENGINE = 'thread'  # 'thread'：每连接一个线程；'asyncio'：单事件循环 + 有界线程池
+SERVER_BACKLOG = 128      # listen() 等待队列长度
+
+# 请求分发配置：只读请求与写请求分别在独立的线程池中执行
+READ_WORKERS = 16
+WRITE_WORKERS = 4
+ACTION_TIMEOUT = 10.0     # 默认动作超时（秒）
+
+# 批量请求配置：一帧内按顺序执行多个动作
+BATCH_MAX_REQUESTS = 500  # 单个批量请求最多包含的子请求数
+BATCH_TIMEOUT = 60.0      # 批量请求超时（秒）
+BULK_MAX_ROWS = 10000     # bulk_register_users / bulk_add_goods 单次最多导入的行数
+
 # 数据库配置
 DATABASE_NAME = 'campus_secondhand.db'
 
+# 数据库连接池配置
+# 最大连接数：读/写线程池的每个工作线程各一个，另留出时间戳迁移线程等的余量，
+# 避免工作线程排队等连接、超过 DB_POOL_TIMEOUT 后请求失败
+DB_POOL_SIZE = READ_WORKERS + WRITE_WORKERS + 2
+DB_POOL_TIMEOUT = 5.0                 # 连接池已满时的最长等待时间（秒）
+DB_POOL_HEALTH_CHECK_INTERVAL = 30.0  # 空闲超过该时长（秒）的连接在复用前做健康检查
+BALANCE_UPDATE_RETRIES = 3            # 余额乐观锁更新因并发修改失败后的最多重试次数
+
+# 商品分页配置
+GOODS_PAGE_SIZE = 50   # 默认每页条数
+GOODS_PAGE_MAX = 200   # 单页最大条数
+GOODS_CHANGES_MAX = 500  # 增量同步单次最多返回的变化条数
+
+# 销售统计：按日/周/月汇总表查询，单次最多返回的统计周期数
+SALES_STATS_MAX_PERIODS = 400
+
+# 整数时间戳迁移：旧数据库启动时在后台按批回填，每批一个短写事务
+TIMESTAMP_MIGRATION_BATCH = 2000    # 每批回填的行数
+TIMESTAMP_MIGRATION_PAUSE = 0.01    # 批次之间让出写锁的时间（秒）
+
+# 登录会话：断线重连后凭令牌恢复登录，无需重新验证密码
+SESSION_TTL = 1800.0                # 最后一个连接断开后会话可恢复的时长（秒）
+
+# 幂等键：purchase_goods / recharge_balance / add_goods 带 idempotency_key 时，重复请求返回首次结果
+IDEMPOTENCY_TTL = 600.0             # 幂等键保留时长（秒），应大于客户端重试的总时长
+IDEMPOTENCY_MAX_ENTRIES = 10000     # 最多保留的幂等键数，超出时淘汰最早的已完成记录
+
+# 商品目录缓存配置：缓存已编码的商品列表响应，商品发生变化时整体失效
+CATALOGUE_CACHE_TTL = 30.0          # 缓存条目最长存活时间（秒），0 表示不缓存
+CATALOGUE_CACHE_MAX_ENTRIES = 64    # 最多缓存的响应条数（不同分页/筛选条件各占一条）
+
+# 系统概况（get_system_summary）缓存：只按时间过期，写操作不使其失效
+SUMMARY_CACHE_TTL = 5.0             # 秒，0 表示不缓存
+
 # 用户角色
 USER_ROLE = 'user'
 ADMIN_ROLE = 'admin'
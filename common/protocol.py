@@ -0,0 +1,87 @@
+# 网络协议：每帧 = 4字节大端长度头 + 编码后的数据（JSON或握手协商的编解码器）
+# 长度头最高位为压缩标志：置位时数据为zlib压缩后的内容（仅对握手时声明支持压缩的对端使用）
+# 握手启用请求ID后，长度头之后还有4字节请求ID（长度不含该字段），响应带回请求的ID，
+# 推送事件的ID为0；未启用时响应按请求顺序返回
+# 服务器主动推送的事件帧带 'type': 'event' 字段，其余帧均为请求的响应
+
+import zlib
+
+HEADER_SIZE = 4
+REQUEST_ID_SIZE = 4
+EVENT_REQUEST_ID = 0
+COMPRESSED_FLAG = 0x80000000
+LENGTH_MASK = 0x7FFFFFFF
+COMPRESSION_ZLIB = 'zlib'
+MAX_DECOMPRESSED_SIZE = 256 * 1024 * 1024  # 解压后的上限，防止压缩炸弹
+
+# 推送事件
+MESSAGE_TYPE_EVENT = 'event'
+EVENT_BALANCE_CHANGED = 'balance_changed'  # 余额变化：{'user_id', 'balance'}
+EVENT_GOODS_ADDED = 'goods_added'          # 新商品上架：{'goods_id'}
+EVENT_GOODS_SOLD = 'goods_sold'            # 商品售出：{'goods_id'}
+EVENT_GOODS_REMOVED = 'goods_removed'      # 商品下架：{'goods_id'}，卖家被删除时为 {'seller_id'}
+EVENT_FORCE_LOGOUT = 'force_logout'        # 账户被删除，强制退出：{'message'}
+
+
+class Frame(bytes):
+    """完整的一帧（长度头 + 数据），raw_size 为压缩前的数据长度"""
+
+    raw_size = 0
+    compressed = False
+
+
+def pack_frame(payload, compressed=False, raw_size=None):
+    """为数据加上长度头（压缩时置标志位），得到完整的一帧"""
+    header = len(payload) | (COMPRESSED_FLAG if compressed else 0)
+    frame = Frame(header.to_bytes(HEADER_SIZE, byteorder='big') + payload)
+    frame.raw_size = len(payload) if raw_size is None else raw_size
+    frame.compressed = compressed
+    return frame
+
+
+def attach_request_id(frame, request_id):
+    """在长度头之后插入请求ID（保留压缩标志和原始长度信息）"""
+    tagged = Frame(frame[:HEADER_SIZE] + request_id.to_bytes(REQUEST_ID_SIZE, byteorder='big')
+                   + frame[HEADER_SIZE:])
+    tagged.raw_size = frame.raw_size
+    tagged.compressed = frame.compressed
+    return tagged
+
+
+def unpack_request_id(data):
+    """解析4字节请求ID"""
+    return int.from_bytes(data, byteorder='big')
+
+
+def unpack_header(header):
+    """从长度头解析 (数据长度, 是否压缩)"""
+    value = int.from_bytes(header, byteorder='big')
+    return value & LENGTH_MASK, bool(value & COMPRESSED_FLAG)
+
+
+def compress_payload(payload, level):
+    """zlib压缩，压缩后没有变小时返回None"""
+    compressed = zlib.compress(payload, level)
+    return compressed if len(compressed) < len(payload) else None
+
+
+def decompress_payload(payload):
+    """zlib解压，数据损坏或解压后超过上限时抛出 ValueError"""
+    try:
+        decompressor = zlib.decompressobj()
+        data = decompressor.decompress(payload, MAX_DECOMPRESSED_SIZE)
+    except zlib.error as e:
+        raise ValueError(f'解压失败: {e}') from e
+    if decompressor.unconsumed_tail:
+        raise ValueError('解压后数据过大')
+    return data
+
+
+def make_event(event, data):
+    """构造推送事件消息"""
+    return {'type': MESSAGE_TYPE_EVENT, 'event': event, 'data': data}
+
+
+def is_event(message):
+    """判断收到的消息是推送事件还是请求的响应"""
+    return isinstance(message, dict) and message.get('type') == MESSAGE_TYPE_EVENT
@@ -1,7 +1,11 @@
 import hashlib
 import json
+import time
 import datetime
 
+# 时间字符串格式（本地时间）
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
 def hash_password(password):
     """密码哈希处理"""
     return hashlib.sha256(password.encode()).hexdigest()
@@ -16,7 +20,20 @@ def deserialize_data(data):
 
 def get_current_time():
     """获取当前时间字符串"""
-    return datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    return datetime.datetime.now().strftime(TIME_FORMAT)
+
+def get_current_timestamp():
+    """获取当前时间的整数时间戳（秒）及对应的时间字符串，两者表示同一时刻"""
+    ts = int(time.time())
+    return ts, format_timestamp(ts)
+
+def format_timestamp(ts):
+    """整数时间戳转为本地时间字符串"""
+    return datetime.datetime.fromtimestamp(ts).strftime(TIME_FORMAT)
+
+def parse_time(text):
+    """本地时间字符串转为整数时间戳，与SQL中 strftime('%s', text, 'utc') 一致"""
+    return int(time.mktime(time.strptime(text, TIME_FORMAT)))
 
 def generate_order_id():
     """生成订单ID"""
@@ -4,12 +4,22 @@
 """
 校园二手交易平台系统
 主程序入口
+
+用法：
+    python main.py                          弹出对话框选择启动服务器或客户端
+    python main.py server                   直接启动服务器
+    python main.py client                   直接启动客户端
+    python main.py client --startup-time    测量客户端启动耗时（导入、构建、首次绘制）后退出
 """
 
+import time
+
+# 启动耗时从入口脚本开始计时
+STARTED_AT = time.perf_counter()
+
+import argparse
 import sys
 import os
-import tkinter as tk
-from tkinter import messagebox
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -24,28 +34,52 @@ def start_server():
     except Exception as e:
         print(f"启动服务器失败: {e}")
 
-def start_client():
-    """启动客户端"""
+def start_client(measure_startup=False):
+    """启动客户端；measure_startup 为真时只测量到登录窗口显示的耗时"""
     try:
+        import_start = time.perf_counter()
         from client.gui import SecondHandSystemGUI
+        imported = time.perf_counter()
         app = SecondHandSystemGUI()
+        built = time.perf_counter()
+        
+        if measure_startup:
+            # 处理完映射和绘制事件后登录窗口即已显示
+            app.root.update()
+            painted = time.perf_counter()
+            report_startup(import_start, imported, built, painted)
+            app.tasks.shutdown()
+            app.root.destroy()
+            return
+        
         app.run()
     except Exception as e:
+        from tkinter import messagebox
         messagebox.showerror("错误", f"启动客户端失败: {e}")
 
-def main():
-    """主程序"""
+def report_startup(import_start, imported, built, painted):
+    """输出客户端启动各阶段耗时"""
+    from common.config import STARTUP_TARGET_MS
+    
+    total_ms = (painted - STARTED_AT) * 1000
+    print("客户端启动耗时")
+    print("=" * 40)
+    print(f"入口脚本导入:     {(import_start - STARTED_AT) * 1000:8.1f} ms")
+    print(f"导入 client.gui:  {(imported - import_start) * 1000:8.1f} ms")
+    print(f"构建登录窗口:     {(built - imported) * 1000:8.1f} ms")
+    print(f"首次绘制:         {(painted - built) * 1000:8.1f} ms")
+    print("-" * 40)
+    verdict = "达标" if total_ms <= STARTUP_TARGET_MS else "未达标"
+    print(f"合计:             {total_ms:8.1f} ms（目标 {STARTUP_TARGET_MS} ms，{verdict}）")
+
+def choose_mode():
+    """弹出对话框选择启动模式，返回 'server' 或 'client'"""
+    # 只有不带参数启动时才需要这个临时的Tk根窗口
+    import tkinter as tk
+    from tkinter import messagebox
+    
     root = tk.Tk()
     root.title("校园二手交易平台 - 启动器")
-    root.geometry("300x200")
-    
-    # 居中显示窗口
-    root.update_idletasks()
-    width = root.winfo_width()
-    height = root.winfo_height()
-    x = (root.winfo_screenwidth() // 2) - (width // 2)
-    y = (root.winfo_screenheight() // 2) - (height // 2)
-    root.geometry(f'{width}x{height}+{x}+{y}')
     
     # 隐藏主窗口
     root.withdraw()
@@ -59,8 +93,24 @@ def main():
     )
     
     root.destroy()
+    return 'server' if choice else 'client'
+
+def main():
+    """主程序"""
+    parser = argparse.ArgumentParser(description='校园二手交易平台')
+    parser.add_argument('mode', nargs='?', choices=['server', 'client'],
+                        help='启动模式，省略时弹出对话框选择')
+    parser.add_argument('--startup-time', action='store_true',
+                        help='测量客户端启动耗时后退出')
+    args = parser.parse_args()
+    
+    if args.startup_time:
+        start_client(measure_startup=True)
+        return
+    
+    mode = args.mode or choose_mode()
     
-    if choice:
+    if mode == 'server':
         # 启动服务器
         print("正在启动服务器...")
         print("服务器启动后，请在另一个窗口启动客户端")
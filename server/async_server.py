@@ -0,0 +1,145 @@
+import asyncio
+import socket
+from common.config import SERVER_HOST, SERVER_PORT, SERVER_BACKLOG
+from common.protocol import (HEADER_SIZE, REQUEST_ID_SIZE, unpack_header, unpack_request_id,
+                             attach_request_id, decompress_payload)
+from common.codec import JSON_CODEC
+from server.server import Server, actions
+
+
+class AsyncClientConnection:
+    """asyncio连接适配 - 提供与socket相同的send()接口，供线程池中的处理函数推送数据"""
+
+    def __init__(self, writer, loop):
+        self.writer = writer
+        self.loop = loop
+        self.codec = JSON_CODEC  # hello 握手后切换为协商的编解码器
+        self.compression = False  # hello 握手时对端声明支持zlib后启用
+        self.request_ids = False  # hello 握手后启用：帧带请求ID，请求可并发处理、乱序返回
+
+    def send(self, data):
+        self.loop.call_soon_threadsafe(self.writer.write, data)
+        return len(data)
+
+
+class AsyncServer(Server):
+    """基于asyncio的服务器 - 所有连接共用一个事件循环，数据库操作在有界的读/写线程池中执行
+
+    与线程模式使用相同的帧格式和握手协商，现有 NetworkClient 无需修改。
+    启用请求ID的连接上，非屏障请求各自作为任务并发处理，完成后带ID写回。
+    """
+
+    def __init__(self, host=SERVER_HOST, port=SERVER_PORT, backlog=SERVER_BACKLOG):
+        super().__init__(host, port, backlog)
+        self.loop = None
+        self.async_server = None
+
+    def start(self):
+        """启动服务器（阻塞直到停止）"""
+        self.running = True
+        try:
+            asyncio.run(self._serve())
+        except asyncio.CancelledError:
+            pass
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.async_server = await asyncio.start_server(
+            self.handle_connection, sock=self.server, backlog=self.backlog)
+        print(f"服务器启动成功（asyncio），监听 {self.host}:{self.port}")
+        async with self.async_server:
+            await self.async_server.serve_forever()
+
+    async def handle_connection(self, reader, writer):
+        """处理单个客户端连接"""
+        address = writer.get_extra_info('peername')
+        print(f"新连接来自: {address}")
+        # 监听socket创建时 proto 为0，asyncio 不会自动为其接受的连接设置 TCP_NODELAY
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = AsyncClientConnection(writer, self.loop)
+        pending = set()  # 该连接上并发处理中的管线化请求
+
+        try:
+            while True:
+                try:
+                    length_data = await reader.readexactly(HEADER_SIZE)
+                    data_length, compressed = unpack_header(length_data)
+                    request_id = None
+                    if client.request_ids:
+                        request_id = unpack_request_id(await reader.readexactly(REQUEST_ID_SIZE))
+                    data = await reader.readexactly(data_length)
+                except asyncio.IncompleteReadError:
+                    break
+
+                # hello 握手的响应仍使用握手前的编解码器
+                codec, compress = client.codec, client.compression
+                try:
+                    request = codec.decode(decompress_payload(data) if compressed else data)
+                except ValueError as e:
+                    self.write_reply(writer, {'success': False, 'message': f'数据格式错误: {str(e)}'},
+                                     codec, compress, request_id)
+                    continue
+
+                spec = actions.get(request.get('action'))
+                if request_id is not None and spec is not None and not spec.barrier:
+                    # 管线化请求并发处理，不等待结果就继续读取下一帧
+                    task = asyncio.ensure_future(self.reply_async(request, request_id, client, codec, compress))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                    continue
+
+                response = await self.process_request_async(request, client)
+                self.write_reply(writer, response, codec, compress, request_id)
+                await writer.drain()
+
+        except asyncio.CancelledError:
+            # 服务器关闭时事件循环会取消所有连接任务
+            pass
+        except Exception as e:
+            print(f"处理客户端 {address} 时发生错误: {e}")
+        finally:
+            for task in pending:
+                task.cancel()
+            self.drop_client(client)
+            writer.close()
+            print(f"客户端 {address} 断开连接")
+
+    def write_reply(self, writer, response, codec, compress, request_id=None):
+        """写出响应帧 - 动作的响应已在工作线程中编码为帧，这里只有错误响应需要编码"""
+        frame = self.build_frame(response, codec, compress)
+        if request_id is not None:
+            frame = attach_request_id(frame, request_id)
+        writer.write(frame)
+
+    async def reply_async(self, request, request_id, client, codec, compress):
+        """处理一个管线化请求并带请求ID写回响应（出错时写回错误响应）"""
+        try:
+            response = await self.process_request_async(request, client)
+        except Exception as e:
+            print(f"处理请求 {request.get('action')} 时发生错误: {e}")
+            response = {'success': False, 'message': f'服务器内部错误: {str(e)}'}
+        self.write_reply(client.writer, response, codec, compress, request_id)
+
+    async def process_request_async(self, request, client):
+        """process_request 的异步版本 - 等待线程池结果时不阻塞事件循环"""
+        spec, error = self.resolve_action(request, client)
+        if error:
+            return error
+
+        future = self.submit_action(spec, request.get('data') or {}, client)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), spec.timeout)
+        except asyncio.TimeoutError:
+            return self.timeout_response(spec)
+
+    def stop(self):
+        """停止服务器"""
+        self.running = False
+        if self.async_server is not None and self.loop.is_running():
+            # 事件循环运行中时，监听socket由asyncio负责关闭
+            self.loop.call_soon_threadsafe(self.async_server.close)
+        else:
+            self.server.close()
+        self.shutdown_workers()
@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from common.config import CATALOGUE_CACHE_TTL, CATALOGUE_CACHE_MAX_ENTRIES
+
+
+class ResponseCache:
+    """已编码响应缓存 - 缓存整条响应编码（及压缩）后的帧，命中时跳过数据库查询、序列化和压缩
+
+    写操作提交后调用 invalidate() 使版本号加一并清空缓存。读请求在查询数据库前
+    记下版本号，写入缓存时版本号已变化则丢弃结果，避免把写入前读到的旧数据放回缓存。
+    """
+
+    def __init__(self, ttl=CATALOGUE_CACHE_TTL, max_entries=CATALOGUE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (payload, 过期时间)，按最近使用排序
+        self._version = 0
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._stale_puts = 0
+        self._bypass = threading.local()
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    @property
+    def version(self):
+        return self._version
+
+    @contextmanager
+    def bypass(self):
+        """块内当前线程不读也不写缓存（如批量事务中可能读到未提交的数据）"""
+        self._bypass.active = True
+        try:
+            yield
+        finally:
+            self._bypass.active = False
+
+    def _bypassed(self):
+        return getattr(self._bypass, 'active', False)
+
+    def get(self, key):
+        """返回缓存的字节，未命中或已过期返回None"""
+        if self._bypassed():
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            payload, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._expired += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return payload
+
+    def put(self, key, payload, version):
+        """写入缓存，version 为查询数据库前读取的版本号"""
+        if not self.enabled or self._bypassed():
+            return
+        with self._lock:
+            if version != self._version:
+                self._stale_puts += 1
+                return
+            self._entries[key] = (payload, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def get_or_build(self, key, build):
+        """读取缓存，未命中时调用 build() 生成字节并写入缓存"""
+        payload = self.get(key)
+        if payload is None:
+            version = self._version
+            payload = build()
+            self.put(key, payload, version)
+        return payload
+
+    def invalidate(self):
+        """数据发生变化 - 版本号加一并清空所有条目"""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._invalidations += 1
+
+    def stats(self):
+        """导出命中率等统计数据"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'expired': self._expired,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+                'stale_puts': self._stale_puts,
+                'entries': len(self._entries),
+                'bytes': sum(len(payload) for payload, _ in self._entries.values()),
+                'version': self._version,
+                'ttl': self.ttl,
+                'max_entries': self.max_entries,
+            }
@@ -0,0 +1,188 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+from common.config import DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_HEALTH_CHECK_INTERVAL
+
+
+class PooledConnection:
+    """连接池中的连接代理 - close() 时把连接归还到连接池而不是真正关闭"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def close(self):
+        """归还连接（可重复调用）"""
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+    def __getattr__(self, name):
+        conn = self.__dict__.get('_conn')
+        if conn is None:
+            raise sqlite3.ProgrammingError('连接已归还到连接池')
+        return getattr(conn, name)
+
+
+class TransactionConnection:
+    """批量事务中交给各数据库方法的连接代理 - 各方法自己的 BEGIN/commit/close 不生效，
+    由外层事务统一提交；方法内部调用 rollback() 时只记录失败，整个事务最终回滚"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.failed = False
+
+    def cursor(self):
+        return TransactionCursor(self._conn.cursor())
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.failed = True
+
+    def close(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class TransactionCursor:
+    """事务内的游标代理 - 忽略 BEGIN 语句（外层事务已经开始）"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, parameters=()):
+        if sql.lstrip()[:5].upper() == 'BEGIN':
+            return self
+        return self._cursor.execute(sql, parameters)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class ConnectionPool:
+    """有界SQLite连接池 - 复用长连接，避免每次调用都重新连接和执行PRAGMA"""
+
+    def __init__(self, factory, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                 health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL):
+        self._factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle = deque()  # (conn, 归还时间)
+        self._open = 0        # 已建立的连接数（空闲 + 使用中）
+        self._closed = False
+        self._cond = threading.Condition()
+        self._counters = {'hits': 0, 'misses': 0, 'waits': 0, 'timeouts': 0, 'discarded': 0}
+
+    def acquire(self):
+        """获取连接 - 优先复用空闲连接，池满时最多等待timeout秒"""
+        while True:
+            conn, last_used = self._take()
+            if conn is None:
+                # 未命中：在锁外建立新连接
+                try:
+                    conn = self._factory()
+                except Exception:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+                return PooledConnection(self, conn)
+
+            # 空闲过久的连接先做健康检查
+            if time.monotonic() - last_used < self.health_check_interval or self._is_healthy(conn):
+                return PooledConnection(self, conn)
+            self._discard(conn)
+
+    def _take(self):
+        """在锁内取出空闲连接，或为新连接预留名额"""
+        deadline = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError('连接池已关闭')
+                if self._idle:
+                    self._counters['hits'] += 1
+                    return self._idle.pop()
+                if self._open < self.size:
+                    self._open += 1
+                    self._counters['misses'] += 1
+                    return None, None
+
+                if deadline is None:
+                    self._counters['waits'] += 1
+                    deadline = time.monotonic() + self.timeout
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise sqlite3.OperationalError('获取数据库连接超时')
+                self._cond.wait(remaining)
+
+    def release(self, conn):
+        """归还连接 - 回滚未提交的事务，连接池已关闭时直接关闭连接"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+            self._open -= 1
+        conn.close()
+
+    def _is_healthy(self, conn):
+        """健康检查"""
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        """丢弃损坏的连接，释放名额"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._open -= 1
+            self._counters['discarded'] += 1
+            self._cond.notify()
+
+    def close(self):
+        """关闭连接池 - 立即关闭空闲连接，使用中的连接在归还时关闭"""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        """连接池统计：命中/未命中/等待次数等，用于调整连接池大小"""
+        with self._cond:
+            stats = dict(self._counters)
+            stats.update({
+                'size': self.size,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._open - len(self._idle),
+                'closed': self._closed,
+            })
+            return stats
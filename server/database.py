@@ -1,20 +1,92 @@
 import sqlite3
 import os
 import threading
-from common.config import DATABASE_NAME, USER_ROLE, ADMIN_ROLE
-from common.utils import hash_password, get_current_time
+import time
+import datetime
+from contextlib import contextmanager, nullcontext
+from common.config import (DATABASE_NAME, USER_ROLE, ADMIN_ROLE, DB_POOL_SIZE, GOODS_PAGE_SIZE, GOODS_PAGE_MAX,
+                           GOODS_CHANGES_MAX, BULK_MAX_ROWS, SALES_STATS_MAX_PERIODS,
+                           TIMESTAMP_MIGRATION_BATCH, TIMESTAMP_MIGRATION_PAUSE, BALANCE_UPDATE_RETRIES)
+from common.utils import hash_password, get_current_timestamp, parse_time
+from server.connection_pool import ConnectionPool, TransactionConnection
+from server.lock_manager import LockManager
+from server.search import fts_tokens, build_match_query
+
+# IN (...) 查询每次最多绑定的参数个数（低于SQLite默认的999上限）
+SQL_IN_CHUNK = 500
+
+# 销售汇总表：粒度 -> (表名, 由订单时间计算所属周期起始日期的SQL表达式)
+# 周从周一开始（'weekday 0' 前进到周日，再退6天），月以1号表示
+SALES_ROLLUPS = {
+    'day': ('sales_daily', "substr({time}, 1, 10)"),
+    'week': ('sales_weekly', "date({time}, 'weekday 0', '-6 days')"),
+    'month': ('sales_monthly', "substr({time}, 1, 7) || '-01'"),
+}
+
+
+# 整数时间戳列：表 -> (时间戳列, 对应的时间字符串列)
+# 时间戳为秒级 Unix 时间，与时间字符串（本地时间）表示同一时刻；字符串列继续写入供API返回
+TIMESTAMP_COLUMNS = {
+    'users': ('created_ts', 'created_at'),
+    'goods': ('publish_ts', 'publish_time'),
+    'orders': ('create_ts', 'create_time'),
+}
+
+# 时间戳列启用前按时间字符串排序/分页使用的旧索引，迁移完成后删除
+TEXT_TIME_INDEXES = ('idx_orders_time', 'idx_goods_status_time',
+                     'idx_goods_status_category_time', 'idx_goods_seller_time')
+
+
+def _period_start(day, granularity):
+    """日期所属周期的起始日期，与 SALES_ROLLUPS 中的SQL表达式一致"""
+    if granularity == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_period(start, granularity):
+    if granularity == 'week':
+        return start + datetime.timedelta(days=7)
+    if granularity == 'month':
+        return (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return start + datetime.timedelta(days=1)
+
+
+def _chunks(items, size=SQL_IN_CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _bulk_summary(results, inserted, elapsed):
+    """批量导入的统一返回格式：逐行结果、成功/失败行数、耗时和每秒插入行数"""
+    return {
+        'success': True,
+        'results': results,
+        'inserted': inserted,
+        'failed': len(results) - inserted,
+        'elapsed_ms': round(elapsed * 1000, 2),
+        'rows_per_sec': round(inserted / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
 
 class Database:
     """数据库管理类 - 支持并发控制和事务处理"""
     
-    _lock = threading.RLock()  # 使用递归锁支持并发控制
+    _schema_lock = threading.RLock()  # 仅用于建表初始化
+    _locks = LockManager()            # 细粒度实体锁：只串行化同一用户/商品上的写操作
     
-    def __init__(self):
-        self.db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), DATABASE_NAME)
+    def __init__(self, db_path=None, pool_size=DB_POOL_SIZE):
+        self.db_path = db_path or os.path.join(os.path.dirname(os.path.dirname(__file__)), DATABASE_NAME)
+        self.pool = ConnectionPool(self._create_connection, size=pool_size)
+        self._local = threading.local()  # 当前线程正在进行的批量事务
+        self._timestamps_ready = False   # 整数时间戳列是否已回填完成（由 init_database 设置）
+        self._migration_progress = None
         self.init_database()
     
-    def get_connection(self):
-        """获取数据库连接 - 开启WAL模式提升并发性能"""
+    def _create_connection(self):
+        """建立新的数据库连接 - 开启WAL模式提升并发性能（每个连接只执行一次）"""
         conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10.0)
         conn.row_factory = sqlite3.Row
         # 开启WAL模式，提升并发性能
@@ -22,9 +94,65 @@ class Database:
         conn.execute('PRAGMA busy_timeout=5000')
         return conn
     
+    def get_connection(self):
+        """从连接池获取数据库连接，调用close()即归还到连接池
+        
+        当前线程处于 transaction() 中时，返回该事务的连接。
+        """
+        txn = getattr(self._local, 'txn', None)
+        if txn is not None:
+            return txn
+        return self.pool.acquire()
+    
+    def _hold(self, *keys):
+        """获取实体锁；批量事务中不加锁
+        
+        事务以 BEGIN IMMEDIATE 开始，已持有 SQLite 写锁，写操作本就串行。若事务开始后
+        再等待实体锁，而持有该锁的单条写请求正在等待 SQLite 写锁，双方会互相阻塞。
+        """
+        if getattr(self._local, 'txn', None) is not None:
+            return nullcontext()
+        return self._locks.hold(*keys)
+    
+    @contextmanager
+    def transaction(self):
+        """批量事务 - 块内调用的数据库方法共用一个连接和一个事务，全部成功才提交
+        
+        块内抛出异常或任一方法内部回滚（txn.failed）时整体回滚；调用方也可以
+        置 txn.failed = True 主动放弃提交。事务期间各方法不再获取实体锁（见 _hold）。
+        """
+        if getattr(self._local, 'txn', None) is not None:
+            raise RuntimeError('不支持嵌套事务')
+        conn = self.pool.acquire()
+        txn = TransactionConnection(conn)
+        try:
+            conn.execute('BEGIN IMMEDIATE TRANSACTION')
+            self._local.txn = txn
+            try:
+                yield txn
+            except Exception:
+                txn.failed = True
+                raise
+            finally:
+                self._local.txn = None
+                if txn.failed:
+                    conn.rollback()
+                else:
+                    conn.commit()
+        finally:
+            conn.close()
+    
+    def get_pool_stats(self):
+        """获取连接池统计（命中/未命中/等待次数）"""
+        return self.pool.stats()
+    
+    def close(self):
+        """关闭连接池"""
+        self.pool.close()
+    
     def init_database(self):
         """初始化数据库表结构"""
-        with self._lock:
+        with self._schema_lock:
             conn = self.get_connection()
             cursor = conn.cursor()
             
@@ -38,7 +166,8 @@ class Database:
                         role TEXT NOT NULL DEFAULT 'user',
                         contact TEXT,
                         balance REAL DEFAULT 0.0,
-                        created_at TEXT NOT NULL
+                        created_at TEXT NOT NULL,
+                        created_ts INTEGER
                     )
                 ''')
                 
@@ -53,6 +182,8 @@ class Database:
                         seller_id INTEGER NOT NULL,
                         status TEXT NOT NULL DEFAULT 'available',
                         publish_time TEXT NOT NULL,
+                        version INTEGER NOT NULL DEFAULT 0,
+                        publish_ts INTEGER,
                         FOREIGN KEY (seller_id) REFERENCES users (user_id)
                     )
                 ''')
@@ -67,6 +198,7 @@ class Database:
                         price REAL NOT NULL,
                         status TEXT NOT NULL DEFAULT 'pending',
                         create_time TEXT NOT NULL,
+                        create_ts INTEGER,
                         FOREIGN KEY (goods_id) REFERENCES goods (goods_id),
                         FOREIGN KEY (buyer_id) REFERENCES users (user_id),
                         FOREIGN KEY (seller_id) REFERENCES users (user_id)
@@ -78,7 +210,13 @@ class Database:
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_goods_seller ON goods(seller_id)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_buyer ON orders(buyer_id)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_seller ON orders(seller_id)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_time ON orders(create_time)')
+                
+                self._init_goods_fts(cursor)
+                self._init_goods_versioning(cursor)
+                self._init_timestamps(cursor)
+                self._init_category_counts(cursor)
+                self._init_sales_rollups(cursor)
+                self._init_summary_counts(cursor)
                 
                 conn.commit()
                 
@@ -94,6 +232,464 @@ class Database:
             finally:
                 conn.close()
     
+    def _init_timestamps(self, cursor):
+        """整数时间戳列及索引 - 排序、分页和时间范围查询按整数比较，不再比较字符串
+        
+        旧数据库升级时新增的列为空，由 migrate_timestamps() 在后台分批回填；回填完成
+        （schema_migrations 中有记录）之前查询仍使用时间字符串列及其索引。
+        """
+        for table, (ts_column, _) in TIMESTAMP_COLUMNS.items():
+            cursor.execute(f'PRAGMA table_info({table})')
+            if ts_column not in [row['name'] for row in cursor.fetchall()]:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN {ts_column} INTEGER')
+        
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_created_ts ON users(created_ts)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_create_ts ON orders(create_ts)')
+        # 商品分页：按 (publish_ts, goods_id) 键集分页的复合索引
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_goods_status_ts ON goods(status, publish_ts, goods_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_goods_status_category_ts ON goods(status, category, publish_ts, goods_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_goods_seller_ts ON goods(seller_id, publish_ts, goods_id)')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name TEXT PRIMARY KEY,
+                applied_at INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("SELECT 1 FROM schema_migrations WHERE name = 'integer_timestamps'")
+        self._timestamps_ready = cursor.fetchone() is not None
+        if self._timestamps_ready:
+            return
+        
+        pending = False
+        for table, (ts_column, _) in TIMESTAMP_COLUMNS.items():
+            cursor.execute(f'SELECT 1 FROM {table} WHERE {ts_column} IS NULL LIMIT 1')
+            pending = pending or cursor.fetchone() is not None
+        if not pending:
+            # 新数据库（或没有旧数据）：无需回填，直接启用时间戳列
+            self._finish_timestamp_migration(cursor)
+        else:
+            # 回填期间旧查询仍按时间字符串排序，保留（或补建）其索引
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_time ON orders(create_time)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_goods_status_time ON goods(status, publish_time, goods_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_goods_status_category_time ON goods(status, category, publish_time, goods_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_goods_seller_time ON goods(seller_id, publish_time, goods_id)')
+    
+    def _finish_timestamp_migration(self, cursor):
+        """记录迁移完成并删除旧的时间字符串索引（在调用方的事务中执行）"""
+        for index in TEXT_TIME_INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {index}')
+        cursor.execute('''
+            INSERT OR IGNORE INTO schema_migrations (name, applied_at) VALUES ('integer_timestamps', ?)
+        ''', (int(time.time()),))
+        self._timestamps_ready = True
+    
+    def _time_column(self, table, alias=''):
+        """排序/分页使用的时间列：迁移完成后为整数时间戳列，之前为时间字符串列"""
+        ts_column, text_column = TIMESTAMP_COLUMNS[table]
+        return alias + (ts_column if self._timestamps_ready else text_column)
+    
+    def timestamps_ready(self):
+        return self._timestamps_ready
+    
+    def migrate_timestamps(self, batch_size=TIMESTAMP_MIGRATION_BATCH, pause=TIMESTAMP_MIGRATION_PAUSE):
+        """在线回填整数时间戳列 - 按 rowid 区间分批，每批一个短写事务
+        
+        每批只持有写锁几毫秒，批次之间暂停 pause 秒让出写锁，回填期间服务照常读写；
+        新写入的行已同时写入时间戳，只需回填开始时已存在的行。中途停止后再次调用
+        会跳过已回填的行。返回 {'success', 'message', 'updated'}。
+        """
+        if self._timestamps_ready:
+            return {'success': True, 'message': '时间戳迁移已完成', 'updated': 0}
+        
+        self._migration_progress = {'table': None, 'updated': 0, 'running': True}
+        updated = 0
+        conn = self.pool.acquire()
+        try:
+            cursor = conn.cursor()
+            for table, (ts_column, text_column) in TIMESTAMP_COLUMNS.items():
+                self._migration_progress['table'] = table
+                cursor.execute(f'SELECT MIN(rowid), MAX(rowid) FROM {table} WHERE {ts_column} IS NULL')
+                low, high = cursor.fetchone()
+                if low is None:
+                    continue
+                for start in range(low, high + 1, batch_size):
+                    conn.execute('BEGIN IMMEDIATE TRANSACTION')
+                    try:
+                        cursor.execute(f'''
+                            UPDATE {table}
+                            SET {ts_column} = CAST(strftime('%s', {text_column}, 'utc') AS INTEGER)
+                            WHERE rowid BETWEEN ? AND ? AND {ts_column} IS NULL
+                        ''', (start, start + batch_size - 1))
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                    updated += cursor.rowcount
+                    self._migration_progress['updated'] = updated
+                    if pause:
+                        time.sleep(pause)
+            
+            conn.execute('BEGIN IMMEDIATE TRANSACTION')
+            try:
+                # 回填期间写入的行都带时间戳；仍为空说明时间字符串无法解析
+                for table, (ts_column, text_column) in TIMESTAMP_COLUMNS.items():
+                    cursor.execute(f'SELECT COUNT(*) FROM {table} WHERE {ts_column} IS NULL')
+                    missing = cursor.fetchone()[0]
+                    if missing:
+                        conn.rollback()
+                        return {'success': False, 'message': f'{table} 表有 {missing} 行 {text_column} 无法解析',
+                                'updated': updated}
+                self._finish_timestamp_migration(cursor)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            return {'success': True, 'message': f'时间戳迁移完成，回填 {updated} 行', 'updated': updated}
+        except Exception as e:
+            return {'success': False, 'message': f'时间戳迁移失败: {str(e)}', 'updated': updated}
+        finally:
+            self._migration_progress['running'] = False
+            conn.close()
+    
+    def start_timestamp_migration(self):
+        """有待回填的旧数据时在后台线程中执行 migrate_timestamps()，返回是否启动"""
+        if self._timestamps_ready:
+            return False
+        
+        def run():
+            result = self.migrate_timestamps()
+            print(result['message'])
+        
+        threading.Thread(target=run, name='timestamp-migration', daemon=True).start()
+        return True
+    
+    def get_migration_stats(self):
+        """时间戳迁移进度（服务器运行统计使用）"""
+        progress = self._migration_progress or {'table': None, 'updated': 0, 'running': False}
+        return dict(progress, ready=self._timestamps_ready)
+    
+    def _init_goods_fts(self, cursor):
+        """创建商品全文索引（FTS5）及同步触发器
+        
+        索引只包含在售商品，rowid 即 goods_id。分词在 Python 中完成：发布商品时由
+        fts_tokens() 把名称和描述切分为中文单字/双字和单词，写入 goods_tokens；
+        触发器只在 goods_tokens 与 goods_fts 之间复制词串，不调用自定义函数，
+        因此 sqlite3 命令行、备份脚本等其它连接也可以正常读写 goods 表。
+        
+        其它连接直接插入的商品没有 goods_tokens 行，不会出现在搜索结果中；
+        修改名称或描述时需同时用 _index_goods_text() 更新词串。
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'goods_tokens'")
+        exists = cursor.fetchone() is not None
+        
+        # 旧版本的同步触发器在SQL中调用 fts_tokens()，升级时删除
+        cursor.execute("""
+            SELECT name FROM sqlite_master
+            WHERE type = 'trigger' AND tbl_name = 'goods' AND sql LIKE '%fts_tokens(%'
+        """)
+        for row in cursor.fetchall():
+            cursor.execute(f'DROP TRIGGER IF EXISTS {row["name"]}')
+        if not exists:
+            # 旧版本的删除触发器不清理 goods_tokens
+            cursor.execute('DROP TRIGGER IF EXISTS goods_fts_delete')
+        
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS goods_fts USING fts5(
+                name_tokens, description_tokens, tokenize = 'unicode61'
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS goods_tokens (
+                goods_id INTEGER PRIMARY KEY,
+                name_tokens TEXT NOT NULL,
+                description_tokens TEXT NOT NULL
+            )
+        ''')
+        # 写入（或更新）词串时重建该商品的索引行，只收录在售商品
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS goods_fts_index AFTER INSERT ON goods_tokens
+            BEGIN
+                INSERT INTO goods_fts (rowid, name_tokens, description_tokens)
+                SELECT new.goods_id, new.name_tokens, new.description_tokens
+                FROM goods WHERE goods_id = new.goods_id AND status = 'available';
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS goods_fts_reindex AFTER UPDATE ON goods_tokens
+            BEGIN
+                DELETE FROM goods_fts WHERE rowid = old.goods_id;
+                INSERT INTO goods_fts (rowid, name_tokens, description_tokens)
+                SELECT new.goods_id, new.name_tokens, new.description_tokens
+                FROM goods WHERE goods_id = new.goods_id AND status = 'available';
+            END
+        ''')
+        # 售出、下架或重新上架时按已保存的词串更新索引
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS goods_fts_update AFTER UPDATE OF status ON goods
+            BEGIN
+                DELETE FROM goods_fts WHERE rowid = old.goods_id;
+                INSERT INTO goods_fts (rowid, name_tokens, description_tokens)
+                SELECT goods_id, name_tokens, description_tokens
+                FROM goods_tokens WHERE goods_id = new.goods_id AND new.status = 'available';
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS goods_fts_delete AFTER DELETE ON goods
+            BEGIN
+                DELETE FROM goods_fts WHERE rowid = old.goods_id;
+                DELETE FROM goods_tokens WHERE goods_id = old.goods_id;
+            END
+        ''')
+        
+        if not exists:
+            # 新建或升级：为现有商品分词，由触发器重建在售商品的索引
+            cursor.execute('DELETE FROM goods_fts')
+            cursor.execute('SELECT goods_id, name, description FROM goods')
+            self._index_goods_text(cursor, [tuple(row) for row in cursor.fetchall()])
+    
+    def _index_goods_text(self, cursor, goods):
+        """为 [(goods_id, name, description), ...] 写入分词结果（在调用方的事务中执行）"""
+        cursor.executemany('''
+            INSERT INTO goods_tokens (goods_id, name_tokens, description_tokens) VALUES (?, ?, ?)
+            ON CONFLICT (goods_id) DO UPDATE
+            SET name_tokens = excluded.name_tokens, description_tokens = excluded.description_tokens
+        ''', [(goods_id, fts_tokens(name), fts_tokens(description)) for goods_id, name, description in goods])
+    
+    def _init_goods_versioning(self, cursor):
+        """商品版本号 - 每次新增或修改商品时全局版本号加一并写入该商品的 version 列
+        
+        客户端记住上次同步到的版本号，之后只拉取 version 更大的商品即可增量更新列表。
+        """
+        cursor.execute('PRAGMA table_info(goods)')
+        if 'version' not in [row['name'] for row in cursor.fetchall()]:
+            # 旧数据库升级：已有商品版本号为0
+            cursor.execute('ALTER TABLE goods ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_goods_version ON goods(version)')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS goods_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('INSERT OR IGNORE INTO goods_version (id, version) VALUES (1, 0)')
+        
+        # 写事务由SQLite串行执行，版本号按提交顺序单调递增；
+        # 触发器只更新 version 列，不会再次触发自身
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS goods_version_insert AFTER INSERT ON goods
+            BEGIN
+                UPDATE goods_version SET version = version + 1 WHERE id = 1;
+                UPDATE goods SET version = (SELECT version FROM goods_version WHERE id = 1)
+                WHERE goods_id = new.goods_id;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS goods_version_update
+            AFTER UPDATE OF name, category, price, description, status ON goods
+            BEGIN
+                UPDATE goods_version SET version = version + 1 WHERE id = 1;
+                UPDATE goods SET version = (SELECT version FROM goods_version WHERE id = 1)
+                WHERE goods_id = new.goods_id;
+            END
+        ''')
+    
+    def _init_category_counts(self, cursor):
+        """按 (类别, 状态) 计数的商品统计表及维护触发器
+        
+        商品新增、改类别/状态、删除时由触发器增减对应计数，所有写路径（包括批量导入
+        和删除用户时的批量下架）都不需要额外处理；类别统计只读这张小表。
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'goods_category_counts'")
+        exists = cursor.fetchone() is not None
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS goods_category_counts (
+                category TEXT NOT NULL,
+                status TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (category, status)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS goods_counts_insert AFTER INSERT ON goods
+            BEGIN
+                INSERT INTO goods_category_counts (category, status, count)
+                VALUES (new.category, new.status, 1)
+                ON CONFLICT (category, status) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS goods_counts_update AFTER UPDATE OF category, status ON goods
+            WHEN old.category != new.category OR old.status != new.status
+            BEGIN
+                UPDATE goods_category_counts SET count = count - 1
+                WHERE category = old.category AND status = old.status;
+                INSERT INTO goods_category_counts (category, status, count)
+                VALUES (new.category, new.status, 1)
+                ON CONFLICT (category, status) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS goods_counts_delete AFTER DELETE ON goods
+            BEGIN
+                UPDATE goods_category_counts SET count = count - 1
+                WHERE category = old.category AND status = old.status;
+            END
+        ''')
+        
+        if not exists:
+            # 已有数据库首次升级：按现有商品建立计数
+            self._rebuild_category_counts(cursor)
+    
+    def _rebuild_category_counts(self, cursor):
+        """从 goods 表重新统计全部计数"""
+        cursor.execute('DELETE FROM goods_category_counts')
+        cursor.execute('''
+            INSERT INTO goods_category_counts (category, status, count)
+            SELECT category, status, COUNT(*) FROM goods GROUP BY category, status
+        ''')
+    
+    def _init_sales_rollups(self, cursor):
+        """按日/周/月汇总已完成订单的销售额和订单数，由 orders 表上的触发器增量维护
+        
+        订单完成（购买时直接以 completed 写入）时累加到所属周期，订单取消、删除或
+        修改金额时先减去旧值再加上新值；销售统计只读所需周期的汇总行。
+        """
+        for table, period in SALES_ROLLUPS.values():
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+            exists = cursor.fetchone() is not None
+            
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    period TEXT PRIMARY KEY,
+                    order_count INTEGER NOT NULL DEFAULT 0,
+                    total_amount REAL NOT NULL DEFAULT 0
+                ) WITHOUT ROWID
+            ''')
+            add = f'''
+                INSERT INTO {table} (period, order_count, total_amount)
+                VALUES ({period.format(time='new.create_time')}, 1, new.price)
+                ON CONFLICT (period) DO UPDATE
+                SET order_count = order_count + 1, total_amount = total_amount + excluded.total_amount;
+            '''
+            subtract = f'''
+                UPDATE {table} SET order_count = order_count - 1, total_amount = total_amount - old.price
+                WHERE period = {period.format(time='old.create_time')};
+            '''
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_insert AFTER INSERT ON orders
+                WHEN new.status = 'completed'
+                BEGIN {add} END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_update_old AFTER UPDATE OF status, price, create_time ON orders
+                WHEN old.status = 'completed'
+                BEGIN {subtract} END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_update_new AFTER UPDATE OF status, price, create_time ON orders
+                WHEN new.status = 'completed'
+                BEGIN {add} END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_delete AFTER DELETE ON orders
+                WHEN old.status = 'completed'
+                BEGIN {subtract} END
+            ''')
+            
+            if not exists:
+                # 已有数据库首次升级：按现有订单汇总
+                cursor.execute(f'''
+                    INSERT INTO {table} (period, order_count, total_amount)
+                    SELECT {period.format(time='create_time')}, COUNT(*), SUM(price)
+                    FROM orders WHERE status = 'completed'
+                    GROUP BY 1
+                ''')
+    
+    def _init_summary_counts(self, cursor):
+        """系统概况计数表：用户按角色、订单按状态（含金额），由触发器在写入时增减
+        
+        与 goods_category_counts 一起构成 get_system_statistics 的数据来源，
+        概况查询只读这几张小表，不再统计全表。
+        """
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('user_role_counts', 'order_status_counts')")
+        existing = {row['name'] for row in cursor.fetchall()}
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_role_counts (
+                role TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS user_counts_insert AFTER INSERT ON users
+            BEGIN
+                INSERT INTO user_role_counts (role, count) VALUES (new.role, 1)
+                ON CONFLICT (role) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS user_counts_update AFTER UPDATE OF role ON users
+            WHEN old.role != new.role
+            BEGIN
+                UPDATE user_role_counts SET count = count - 1 WHERE role = old.role;
+                INSERT INTO user_role_counts (role, count) VALUES (new.role, 1)
+                ON CONFLICT (role) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS user_counts_delete AFTER DELETE ON users
+            BEGIN
+                UPDATE user_role_counts SET count = count - 1 WHERE role = old.role;
+            END
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS order_status_counts (
+                status TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0,
+                amount REAL NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS order_counts_insert AFTER INSERT ON orders
+            BEGIN
+                INSERT INTO order_status_counts (status, count, amount) VALUES (new.status, 1, new.price)
+                ON CONFLICT (status) DO UPDATE SET count = count + 1, amount = amount + excluded.amount;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS order_counts_update AFTER UPDATE OF status, price ON orders
+            WHEN old.status != new.status OR old.price != new.price
+            BEGIN
+                UPDATE order_status_counts SET count = count - 1, amount = amount - old.price
+                WHERE status = old.status;
+                INSERT INTO order_status_counts (status, count, amount) VALUES (new.status, 1, new.price)
+                ON CONFLICT (status) DO UPDATE SET count = count + 1, amount = amount + excluded.amount;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS order_counts_delete AFTER DELETE ON orders
+            BEGIN
+                UPDATE order_status_counts SET count = count - 1, amount = amount - old.price
+                WHERE status = old.status;
+            END
+        ''')
+        
+        # 已有数据库首次升级：按现有数据建立计数
+        if 'user_role_counts' not in existing:
+            cursor.execute('''
+                INSERT INTO user_role_counts (role, count)
+                SELECT role, COUNT(*) FROM users GROUP BY role
+            ''')
+        if 'order_status_counts' not in existing:
+            cursor.execute('''
+                INSERT INTO order_status_counts (status, count, amount)
+                SELECT status, COUNT(*), SUM(price) FROM orders GROUP BY status
+            ''')
+    
     def create_default_admin(self, conn=None, cursor=None):
         """创建默认管理员账户"""
         close_conn = False
@@ -104,10 +700,11 @@ class Database:
         
         try:
             admin_password = hash_password('admin123')
+            ts, now = get_current_timestamp()
             cursor.execute('''
-                INSERT INTO users (username, password, role, contact, balance, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', ('admin', admin_password, ADMIN_ROLE, 'admin@campus.com', 10000.0, get_current_time()))
+                INSERT INTO users (username, password, role, contact, balance, created_at, created_ts)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', ('admin', admin_password, ADMIN_ROLE, 'admin@campus.com', 10000.0, now, ts))
             conn.commit()
             print("默认管理员账户创建成功")
         except sqlite3.IntegrityError:
@@ -119,20 +716,21 @@ class Database:
     # =================== 用户相关操作 ===================
     
     def register_user(self, username, password, contact=None):
-        """用户注册 - 加锁保证并发安全"""
-        with self._lock:
+        """用户注册 - 按用户名加锁保证并发安全"""
+        with self._hold(('username', username)):
             conn = self.get_connection()
             cursor = conn.cursor()
             
             try:
                 hashed_password = hash_password(password)
+                ts, now = get_current_timestamp()
                 cursor.execute('''
-                    INSERT INTO users (username, password, role, contact, balance, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (username, hashed_password, USER_ROLE, contact, 0.0, get_current_time()))
+                    INSERT INTO users (username, password, role, contact, balance, created_at, created_ts)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (username, hashed_password, USER_ROLE, contact, 0.0, now, ts))
                 
                 conn.commit()
-                return {'success': True, 'message': '注册成功'}
+                return {'success': True, 'user_id': cursor.lastrowid, 'message': '注册成功'}
             except sqlite3.IntegrityError:
                 return {'success': False, 'message': '用户名已存在'}
             except Exception as e:
@@ -141,6 +739,62 @@ class Database:
             finally:
                 conn.close()
     
+    def bulk_register_users(self, users):
+        """批量注册 - 一个事务内 executemany 插入，只提交一次
+        
+        users 为 [{'username', 'password', 'contact'}, ...]，返回与输入顺序一致的逐行结果
+        {'user_id': ...} 或 {'error': ...}（信息不完整、用户名已存在、批内重复）。
+        """
+        if len(users) > BULK_MAX_ROWS:
+            return {'success': False, 'message': f'单次最多导入 {BULK_MAX_ROWS} 行'}
+        
+        start = time.perf_counter()
+        results = [None] * len(users)
+        accepted = {}  # username -> 输入行号
+        for index, user in enumerate(users):
+            username = user.get('username') if isinstance(user, dict) else None
+            if not username or not user.get('password'):
+                results[index] = {'error': '用户名和密码不能为空'}
+            elif username in accepted:
+                results[index] = {'error': '用户名重复'}
+            else:
+                accepted[username] = index
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            # 立即获取写锁，检查重名到插入之间不会有其他注册插入
+            cursor.execute('BEGIN IMMEDIATE TRANSACTION')
+            for chunk in _chunks(list(accepted)):
+                cursor.execute(f'''
+                    SELECT username FROM users WHERE username IN ({','.join('?' * len(chunk))})
+                ''', chunk)
+                for row in cursor.fetchall():
+                    results[accepted.pop(row['username'])] = {'error': '用户名已存在'}
+            
+            ts, now = get_current_timestamp()
+            cursor.executemany('''
+                INSERT INTO users (username, password, role, contact, balance, created_at, created_ts)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(username, hash_password(users[index]['password']), USER_ROLE,
+                   users[index].get('contact'), 0.0, now, ts)
+                  for username, index in accepted.items()])
+            
+            for chunk in _chunks(list(accepted)):
+                cursor.execute(f'''
+                    SELECT user_id, username FROM users WHERE username IN ({','.join('?' * len(chunk))})
+                ''', chunk)
+                for row in cursor.fetchall():
+                    results[accepted[row['username']]] = {'user_id': row['user_id']}
+            
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            return {'success': False, 'message': f'批量注册失败: {str(e)}'}
+        finally:
+            conn.close()
+        return _bulk_summary(results, len(accepted), time.perf_counter() - start)
+
     def login_user(self, username, password):
         """用户登录验证"""
         conn = self.get_connection()
@@ -164,10 +818,10 @@ class Database:
         cursor = conn.cursor()
         
         try:
-            cursor.execute('''
+            cursor.execute(f'''
                 SELECT user_id, username, role, contact, balance, created_at 
                 FROM users 
-                ORDER BY created_at DESC
+                ORDER BY {self._time_column('users')} DESC
             ''')
             users = [dict(row) for row in cursor.fetchall()]
             return users
@@ -176,7 +830,7 @@ class Database:
     
     def delete_user(self, user_id):
         """删除用户（管理员功能） - 事务处理"""
-        with self._lock:
+        with self._hold(('user', user_id)):
             conn = self.get_connection()
             cursor = conn.cursor()
             
@@ -221,18 +875,20 @@ class Database:
     
     def add_goods(self, name, category, price, description, seller_id):
         """添加商品"""
-        with self._lock:
+        with self._hold(('user', seller_id)):
             conn = self.get_connection()
             cursor = conn.cursor()
             
             try:
+                ts, now = get_current_timestamp()
                 cursor.execute('''
-                    INSERT INTO goods (name, category, price, description, seller_id, publish_time)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (name, category, price, description, seller_id, get_current_time()))
+                    INSERT INTO goods (name, category, price, description, seller_id, publish_time, publish_ts)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (name, category, price, description, seller_id, now, ts))
+                goods_id = cursor.lastrowid
+                self._index_goods_text(cursor, [(goods_id, name, description)])
                 
                 conn.commit()
-                goods_id = cursor.lastrowid
                 return {'success': True, 'goods_id': goods_id, 'message': '商品发布成功'}
             except Exception as e:
                 conn.rollback()
@@ -240,18 +896,94 @@ class Database:
             finally:
                 conn.close()
     
+    def bulk_add_goods(self, items):
+        """批量发布商品 - 一个事务内 executemany 插入，只提交一次
+        
+        items 为 [{'name', 'category', 'price', 'description', 'seller_id'}, ...]，返回与输入
+        顺序一致的逐行结果 {'goods_id': ...} 或 {'error': ...}。持有写锁时自增ID连续分配，
+        插入后由 last_insert_rowid() 反推各行的商品ID。
+        """
+        if len(items) > BULK_MAX_ROWS:
+            return {'success': False, 'message': f'单次最多导入 {BULK_MAX_ROWS} 行'}
+        
+        start = time.perf_counter()
+        results = [None] * len(items)
+        valid = []  # (输入行号, 价格, 卖家ID)
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not all([item.get('name'), item.get('category'),
+                                                      item.get('price'), item.get('seller_id')]):
+                results[index] = {'error': '商品信息不完整'}
+                continue
+            try:
+                price = float(item['price'])
+            except (TypeError, ValueError):
+                results[index] = {'error': '价格必须是数字'}
+                continue
+            if price <= 0:
+                results[index] = {'error': '价格必须大于0'}
+                continue
+            try:
+                seller_id = int(item['seller_id'])
+            except (TypeError, ValueError):
+                results[index] = {'error': '卖家ID必须是整数'}
+                continue
+            valid.append((index, price, seller_id))
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE TRANSACTION')
+            sellers = set()
+            for chunk in _chunks(list({seller_id for _, _, seller_id in valid})):
+                cursor.execute(f'''
+                    SELECT user_id FROM users WHERE user_id IN ({','.join('?' * len(chunk))})
+                ''', chunk)
+                sellers.update(row['user_id'] for row in cursor.fetchall())
+            
+            ts, now = get_current_timestamp()
+            inserted = []  # 实际插入的输入行号，顺序与插入顺序一致
+            rows = []
+            for index, price, seller_id in valid:
+                item = items[index]
+                if seller_id not in sellers:
+                    results[index] = {'error': '卖家不存在'}
+                    continue
+                inserted.append(index)
+                rows.append((item['name'], item['category'], price, item.get('description'),
+                             seller_id, now, ts))
+            
+            cursor.executemany('''
+                INSERT INTO goods (name, category, price, description, seller_id, publish_time, publish_ts)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            if rows:
+                cursor.execute('SELECT last_insert_rowid()')
+                first_id = cursor.fetchone()[0] - len(rows) + 1
+                for offset, index in enumerate(inserted):
+                    results[index] = {'goods_id': first_id + offset}
+                self._index_goods_text(cursor, [(first_id + offset, row[0], row[3])
+                                                for offset, row in enumerate(rows)])
+            
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            return {'success': False, 'message': f'批量发布失败: {str(e)}'}
+        finally:
+            conn.close()
+        return _bulk_summary(results, len(inserted), time.perf_counter() - start)
+
     def get_all_goods(self):
         """获取所有在售商品"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            cursor.execute('''
+            cursor.execute(f'''
                 SELECT g.*, u.username as seller_name
                 FROM goods g
                 JOIN users u ON g.seller_id = u.user_id
                 WHERE g.status = 'available'
-                ORDER BY g.publish_time DESC
+                ORDER BY {self._time_column('goods', 'g.')} DESC
             ''')
             
             goods = [dict(row) for row in cursor.fetchall()]
@@ -259,16 +991,179 @@ class Database:
         finally:
             conn.close()
     
+    def get_goods_page(self, cursor=None, limit=GOODS_PAGE_SIZE, category=None,
+                       min_price=None, max_price=None, seller_id=None):
+        """分页获取在售商品 - 按 (发布时间, goods_id) 倒序做键集分页
+        
+        cursor 为上一页返回的 next_cursor（{'publish_time', 'publish_ts', 'goods_id'}），首页传 None；
+        时间戳迁移前后签发的游标都可以继续使用。
+        返回 {'goods': [...], 'next_cursor': 下一页游标或None, 'version': 查询前的商品版本号}
+        """
+        limit = max(1, min(int(limit), GOODS_PAGE_MAX))
+        conditions = ["g.status = 'available'"]
+        params = []
+        
+        if category:
+            conditions.append('g.category = ?')
+            params.append(category)
+        if min_price is not None:
+            conditions.append('g.price >= ?')
+            params.append(float(min_price))
+        if max_price is not None:
+            conditions.append('g.price <= ?')
+            params.append(float(max_price))
+        if seller_id is not None:
+            conditions.append('g.seller_id = ?')
+            params.append(int(seller_id))
+        time_column = self._time_column('goods', 'g.')
+        if cursor:
+            if not self._timestamps_ready:
+                after = cursor['publish_time']
+            elif cursor.get('publish_ts') is not None:
+                after = int(cursor['publish_ts'])
+            else:
+                after = parse_time(cursor['publish_time'])
+            conditions.append(f'({time_column}, g.goods_id) < (?, ?)')
+            params.extend([after, int(cursor['goods_id'])])
+        
+        conn = self.get_connection()
+        db_cursor = conn.cursor()
+        
+        try:
+            # 先读版本号再查商品：之后的变化一定能通过 get_goods_changes(version) 拿到
+            db_cursor.execute('SELECT version FROM goods_version WHERE id = 1')
+            version = db_cursor.fetchone()['version']
+            
+            # 多取一条用于判断是否还有下一页
+            db_cursor.execute(f'''
+                SELECT g.*, u.username as seller_name
+                FROM goods g
+                JOIN users u ON g.seller_id = u.user_id
+                WHERE {' AND '.join(conditions)}
+                ORDER BY {time_column} DESC, g.goods_id DESC
+                LIMIT ?
+            ''', params + [limit + 1])
+            
+            goods = [dict(row) for row in db_cursor.fetchall()]
+            next_cursor = None
+            if len(goods) > limit:
+                goods = goods[:limit]
+                last = goods[-1]
+                next_cursor = {'publish_time': last['publish_time'], 'publish_ts': last['publish_ts'],
+                               'goods_id': last['goods_id']}
+            return {'goods': goods, 'next_cursor': next_cursor, 'version': version}
+        finally:
+            conn.close()
+    
+    def get_goods_changes(self, since_version, limit=GOODS_CHANGES_MAX):
+        """获取版本号大于 since_version 的商品变化（新增/修改、售出、下架）
+        
+        同一商品多次变化只返回其最新状态。返回
+        {'goods': 在售商品列表, 'sold': [商品ID], 'removed': [商品ID],
+         'version': 本次同步到的版本号, 'has_more': 是否还有未返回的变化}
+        """
+        since_version = max(0, int(since_version))
+        limit = max(1, min(int(limit), GOODS_CHANGES_MAX))
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            # 卖家被删除后其商品也要同步为下架，因此用 LEFT JOIN
+            cursor.execute('''
+                SELECT g.*, u.username as seller_name
+                FROM goods g
+                LEFT JOIN users u ON g.seller_id = u.user_id
+                WHERE g.version > ?
+                ORDER BY g.version
+                LIMIT ?
+            ''', (since_version, limit + 1))
+            rows = [dict(row) for row in cursor.fetchall()]
+            
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            result = {'goods': [], 'sold': [], 'removed': [],
+                      'version': rows[-1]['version'] if rows else since_version,
+                      'has_more': has_more}
+            for row in rows:
+                if row['status'] == 'available':
+                    result['goods'].append(row)
+                elif row['status'] == 'sold':
+                    result['sold'].append(row['goods_id'])
+                else:
+                    result['removed'].append(row['goods_id'])
+            return result
+        finally:
+            conn.close()
+    
+    def get_goods_by_id(self, goods_id):
+        """按ID获取单个商品（含卖家用户名），不存在时返回None"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('''
+                SELECT g.*, u.username as seller_name
+                FROM goods g
+                JOIN users u ON g.seller_id = u.user_id
+                WHERE g.goods_id = ?
+            ''', (goods_id,))
+            
+            goods = cursor.fetchone()
+            return dict(goods) if goods else None
+        finally:
+            conn.close()
+    
+    def search_goods(self, keyword, category=None, limit=GOODS_PAGE_SIZE, offset=0):
+        """全文搜索在售商品 - 按相关度排序（名称权重高于描述）
+        
+        返回 {'goods': [...], 'next_offset': 下一页偏移或None}
+        """
+        match = build_match_query(keyword)
+        if match is None:
+            return {'goods': [], 'next_offset': None}
+        
+        limit = max(1, min(int(limit), GOODS_PAGE_MAX))
+        offset = max(0, int(offset))
+        conditions = ['goods_fts MATCH ?', "g.status = 'available'"]
+        params = [match]
+        if category:
+            conditions.append('g.category = ?')
+            params.append(category)
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(f'''
+                SELECT g.*, u.username as seller_name
+                FROM goods_fts
+                JOIN goods g ON g.goods_id = goods_fts.rowid
+                JOIN users u ON g.seller_id = u.user_id
+                WHERE {' AND '.join(conditions)}
+                ORDER BY bm25(goods_fts, 10.0, 1.0), g.goods_id DESC
+                LIMIT ? OFFSET ?
+            ''', params + [limit + 1, offset])
+            
+            goods = [dict(row) for row in cursor.fetchall()]
+            next_offset = None
+            if len(goods) > limit:
+                goods = goods[:limit]
+                next_offset = offset + limit
+            return {'goods': goods, 'next_offset': next_offset}
+        finally:
+            conn.close()
+    
     def get_user_goods(self, user_id):
         """获取用户发布的所有商品"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            cursor.execute('''
+            cursor.execute(f'''
                 SELECT * FROM goods
                 WHERE seller_id = ?
-                ORDER BY publish_time DESC
+                ORDER BY {self._time_column('goods')} DESC
             ''', (user_id,))
             
             goods = [dict(row) for row in cursor.fetchall()]
@@ -278,7 +1173,7 @@ class Database:
     
     def update_goods_status(self, goods_id, status):
         """更新商品状态"""
-        with self._lock:
+        with self._hold(('goods', goods_id)):
             conn = self.get_connection()
             cursor = conn.cursor()
             
@@ -298,7 +1193,7 @@ class Database:
     
     def remove_goods(self, goods_id):
         """下架商品"""
-        with self._lock:
+        with self._hold(('goods', goods_id)):
             conn = self.get_connection()
             cursor = conn.cursor()
             
@@ -327,16 +1222,17 @@ class Database:
         """创建订单"""
         from common.utils import generate_order_id
         
-        with self._lock:
+        with self._hold(('goods', goods_id), ('user', buyer_id), ('user', seller_id)):
             conn = self.get_connection()
             cursor = conn.cursor()
             
             try:
                 order_id = generate_order_id()
+                ts, now = get_current_timestamp()
                 cursor.execute('''
-                    INSERT INTO orders (order_id, goods_id, buyer_id, seller_id, price, create_time)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (order_id, goods_id, buyer_id, seller_id, price, get_current_time()))
+                    INSERT INTO orders (order_id, goods_id, buyer_id, seller_id, price, create_time, create_ts)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (order_id, goods_id, buyer_id, seller_id, price, now, ts))
                 
                 # 更新商品状态
                 cursor.execute('UPDATE goods SET status = ? WHERE goods_id = ?', ('sold', goods_id))
@@ -355,14 +1251,14 @@ class Database:
         cursor = conn.cursor()
         
         try:
-            cursor.execute('''
+            cursor.execute(f'''
                 SELECT o.*, g.name as goods_name, u1.username as buyer_name, u2.username as seller_name
                 FROM orders o
                 JOIN goods g ON o.goods_id = g.goods_id
                 JOIN users u1 ON o.buyer_id = u1.user_id
                 JOIN users u2 ON o.seller_id = u2.user_id
                 WHERE o.buyer_id = ? OR o.seller_id = ?
-                ORDER BY o.create_time DESC
+                ORDER BY {self._time_column('orders', 'o.')} DESC
             ''', (user_id, user_id))
             
             orders = [dict(row) for row in cursor.fetchall()]
@@ -376,13 +1272,13 @@ class Database:
         cursor = conn.cursor()
         
         try:
-            cursor.execute('''
+            cursor.execute(f'''
                 SELECT o.*, g.name as goods_name, u1.username as buyer_name, u2.username as seller_name
                 FROM orders o
                 JOIN goods g ON o.goods_id = g.goods_id
                 JOIN users u1 ON o.buyer_id = u1.user_id
                 JOIN users u2 ON o.seller_id = u2.user_id
-                ORDER BY o.create_time DESC
+                ORDER BY {self._time_column('orders', 'o.')} DESC
             ''')
             
             orders = [dict(row) for row in cursor.fetchall()]
@@ -405,8 +1301,8 @@ class Database:
             conn.close()
     
     def recharge_balance(self, user_id, amount):
-        """用户充值 - 使用乐观锁防止并发问题"""
-        with self._lock:
+        """用户充值 - 按用户加锁，并使用乐观锁防止并发问题"""
+        with self._hold(('user', user_id)):
             conn = self.get_connection()
             cursor = conn.cursor()
             
@@ -415,23 +1311,26 @@ class Database:
                 if amount <= 0:
                     return {'success': False, 'message': '充值金额必须大于0'}
                 
-                # 获取当前余额
-                cursor.execute('SELECT balance FROM users WHERE user_id = ?', (user_id,))
-                result = cursor.fetchone()
-                if not result:
-                    return {'success': False, 'message': '用户不存在'}
-                
-                old_balance = result['balance']
-                new_balance = old_balance + amount
-                
-                # 更新余额
-                cursor.execute('''
-                    UPDATE users SET balance = ? WHERE user_id = ? AND balance = ?
-                ''', (new_balance, user_id, old_balance))
-                
-                if cursor.rowcount == 0:
-                    # 更新失败，可能是并发修改，重试
-                    return self.recharge_balance(user_id, amount)
+                for _ in range(BALANCE_UPDATE_RETRIES + 1):
+                    # 获取当前余额
+                    cursor.execute('SELECT balance FROM users WHERE user_id = ?', (user_id,))
+                    result = cursor.fetchone()
+                    if not result:
+                        return {'success': False, 'message': '用户不存在'}
+                    
+                    old_balance = result['balance']
+                    new_balance = old_balance + amount
+                    
+                    # 更新余额
+                    cursor.execute('''
+                        UPDATE users SET balance = ? WHERE user_id = ? AND balance = ?
+                    ''', (new_balance, user_id, old_balance))
+                    if cursor.rowcount:
+                        break
+                    # 更新失败，可能是并发修改：回滚释放写锁，在同一连接上重新读取余额后重试
+                    conn.rollback()
+                else:
+                    return {'success': False, 'message': '余额正在被修改，充值失败，请重试'}
                 
                 conn.commit()
                 return {
@@ -447,9 +1346,18 @@ class Database:
             finally:
                 conn.close()
     
-    def purchase_goods(self, goods_id, buyer_id, seller_id, price):
-        """购买商品 - 完整事务处理"""
-        with self._lock:
+    def purchase_goods(self, goods_id, buyer_id):
+        """购买商品 - 完整事务处理（按统一顺序锁定商品、买家、卖家）
+        
+        卖家和价格在事务内从商品表读取，整个购买只需常数条走索引的语句。
+        """
+        # 商品的卖家不会改变，先按主键查出卖家，以便按统一顺序加锁
+        target = self.get_goods_by_id(goods_id)
+        if not target:
+            return {'success': False, 'message': '商品不存在'}
+        seller_id = target['seller_id']
+        
+        with self._hold(('goods', goods_id), ('user', buyer_id), ('user', seller_id)):
             conn = self.get_connection()
             cursor = conn.cursor()
             
@@ -459,13 +1367,14 @@ class Database:
                 
                 # 1. 检查商品状态（加锁）
                 cursor.execute('''
-                    SELECT status, seller_id FROM goods WHERE goods_id = ?
+                    SELECT status, seller_id, price FROM goods WHERE goods_id = ?
                 ''', (goods_id,))
                 goods = cursor.fetchone()
                 
                 if not goods:
                     raise Exception('商品不存在')
                 
+                price = goods['price']
                 if goods['status'] != 'available':
                     raise Exception('商品已售出或已下架')
                 
@@ -492,14 +1401,17 @@ class Database:
                 cursor.execute('''
                     UPDATE users SET balance = balance + ? WHERE user_id = ?
                 ''', (price, seller_id))
+                cursor.execute('SELECT balance FROM users WHERE user_id = ?', (seller_id,))
+                new_seller_balance = cursor.fetchone()['balance']
                 
                 # 5. 创建订单
                 from common.utils import generate_order_id
                 order_id = generate_order_id()
+                ts, now = get_current_timestamp()
                 cursor.execute('''
-                    INSERT INTO orders (order_id, goods_id, buyer_id, seller_id, price, status, create_time)
-                    VALUES (?, ?, ?, ?, ?, 'completed', ?)
-                ''', (order_id, goods_id, buyer_id, seller_id, price, get_current_time()))
+                    INSERT INTO orders (order_id, goods_id, buyer_id, seller_id, price, status, create_time, create_ts)
+                    VALUES (?, ?, ?, ?, ?, 'completed', ?, ?)
+                ''', (order_id, goods_id, buyer_id, seller_id, price, now, ts))
                 
                 # 6. 更新商品状态为已售
                 cursor.execute('''
@@ -513,7 +1425,9 @@ class Database:
                     'success': True,
                     'message': '购买成功！',
                     'order_id': order_id,
-                    'new_balance': new_buyer_balance
+                    'new_balance': new_buyer_balance,
+                    'seller_id': seller_id,
+                    'seller_balance': new_seller_balance
                 }
                 
             except Exception as e:
@@ -525,39 +1439,69 @@ class Database:
     # =================== 统计分析功能 ===================
     
     def get_goods_category_stats(self):
-        """获取商品类别统计数据"""
+        """获取商品类别统计数据（在售+已售），读触发器维护的计数表，与商品总数无关"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
             cursor.execute('''
-                SELECT category, COUNT(*) as count
-                FROM goods
+                SELECT category, SUM(count) as total
+                FROM goods_category_counts
                 WHERE status != 'removed'
                 GROUP BY category
-                ORDER BY count DESC
+                HAVING total > 0
+                ORDER BY total DESC
             ''')
             
-            stats = {row['category']: row['count'] for row in cursor.fetchall()}
+            stats = {row['category']: row['total'] for row in cursor.fetchall()}
             return stats
         finally:
             conn.close()
     
+    def check_category_counts(self, repair=False):
+        """类别计数一致性检查 - 从 goods 表重新统计并与计数表逐项对比
+        
+        返回有偏差的 (类别, 状态) 及期望值/实际值；repair=True 时发现偏差即重建计数表。
+        检查在一个写事务中进行，期间的商品写入等待检查结束，对比结果不受并发写入影响。
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('BEGIN IMMEDIATE TRANSACTION')
+            cursor.execute('SELECT category, status, COUNT(*) as count FROM goods GROUP BY category, status')
+            expected = {(row['category'], row['status']): row['count'] for row in cursor.fetchall()}
+            cursor.execute('SELECT category, status, count FROM goods_category_counts')
+            actual = {(row['category'], row['status']): row['count'] for row in cursor.fetchall()}
+            
+            drift = [
+                {'category': category, 'status': status,
+                 'expected': expected.get((category, status), 0), 'actual': actual.get((category, status), 0)}
+                for category, status in sorted(set(expected) | set(actual))
+                if expected.get((category, status), 0) != actual.get((category, status), 0)
+            ]
+            repaired = bool(drift) and repair
+            if repaired:
+                self._rebuild_category_counts(cursor)
+            conn.commit()
+            return {'success': True, 'consistent': not drift, 'drift': drift, 'repaired': repaired}
+        except Exception as e:
+            conn.rollback()
+            return {'success': False, 'message': f'检查类别计数失败：{str(e)}'}
+        finally:
+            conn.close()
+    
     def get_daily_sales_stats(self, days=7):
-        """获取最近N天的销售统计"""
+        """获取最近N个有成交的日期的销售统计（读日汇总表的最后N行）"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
             cursor.execute('''
-                SELECT 
-                    substr(create_time, 1, 10) as date,
-                    SUM(price) as total_amount,
-                    COUNT(*) as order_count
-                FROM orders
-                WHERE status = 'completed'
-                GROUP BY date
-                ORDER BY date DESC
+                SELECT period as date, ROUND(total_amount, 2) as total_amount
+                FROM sales_daily
+                WHERE order_count > 0
+                ORDER BY period DESC
                 LIMIT ?
             ''', (days,))
             
@@ -566,6 +1510,52 @@ class Database:
         finally:
             conn.close()
     
+    def get_sales_stats(self, start, end, granularity='day'):
+        """按日/周/月获取 [start, end] 日期范围内的销售统计
+        
+        只按主键范围读取汇总表中的对应周期；没有成交的周期补零，便于画连续的图表。
+        start/end 为 'YYYY-MM-DD'，分别对齐到所在周期的起始日期。
+        """
+        if granularity not in SALES_ROLLUPS:
+            return {'success': False, 'message': f'不支持的统计粒度: {granularity}'}
+        try:
+            first = _period_start(datetime.date.fromisoformat(start), granularity)
+            last = _period_start(datetime.date.fromisoformat(end), granularity)
+        except (TypeError, ValueError):
+            return {'success': False, 'message': '日期格式应为 YYYY-MM-DD'}
+        if first > last:
+            return {'success': False, 'message': '开始日期不能晚于结束日期'}
+        
+        periods = [first]
+        while periods[-1] < last:
+            if len(periods) >= SALES_STATS_MAX_PERIODS:
+                return {'success': False, 'message': f'时间范围过大，最多 {SALES_STATS_MAX_PERIODS} 个统计周期'}
+            periods.append(_next_period(periods[-1], granularity))
+        
+        table = SALES_ROLLUPS[granularity][0]
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(f'''
+                SELECT period, order_count, ROUND(total_amount, 2) as total_amount
+                FROM {table}
+                WHERE period BETWEEN ? AND ?
+            ''', (first.isoformat(), last.isoformat()))
+            rows = {row['period']: row for row in cursor.fetchall()}
+            
+            stats = []
+            for period in periods:
+                row = rows.get(period.isoformat())
+                stats.append({
+                    'period': period.isoformat(),
+                    'order_count': row['order_count'] if row else 0,
+                    'total_amount': row['total_amount'] if row else 0.0,
+                })
+            return {'success': True, 'granularity': granularity, 'stats': stats}
+        finally:
+            conn.close()
+    
     def get_top_sellers(self, limit=10):
         """获取销售排行榜"""
         conn = self.get_connection()
@@ -590,31 +1580,38 @@ class Database:
             conn.close()
     
     def get_system_statistics(self):
-        """获取系统综合统计"""
+        """获取系统综合统计 - 用户按角色、商品按状态、订单按状态的数量及交易额
+        
+        只读触发器维护的计数表，耗时与用户、商品和订单的数量无关。
+        交易额为未取消订单的金额合计。
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            stats = {}
+            cursor.execute('SELECT role, count FROM user_role_counts')
+            users = {row['role']: row['count'] for row in cursor.fetchall()}
             
-            # 用户统计
-            cursor.execute('SELECT COUNT(*) as count FROM users WHERE role = ?', (USER_ROLE,))
-            stats['total_users'] = cursor.fetchone()['count']
+            cursor.execute('SELECT status, SUM(count) as count FROM goods_category_counts GROUP BY status')
+            goods = {row['status']: row['count'] for row in cursor.fetchall()}
             
-            # 商品统计
-            cursor.execute('SELECT COUNT(*) as count FROM goods WHERE status = "available"')
-            stats['available_goods'] = cursor.fetchone()['count']
+            cursor.execute('SELECT status, count, amount FROM order_status_counts')
+            orders = {}
+            revenue = 0.0
+            for row in cursor.fetchall():
+                orders[row['status']] = row['count']
+                if row['status'] != 'cancelled':
+                    revenue += row['amount']
             
-            cursor.execute('SELECT COUNT(*) as count FROM goods WHERE status = "sold"')
-            stats['sold_goods'] = cursor.fetchone()['count']
-            
-            # 订单统计
-            cursor.execute('SELECT COUNT(*) as count, SUM(price) as total FROM orders WHERE status = "completed"')
-            order_stats = cursor.fetchone()
-            stats['total_orders'] = order_stats['count'] or 0
-            stats['total_revenue'] = order_stats['total'] or 0.0
-            
-            return stats
+            return {
+                'users': {'total': sum(users.values()),
+                          USER_ROLE: users.get(USER_ROLE, 0), ADMIN_ROLE: users.get(ADMIN_ROLE, 0)},
+                'goods': {'total': sum(goods.values()),
+                          **{status: goods.get(status, 0) for status in ('available', 'sold', 'removed')}},
+                'orders': {'total': sum(orders.values()),
+                           **{status: orders.get(status, 0) for status in ('pending', 'completed', 'cancelled')}},
+                'revenue': round(revenue, 2),
+            }
         finally:
             conn.close()
 
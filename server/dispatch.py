@@ -0,0 +1,218 @@
+import heapq
+import itertools
+import threading
+import time
+from common.config import ACTION_TIMEOUT
+
+# 延迟直方图的桶上界（毫秒），最后一个桶收集所有更慢的请求
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class ActionSpec:
+    """动作元数据"""
+
+    __slots__ = ('name', 'handler', 'requires_login', 'admin_only', 'write', 'timeout',
+                 'invalidates_catalogue', 'barrier', 'idempotent')
+
+    def __init__(self, name, handler, requires_login, admin_only, write, timeout,
+                 invalidates_catalogue, barrier, idempotent):
+        self.name = name
+        self.handler = handler
+        self.requires_login = requires_login
+        self.admin_only = admin_only
+        self.write = write
+        self.timeout = timeout
+        self.invalidates_catalogue = invalidates_catalogue
+        self.barrier = barrier
+        self.idempotent = idempotent
+
+
+class ActionRegistry:
+    """动作注册表 - 动作名 -> 处理函数及其元数据（是否需要登录、仅管理员、读/写、超时、
+    成功后是否使商品目录缓存失效、是否为连接上的屏障、是否支持幂等键）"""
+
+    def __init__(self):
+        self._actions = {}
+
+    def register(self, name, requires_login=True, admin_only=False, write=False, timeout=ACTION_TIMEOUT,
+                 invalidates_catalogue=False, barrier=False, idempotent=False):
+        """装饰器：注册处理函数，处理函数签名为 handler(server, data, client_socket)
+
+        处理函数可以返回响应字典，也可以直接返回已编码的响应帧（来自缓存）。
+        barrier=True 的动作会改变连接状态（握手、登录），管线化时处理完成前不读取该连接的后续请求。
+        idempotent=True 的动作在请求带 idempotency_key 时，同一用户的同一个键只执行一次。
+        """
+        def decorator(handler):
+            self._actions[name] = ActionSpec(name, handler, requires_login, admin_only, write, timeout,
+                                             invalidates_catalogue, barrier, idempotent)
+            return handler
+        return decorator
+
+    def get(self, name):
+        return self._actions.get(name)
+
+    def names(self):
+        return list(self._actions)
+
+
+class ActionMetrics:
+    """按动作统计调用次数、失败次数、超时次数、延迟直方图，以及响应字节数和压缩效果"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _entry(self, name):
+        entry = self._stats.get(name)
+        if entry is None:
+            entry = self._stats[name] = {
+                'calls': 0, 'errors': 0, 'timeouts': 0,
+                'total_ms': 0.0, 'max_ms': 0.0,
+                'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                'bytes_raw': 0, 'bytes_wire': 0, 'compressed': 0, 'compress_ms': 0.0,
+            }
+        return entry
+
+    def record(self, name, elapsed, success):
+        """记录一次调用，elapsed 单位为秒"""
+        elapsed_ms = elapsed * 1000
+        index = len(LATENCY_BUCKETS_MS)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                index = i
+                break
+
+        with self._lock:
+            entry = self._entry(name)
+            entry['calls'] += 1
+            if not success:
+                entry['errors'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['buckets'][index] += 1
+
+    def record_transfer(self, name, raw_bytes, wire_bytes, compressed):
+        """记录一次响应编码后的字节数和实际发送的字节数"""
+        with self._lock:
+            entry = self._entry(name)
+            entry['bytes_raw'] += raw_bytes
+            entry['bytes_wire'] += wire_bytes
+            if compressed:
+                entry['compressed'] += 1
+
+    def record_compression(self, name, elapsed):
+        """记录一次压缩的CPU耗时（秒），缓存命中的响应不重复压缩"""
+        with self._lock:
+            self._entry(name)['compress_ms'] += elapsed * 1000
+
+    def record_timeout(self, name):
+        with self._lock:
+            self._entry(name)['timeouts'] += 1
+
+    def snapshot(self):
+        """导出统计数据"""
+        labels = [f'<={bound}ms' for bound in LATENCY_BUCKETS_MS] + [f'>{LATENCY_BUCKETS_MS[-1]}ms']
+        with self._lock:
+            result = {}
+            for name, entry in self._stats.items():
+                calls = entry['calls']
+                result[name] = {
+                    'calls': calls,
+                    'errors': entry['errors'],
+                    'timeouts': entry['timeouts'],
+                    'avg_ms': round(entry['total_ms'] / calls, 3) if calls else 0.0,
+                    'max_ms': round(entry['max_ms'], 3),
+                    'histogram': dict(zip(labels, entry['buckets'])),
+                    'bytes_raw': entry['bytes_raw'],
+                    'bytes_wire': entry['bytes_wire'],
+                    'compressed': entry['compressed'],
+                    'compression_ratio': (round(entry['bytes_wire'] / entry['bytes_raw'], 4)
+                                          if entry['bytes_raw'] else 1.0),
+                    'compress_ms': round(entry['compress_ms'], 3),
+                }
+            return result
+
+
+class TimeoutWatch:
+    """watch() 返回的句柄 - 请求完成后调用 cancel()，回调不再执行"""
+
+    __slots__ = ('callback', '_watcher')
+
+    def __init__(self, watcher, callback):
+        self.callback = callback
+        self._watcher = watcher
+
+    def cancel(self):
+        self._watcher._cancel(self)
+
+
+class TimeoutWatcher:
+    """超时监视 - 单个后台线程按截止时间触发回调，管线化请求不必各占一个线程等待结果
+
+    已取消的条目留在堆中，到期时丢弃；取消的条目超过堆的一半时重建堆，
+    堆的大小因此与仍在等待的请求数成正比，而不是请求速率 × 超时时间。
+    """
+
+    # 取消的条目少于该数量时不重建堆
+    COMPACT_MIN = 64
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = itertools.count()
+        self._thread = None
+        self._closed = False
+        self._cancelled = 0  # 堆中已取消的条目数
+
+    def watch(self, timeout, callback):
+        """timeout 秒后在监视线程中调用 callback()，返回可取消的 TimeoutWatch"""
+        handle = TimeoutWatch(self, callback)
+        with self._cond:
+            if self._closed:
+                handle.callback = None
+                return handle
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='timeout-watcher', daemon=True)
+                self._thread.start()
+            heapq.heappush(self._heap, (time.monotonic() + timeout, next(self._seq), handle))
+            self._cond.notify()
+        return handle
+
+    def _cancel(self, handle):
+        with self._cond:
+            if handle.callback is None:
+                return  # 已触发或已取消
+            handle.callback = None
+            self._cancelled += 1
+            if self._cancelled >= self.COMPACT_MIN and self._cancelled * 2 > len(self._heap):
+                self._heap = [entry for entry in self._heap if entry[2].callback is not None]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    self._cond.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                if self._closed:
+                    return
+                due = []
+                while self._heap and self._heap[0][0] <= time.monotonic():
+                    handle = heapq.heappop(self._heap)[2]
+                    if handle.callback is None:
+                        self._cancelled -= 1
+                        continue
+                    due.append(handle.callback)
+                    handle.callback = None
+            for callback in due:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"超时回调执行失败: {e}")
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._heap.clear()
+            self._cancelled = 0
+            self._cond.notify()
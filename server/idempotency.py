@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+from common.config import IDEMPOTENCY_TTL, IDEMPOTENCY_MAX_ENTRIES
+
+
+class _Entry:
+    """一个幂等键的执行记录 - 执行中时 done 未置位，重复请求等待其结果"""
+
+    __slots__ = ('fingerprint', 'done', 'result', 'expires_at')
+
+    def __init__(self, fingerprint, expires_at):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.result = None
+        self.expires_at = expires_at
+
+
+class IdempotencyStore:
+    """幂等键表 - 键 -> 首次执行的结果，有界且按 TTL 过期
+
+    客户端为写请求附带幂等键后，超时或断线重发的同一请求直接返回首次执行的结果，
+    不会重复扣款/充值/上架。首次执行尚未完成时重复请求等待其结果而不是再执行一次；
+    处理函数抛出异常（事务已回滚）时删除记录，之后的重发会重新执行。
+
+    表只在内存中，服务器重启后之前的键失效。
+    """
+
+    def __init__(self, ttl=IDEMPOTENCY_TTL, max_entries=IDEMPOTENCY_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> _Entry，按创建顺序（即过期顺序）
+        self._executed = 0
+        self._replayed = 0
+        self._waited = 0
+        self._mismatched = 0
+        self._expired = 0
+        self._evictions = 0
+
+    def run(self, key, fingerprint, func, wait_timeout):
+        """同一 key 只执行一次 func()，返回其结果
+
+        fingerprint 为请求参数的摘要，同一个键用于参数不同的请求时返回错误响应；
+        首次执行超过 wait_timeout 秒仍未完成时，重复请求返回"处理中"。
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(fingerprint, now + self.ttl)
+                self._evict()
+                owner = True
+            else:
+                owner = False
+                if entry.fingerprint != fingerprint:
+                    self._mismatched += 1
+                    return {'success': False, 'message': '该幂等键已用于参数不同的请求'}
+                if entry.done.is_set():
+                    self._replayed += 1
+                else:
+                    self._waited += 1
+
+        if not owner:
+            if not entry.done.wait(wait_timeout):
+                return {'success': False, 'message': '相同请求正在处理中，请稍后重试'}
+            if entry.result is None:
+                # 首次执行抛出了异常，记录已删除
+                return {'success': False, 'message': '相同请求执行失败，请重试'}
+            return entry.result
+
+        try:
+            entry.result = func()
+        except Exception:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            raise
+        finally:
+            entry.done.set()
+        with self._lock:
+            self._executed += 1
+        return entry.result
+
+    def _purge_expired(self, now):
+        """删除已过期且已完成的记录 - 从表头检查到第一条未过期的记录，执行中的记录跳过"""
+        expired = []
+        for key, entry in self._entries.items():
+            if now < entry.expires_at:
+                break
+            if entry.done.is_set():
+                expired.append(key)
+        for key in expired:
+            del self._entries[key]
+        self._expired += len(expired)
+
+    def _evict(self):
+        """超出容量时从最早的已完成记录开始淘汰 - 执行中的记录被淘汰后，重发的请求会再执行一次"""
+        excess = len(self._entries) - self.max_entries
+        if excess <= 0:
+            return
+        victims = []
+        for key, entry in self._entries.items():
+            if entry.done.is_set():
+                victims.append(key)
+                if len(victims) == excess:
+                    break
+        for key in victims:
+            del self._entries[key]
+        self._evictions += len(victims)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'executed': self._executed,
+                'replayed': self._replayed,
+                'waited': self._waited,
+                'mismatched': self._mismatched,
+                'expired': self._expired,
+                'evictions': self._evictions,
+                'ttl': self.ttl,
+                'max_entries': self.max_entries,
+            }
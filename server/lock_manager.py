@@ -0,0 +1,57 @@
+import threading
+from contextlib import contextmanager
+
+
+class LockManager:
+    """细粒度锁管理 - 按实体（用户、商品、用户名）加锁，只串行化相互冲突的写操作
+
+    锁键形如 ('user', user_id)、('goods', goods_id)。同时需要多个锁时按统一顺序
+    依次获取，保证不会出现死锁；无人使用的锁会被自动回收。
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._locks = {}  # key -> [RLock, 引用计数]
+        self._counters = {'acquired': 0, 'contended': 0}
+
+    @contextmanager
+    def hold(self, *keys):
+        """按全局统一顺序获取多个实体锁，退出时逆序释放"""
+        # 同一实体只加一次锁；统一排序避免 A->B / B->A 交叉等待
+        ordered = sorted(set(keys), key=repr)
+
+        with self._mutex:
+            entries = []
+            for key in ordered:
+                entry = self._locks.get(key)
+                if entry is None:
+                    entry = self._locks[key] = [threading.RLock(), 0]
+                entry[1] += 1
+                entries.append((key, entry))
+
+        acquired = []
+        contended = 0
+        try:
+            for key, entry in entries:
+                if not entry[0].acquire(blocking=False):
+                    contended += 1
+                    entry[0].acquire()
+                acquired.append(entry[0])
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+            with self._mutex:
+                self._counters['acquired'] += len(acquired)
+                self._counters['contended'] += contended
+                for key, entry in entries:
+                    entry[1] -= 1
+                    if entry[1] == 0:
+                        del self._locks[key]
+
+    def stats(self):
+        """锁统计：获取次数、发生等待的次数、当前活跃的锁数量"""
+        with self._mutex:
+            stats = dict(self._counters)
+            stats['active'] = len(self._locks)
+            return stats
@@ -0,0 +1,45 @@
+import re
+
+# 中文（CJK统一表意文字）连续片段，或其它字母数字组成的单词
+_CJK_RANGES = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_TOKEN_RE = re.compile(f'[{_CJK_RANGES}]+|[^\\W_{_CJK_RANGES}]+')
+_CJK_RE = re.compile(f'[{_CJK_RANGES}]')
+
+
+def _is_cjk(run):
+    return _CJK_RE.match(run) is not None
+
+
+def fts_tokens(text):
+    """生成写入全文索引的词串 - 中文按单字 + 相邻双字切分，其它按单词（小写）
+
+    例如 "iPhone 数据结构" -> "iphone 数 据 结 构 数据 据结 结构"。
+    在 Python 中调用，结果保存在 goods_tokens 表，由触发器复制到全文索引。
+    """
+    if not text:
+        return ''
+    tokens = []
+    for run in _TOKEN_RE.findall(text.lower()):
+        if _is_cjk(run):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return ' '.join(tokens)
+
+
+def build_match_query(keyword):
+    """把用户输入的关键词转换为FTS5 MATCH表达式，无有效词时返回None
+
+    中文片段用双字（单个汉字用单字）匹配，其它单词做前缀匹配，各词之间为AND关系。
+    """
+    terms = []
+    for run in _TOKEN_RE.findall((keyword or '').lower()):
+        if _is_cjk(run):
+            if len(run) == 1:
+                terms.append(f'"{run}"')
+            else:
+                terms.extend(f'"{run[i:i + 2]}"' for i in range(len(run) - 1))
+        else:
+            terms.append(f'"{run}"*')
+    return ' '.join(terms) if terms else None
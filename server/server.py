@@ -1,28 +1,89 @@
 import socket
 import threading
 import json
-from common.config import SERVER_HOST, SERVER_PORT, BUFFER_SIZE
-from common.utils import serialize_data, deserialize_data
+import time
+import datetime
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from common.config import (SERVER_HOST, SERVER_PORT, BUFFER_SIZE, SERVER_BACKLOG,
+                           ADMIN_ROLE, READ_WORKERS, WRITE_WORKERS, GOODS_PAGE_SIZE,
+                           COMPRESSION_THRESHOLD, COMPRESSION_LEVEL, BATCH_MAX_REQUESTS, BATCH_TIMEOUT,
+                           SUMMARY_CACHE_TTL)
+from common.protocol import (HEADER_SIZE, REQUEST_ID_SIZE, EVENT_REQUEST_ID, COMPRESSION_ZLIB, Frame,
+                             pack_frame, unpack_header, attach_request_id, unpack_request_id,
+                             compress_payload, decompress_payload, make_event,
+                             EVENT_BALANCE_CHANGED, EVENT_GOODS_ADDED, EVENT_GOODS_SOLD,
+                             EVENT_GOODS_REMOVED, EVENT_FORCE_LOGOUT)
+from common.codec import JSON_CODEC, negotiate
+from server.cache import ResponseCache
 from server.database import Database
+from server.dispatch import ActionRegistry, ActionMetrics, TimeoutWatcher
+from server.sessions import SessionStore
+from server.idempotency import IdempotencyStore
+
+# 动作注册表：动作名 -> 处理函数及元数据
+actions = ActionRegistry()
+
+
+class SocketConnection:
+    """线程模式的客户端连接 - 响应和推送事件可能来自不同线程，整帧加锁发送避免交错"""
+    
+    def __init__(self, sock):
+        self.sock = sock
+        self.codec = JSON_CODEC  # hello 握手后切换为协商的编解码器
+        self.compression = False  # hello 握手时对端声明支持zlib后启用
+        self.request_ids = False  # hello 握手后启用：帧带请求ID，请求可并发处理、乱序返回
+        self._send_lock = threading.Lock()
+    
+    def send(self, data):
+        with self._send_lock:
+            self.sock.sendall(data)
+        return len(data)
+    
+    def close(self):
+        self.sock.close()
 
 class Server:
-    def __init__(self):
+    def __init__(self, host=SERVER_HOST, port=SERVER_PORT, backlog=SERVER_BACKLOG):
+        self.host = host
+        self.port = port
+        self.backlog = backlog
         self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.server.bind((SERVER_HOST, SERVER_PORT))
+        self.server.bind((host, port))
         self.db = Database()
-        self.clients = {}
+        # 旧数据库升级：在后台分批回填整数时间戳列，不阻塞服务启动
+        self.db.start_timestamp_migration()
+        self.clients = {}  # 连接 -> 登录用户（与其会话共用同一个字典）
+        # 登录会话：按令牌和 user_id 索引，断线重连后凭令牌恢复
+        self.sessions = SessionStore()
+        # 写请求的幂等键 -> 首次执行结果，客户端超时重发时不会重复执行
+        self.idempotency = IdempotencyStore()
         self.running = False
+        self.metrics = ActionMetrics()
+        # 商品目录（在售商品列表/分页）的已编码响应缓存
+        self.catalogue_cache = ResponseCache()
+        # 系统概况的已编码响应，短时间内的重复请求（如多个管理员刷新仪表盘）直接复用
+        self.summary_cache = ResponseCache(ttl=SUMMARY_CACHE_TTL, max_entries=8)
+        # 只读请求与写请求使用不同的线程池，写操作拥堵时不影响浏览
+        self.read_executor = ThreadPoolExecutor(max_workers=READ_WORKERS, thread_name_prefix='read-worker')
+        self.write_executor = ThreadPoolExecutor(max_workers=WRITE_WORKERS, thread_name_prefix='write-worker')
+        # 管线化请求的超时由单个监视线程负责
+        self.timeouts = TimeoutWatcher()
+        # 批量事务执行期间的推送（事件及会话中的余额更新）先暂存，提交后再执行
+        self._deferred_events = threading.local()
     
     def start(self):
         """启动服务器"""
         self.running = True
-        self.server.listen(5)
-        print(f"服务器启动成功，监听 {SERVER_HOST}:{SERVER_PORT}")
+        self.server.listen(self.backlog)
+        print(f"服务器启动成功，监听 {self.host}:{self.port}")
         
         while self.running:
             try:
                 client_socket, address = self.server.accept()
+                # 管线化时一条连接上会连续写出多个小帧，关闭Nagle避免与延迟确认叠加产生等待
+                client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
                 print(f"新连接来自: {address}")
                 
                 client_thread = threading.Thread(
@@ -38,6 +99,7 @@ class Server:
     
     def handle_client(self, client_socket, address):
         """处理客户端请求"""
+        connection = SocketConnection(client_socket)
         try:
             while True:
                 # 先接收数据长度头（4字节）
@@ -45,40 +107,50 @@ class Server:
                 if not length_data:
                     break
                 
-                # 解析数据长度
-                data_length = int.from_bytes(length_data, byteorder='big')
+                # 解析数据长度和压缩标志
+                data_length, compressed = unpack_header(length_data)
+                
+                # 启用请求ID后，长度头之后是4字节请求ID
+                request_id = None
+                if connection.request_ids:
+                    id_data = self._recv_exact(client_socket, REQUEST_ID_SIZE)
+                    if id_data is None:
+                        break
+                    request_id = unpack_request_id(id_data)
                 
                 # 接收完整的数据
                 data = self._recv_exact(client_socket, data_length)
-                if not data:
+                if data is None:
                     break
                 
+                # hello 握手的响应仍使用握手前的编解码器
+                codec, compress = connection.codec, connection.compression
                 try:
-                    request = deserialize_data(data.decode('utf-8'))
-                    response = self.process_request(request, client_socket)
-                    
-                    response_data = serialize_data(response)
-                    # 发送数据长度头
-                    response_length = len(response_data.encode('utf-8'))
-                    client_socket.send(response_length.to_bytes(4, byteorder='big'))
-                    # 发送实际数据
-                    client_socket.send(response_data.encode('utf-8'))
-                    
-                except json.JSONDecodeError as e:
-                    error_response = {'success': False, 'message': f'数据格式错误: {str(e)}'}
-                    error_data = serialize_data(error_response)
-                    error_length = len(error_data.encode('utf-8'))
-                    client_socket.send(error_length.to_bytes(4, byteorder='big'))
-                    client_socket.send(error_data.encode('utf-8'))
+                    request = codec.decode(decompress_payload(data) if compressed else data)
+                except ValueError as e:
+                    self.send_reply(connection, {'success': False, 'message': f'数据格式错误: {str(e)}'},
+                                    codec, compress, request_id)
+                    continue
+                
+                if request_id is None:
+                    response = self.process_request(request, connection)
+                    # 长度头和数据作为一帧发送，与推送事件互不交错
+                    self.send_reply(connection, response, codec, compress)
+                else:
+                    self.process_pipelined(request, request_id, connection, codec, compress)
                 
         except Exception as e:
             print(f"处理客户端 {address} 时发生错误: {e}")
         finally:
-            client_socket.close()
-            if client_socket in self.clients:
-                del self.clients[client_socket]
+            connection.close()
+            self.drop_client(connection)
             print(f"客户端 {address} 断开连接")
     
+    def drop_client(self, connection):
+        """连接断开：撤销其登录状态，会话保留一段时间供重连恢复"""
+        self.clients.pop(connection, None)
+        self.sessions.detach(connection)
+    
     def _recv_exact(self, client_socket, length):
         """精确接收指定长度的数据"""
         data = b''
@@ -89,49 +161,157 @@ class Server:
             data += chunk
         return data
     
+    def send_reply(self, connection, response, codec, compress, request_id=None):
+        """编码并发送响应帧，连接已断开时忽略"""
+        frame = self.build_frame(response, codec, compress)
+        if request_id is not None:
+            frame = attach_request_id(frame, request_id)
+        try:
+            connection.send(frame)
+        except OSError:
+            pass
+    
+    def build_frame(self, response, codec=JSON_CODEC, compress=False, action=None):
+        """把响应编码为一帧，对端支持压缩且超过阈值时zlib压缩
+        
+        处理函数返回 Frame（来自缓存）时原样使用；指定 action 时记录压缩耗时。
+        """
+        if isinstance(response, Frame):
+            return response
+        
+        payload = codec.encode(response)
+        if compress and len(payload) >= COMPRESSION_THRESHOLD:
+            start = time.perf_counter()
+            compressed = compress_payload(payload, COMPRESSION_LEVEL)
+            if action:
+                self.metrics.record_compression(action, time.perf_counter() - start)
+            if compressed is not None:
+                return pack_frame(compressed, compressed=True, raw_size=len(payload))
+        return pack_frame(payload)
+    
     def process_request(self, request, client_socket):
-        """处理客户端请求"""
-        action = request.get('action')
-        data = request.get('data', {})
-        
-        if action == 'register':
-            return self.handle_register(data)
-        elif action == 'login':
-            return self.handle_login(data, client_socket)
-        elif action == 'get_all_goods':
-            return self.handle_get_all_goods()
-        elif action == 'add_goods':
-            return self.handle_add_goods(data)
-        elif action == 'get_user_goods':
-            return self.handle_get_user_goods(data)
-        elif action == 'create_order':
-            return self.handle_create_order(data)
-        elif action == 'get_user_orders':
-            return self.handle_get_user_orders(data)
-        elif action == 'get_all_users':
-            return self.handle_get_all_users(data)
-        elif action == 'update_goods_status':
-            return self.handle_update_goods_status(data)
-        elif action == 'recharge_balance':
-            return self.handle_recharge_balance(data)
-        elif action == 'purchase_goods':
-            return self.handle_purchase_goods(data)
-        elif action == 'get_user_balance':
-            return self.handle_get_user_balance(data)
-        elif action == 'remove_goods':
-            return self.handle_remove_goods(data)
-        elif action == 'delete_user':
-            return self.handle_delete_user(data)
-        elif action == 'get_all_orders':
-            return self.handle_get_all_orders(data)
-        elif action == 'get_goods_category_stats':
-            return self.handle_get_goods_category_stats()
-        elif action == 'get_daily_sales_stats':
-            return self.handle_get_daily_sales_stats()
-        else:
-            return {'success': False, 'message': '未知操作'}
+        """处理客户端请求 - 查表分发到读/写线程池，并在动作超时时间内等待结果"""
+        spec, error = self.resolve_action(request, client_socket)
+        if error:
+            return error
+        
+        future = self.submit_action(spec, request.get('data') or {}, client_socket)
+        try:
+            return future.result(timeout=spec.timeout)
+        except FutureTimeoutError:
+            return self.timeout_response(spec)
     
-    def handle_register(self, data):
+    def process_pipelined(self, request, request_id, connection, codec, compress):
+        """处理带请求ID的请求 - 提交到线程池后立即返回，结果就绪或超时后带ID发回
+        
+        同一连接上的多个请求并发执行、乱序完成；屏障动作（握手、登录）仍同步处理，
+        保证其后的请求看到新的连接状态。
+        """
+        spec, error = self.resolve_action(request, connection)
+        if error:
+            self.send_reply(connection, error, codec, compress, request_id)
+            return
+        
+        future = self.submit_action(spec, request.get('data') or {}, connection)
+        if spec.barrier:
+            try:
+                response = future.result(timeout=spec.timeout)
+            except FutureTimeoutError:
+                response = self.timeout_response(spec)
+            self.send_reply(connection, response, codec, compress, request_id)
+            return
+        
+        # 结果和超时谁先到就发送谁，另一个被忽略
+        claimed = threading.Lock()
+        
+        def reply(make_response):
+            if claimed.acquire(blocking=False):
+                self.send_reply(connection, make_response(), codec, compress, request_id)
+        
+        def result(f):
+            # run_action 自身出错（如响应编码失败）或任务被取消时也要回复，否则客户端只能等到超时
+            if f.cancelled():
+                return {'success': False, 'message': '服务器正在关闭，请求已取消'}
+            try:
+                return f.result()
+            except Exception as e:
+                print(f"处理请求 {spec.name} 时发生错误: {e}")
+                return {'success': False, 'message': f'服务器内部错误: {str(e)}'}
+        
+        watch = self.timeouts.watch(spec.timeout, lambda: reply(lambda: self.timeout_response(spec)))
+        
+        def done(f):
+            watch.cancel()
+            reply(lambda: result(f))
+        
+        future.add_done_callback(done)
+    
+    def resolve_action(self, request, client_socket):
+        """查找动作并做登录/权限校验，返回 (spec, 错误响应)"""
+        spec = actions.get(request.get('action'))
+        if spec is None:
+            return None, {'success': False, 'message': '未知操作'}
+        
+        user = self.clients.get(client_socket)
+        if spec.requires_login and not user:
+            return None, {'success': False, 'message': '请先登录'}
+        if spec.admin_only and user.get('role') != ADMIN_ROLE:
+            return None, {'success': False, 'message': '权限不足，仅管理员可操作'}
+        return spec, None
+    
+    def submit_action(self, spec, data, client_socket):
+        """按读/写类型提交到对应线程池，返回 Future"""
+        executor = self.write_executor if spec.write else self.read_executor
+        return executor.submit(self.run_action, spec, data, client_socket)
+    
+    def run_action(self, spec, data, client_socket):
+        """执行处理函数并记录延迟，处理函数抛出的异常转换为失败响应
+        
+        响应在工作线程中编码（及压缩）为帧，不占用连接线程或事件循环。
+        """
+        # hello 会修改连接的编解码器，本响应仍按处理前的设置编码
+        codec, compress = client_socket.codec, client_socket.compression
+        start = time.perf_counter()
+        try:
+            key = data.get('idempotency_key') if spec.idempotent else None
+            if key is None:
+                response = spec.handler(self, data, client_socket)
+            else:
+                response = self.run_idempotent(spec, key, data, client_socket)
+        except Exception as e:
+            self.metrics.record(spec.name, time.perf_counter() - start, False)
+            print(f"处理请求 {spec.name} 时发生错误: {e}")
+            return {'success': False, 'message': f'服务器内部错误: {str(e)}'}
+        
+        # 返回帧说明命中了缓存，缓存中只存放成功的响应
+        success = isinstance(response, Frame) or response.get('success', True)
+        self.metrics.record(spec.name, time.perf_counter() - start, success)
+        if spec.invalidates_catalogue and success:
+            self.catalogue_cache.invalidate()
+        frame = self.build_frame(response, codec, compress, spec.name)
+        self.metrics.record_transfer(spec.name, frame.raw_size, len(frame) - HEADER_SIZE, frame.compressed)
+        return frame
+    
+    def run_idempotent(self, spec, key, data, client_socket):
+        """带幂等键执行处理函数：同一用户、同一动作的同一个键只执行一次，重复请求返回首次结果
+        
+        首次执行时的推送事件不会因重复请求再次发出。批量请求中的子请求不使用幂等键。
+        """
+        if not isinstance(key, str) or not 0 < len(key) <= 128:
+            return {'success': False, 'message': '幂等键格式错误'}
+        user = self.clients.get(client_socket) or {}
+        params = {name: value for name, value in data.items() if name != 'idempotency_key'}
+        fingerprint = json.dumps(params, sort_keys=True, default=str)
+        return self.idempotency.run((user.get('user_id'), spec.name, key), fingerprint,
+                                    lambda: spec.handler(self, data, client_socket), spec.timeout)
+    
+    def timeout_response(self, spec):
+        """动作超时（处理函数仍会在后台执行完毕）"""
+        self.metrics.record_timeout(spec.name)
+        return {'success': False, 'message': '请求处理超时，请稍后重试'}
+    
+    @actions.register('register', requires_login=False, write=True)
+    def handle_register(self, data, client_socket):
         """处理用户注册"""
         username = data.get('username')
         password = data.get('password')
@@ -143,6 +323,31 @@ class Server:
         result = self.db.register_user(username, password, contact)
         return result
     
+    @actions.register('bulk_register_users', admin_only=True, write=True, timeout=BATCH_TIMEOUT)
+    def handle_bulk_register_users(self, data, client_socket):
+        """处理批量注册用户（管理员功能，一个事务内插入，返回逐行结果和每秒行数）"""
+        users = data.get('users')
+        
+        if not isinstance(users, list) or not users:
+            return {'success': False, 'message': '用户列表不能为空'}
+        
+        return self.db.bulk_register_users(users)
+    
+    @actions.register('hello', requires_login=False, barrier=True)
+    def handle_hello(self, data, client_socket):
+        """处理连接握手 - 从客户端支持的编解码器中选定一个，并确认是否启用帧压缩和请求ID
+        
+        本响应仍按握手前的方式（JSON、不压缩、无请求ID）发送，之后该连接上的所有帧使用协商结果。
+        """
+        codec = negotiate(data.get('codecs'))
+        client_socket.codec = codec
+        client_socket.compression = COMPRESSION_ZLIB in (data.get('compression') or ())
+        client_socket.request_ids = bool(data.get('request_ids'))
+        return {'success': True, 'codec': codec.name,
+                'compression': COMPRESSION_ZLIB if client_socket.compression else None,
+                'request_ids': client_socket.request_ids}
+    
+    @actions.register('login', requires_login=False, barrier=True)
     def handle_login(self, data, client_socket):
         """处理用户登录"""
         username = data.get('username')
@@ -153,18 +358,116 @@ class Server:
         
         user = self.db.login_user(username, password)
         if user:
-            # 记录登录用户
-            self.clients[client_socket] = user
-            return {'success': True, 'user': user}
+            # 记录登录用户并签发会话令牌，断线重连后用 resume_session 恢复
+            session = self.sessions.create(user, client_socket)
+            self.clients[client_socket] = session.user
+            return {'success': True, 'user': user, 'session_token': session.token,
+                    'session_ttl': self.sessions.ttl}
         else:
             return {'success': False, 'message': '用户名或密码错误'}
     
-    def handle_get_all_goods(self):
-        """处理获取所有商品"""
-        goods = self.db.get_all_goods()
+    @actions.register('resume_session', requires_login=False, barrier=True)
+    def handle_resume_session(self, data, client_socket):
+        """处理恢复会话 - 重连后凭登录时的令牌恢复登录状态，只查内存会话表"""
+        session = self.sessions.resume(data.get('session_token'), client_socket)
+        if session is None:
+            self.clients.pop(client_socket, None)
+            return {'success': False, 'message': '会话已失效，请重新登录', 'session_expired': True}
+        self.clients[client_socket] = session.user
+        return {'success': True, 'user': dict(session.user)}
+    
+    @actions.register('logout', barrier=True)
+    def handle_logout(self, data, client_socket):
+        """处理退出登录 - 撤销会话令牌，该会话的其他连接也一并退出"""
+        for connection in self.sessions.revoke(client_socket) or [client_socket]:
+            self.clients.pop(connection, None)
+        return {'success': True, 'message': '已退出登录'}
+    
+    @actions.register('get_all_goods')
+    def handle_get_all_goods(self, data, client_socket):
+        """处理获取所有商品（优先返回缓存的帧，按连接的编解码器和是否压缩分别缓存）"""
+        codec, compress = client_socket.codec, client_socket.compression
+        return self.catalogue_cache.get_or_build(
+            (codec.name, compress, 'get_all_goods'),
+            lambda: self.build_frame({'success': True, 'goods': self.db.get_all_goods()},
+                                     codec, compress, 'get_all_goods'))
+    
+    @actions.register('get_goods_page')
+    def handle_get_goods_page(self, data, client_socket):
+        """处理分页获取在售商品（支持类别、价格区间、卖家筛选，按参数缓存已编码响应）"""
+        params = {
+            'cursor': data.get('cursor'),
+            'limit': data.get('limit') or GOODS_PAGE_SIZE,
+            'category': data.get('category'),
+            'min_price': data.get('min_price'),
+            'max_price': data.get('max_price'),
+            'seller_id': data.get('seller_id'),
+        }
+        codec, compress = client_socket.codec, client_socket.compression
+        key = (codec.name, compress, 'get_goods_page', json.dumps(params, sort_keys=True, default=str))
+        payload = self.catalogue_cache.get(key)
+        if payload is not None:
+            return payload
+        
+        version = self.catalogue_cache.version
+        try:
+            page = self.db.get_goods_page(**params)
+        except (KeyError, TypeError, ValueError):
+            return {'success': False, 'message': '分页参数错误'}
+        payload = self.build_frame({'success': True, 'goods': page['goods'],
+                                    'next_cursor': page['next_cursor'], 'version': page['version']},
+                                   codec, compress, 'get_goods_page')
+        self.catalogue_cache.put(key, payload, version)
+        return payload
+    
+    @actions.register('get_goods_changes')
+    def handle_get_goods_changes(self, data, client_socket):
+        """处理增量同步商品 - 返回版本号 since_version 之后新增/修改、售出和下架的商品"""
+        since_version = data.get('since_version')
+        
+        if since_version is None:
+            return {'success': False, 'message': '版本号不能为空'}
+        
+        try:
+            changes = self.db.get_goods_changes(since_version)
+        except (TypeError, ValueError):
+            return {'success': False, 'message': '版本号格式错误'}
+        return {'success': True, **changes}
+    
+    @actions.register('get_goods')
+    def handle_get_goods(self, data, client_socket):
+        """处理按ID获取单个商品"""
+        goods_id = data.get('goods_id')
+        
+        if not goods_id:
+            return {'success': False, 'message': '商品ID不能为空'}
+        
+        goods = self.db.get_goods_by_id(goods_id)
+        if not goods:
+            return {'success': False, 'message': '商品不存在'}
         return {'success': True, 'goods': goods}
     
-    def handle_add_goods(self, data):
+    @actions.register('search_goods')
+    def handle_search_goods(self, data, client_socket):
+        """处理全文搜索商品（按相关度排序，支持类别筛选和分页）"""
+        keyword = (data.get('keyword') or '').strip()
+        
+        if not keyword:
+            return {'success': False, 'message': '搜索关键词不能为空'}
+        
+        try:
+            result = self.db.search_goods(
+                keyword,
+                category=data.get('category'),
+                limit=data.get('limit') or GOODS_PAGE_SIZE,
+                offset=data.get('offset') or 0,
+            )
+        except (TypeError, ValueError):
+            return {'success': False, 'message': '分页参数错误'}
+        return {'success': True, 'goods': result['goods'], 'next_offset': result['next_offset']}
+    
+    @actions.register('add_goods', write=True, invalidates_catalogue=True, idempotent=True)
+    def handle_add_goods(self, data, client_socket):
         """处理添加商品"""
         name = data.get('name')
         category = data.get('category')
@@ -176,9 +479,27 @@ class Server:
             return {'success': False, 'message': '商品信息不完整'}
         
         result = self.db.add_goods(name, category, price, description, seller_id)
+        if result['success']:
+            self.push_event(EVENT_GOODS_ADDED, {'goods_id': result['goods_id']})
         return result
     
-    def handle_get_user_goods(self, data):
+    @actions.register('bulk_add_goods', write=True, timeout=BATCH_TIMEOUT, invalidates_catalogue=True)
+    def handle_bulk_add_goods(self, data, client_socket):
+        """处理批量发布商品（一个事务内插入，返回逐行结果和每秒行数）"""
+        items = data.get('goods')
+        
+        if not isinstance(items, list) or not items:
+            return {'success': False, 'message': '商品列表不能为空'}
+        
+        result = self.db.bulk_add_goods(items)
+        if result['success'] and result['inserted']:
+            # 整批只推送一个事件，客户端收到后做一次增量同步
+            goods_ids = [row['goods_id'] for row in result['results'] if 'goods_id' in row]
+            self.push_event(EVENT_GOODS_ADDED, {'goods_ids': goods_ids})
+        return result
+    
+    @actions.register('get_user_goods')
+    def handle_get_user_goods(self, data, client_socket):
         """处理获取用户商品"""
         user_id = data.get('user_id')
         
@@ -188,7 +509,8 @@ class Server:
         goods = self.db.get_user_goods(user_id)
         return {'success': True, 'goods': goods}
     
-    def handle_create_order(self, data):
+    @actions.register('create_order', write=True, invalidates_catalogue=True)
+    def handle_create_order(self, data, client_socket):
         """处理创建订单"""
         goods_id = data.get('goods_id')
         buyer_id = data.get('buyer_id')
@@ -199,9 +521,12 @@ class Server:
             return {'success': False, 'message': '订单信息不完整'}
         
         result = self.db.create_order(goods_id, buyer_id, seller_id, price)
+        if result['success']:
+            self.push_event(EVENT_GOODS_SOLD, {'goods_id': goods_id})
         return result
     
-    def handle_get_user_orders(self, data):
+    @actions.register('get_user_orders')
+    def handle_get_user_orders(self, data, client_socket):
         """处理获取用户订单"""
         user_id = data.get('user_id')
         
@@ -211,12 +536,14 @@ class Server:
         orders = self.db.get_user_orders(user_id)
         return {'success': True, 'orders': orders}
     
-    def handle_get_all_users(self, data):
+    @actions.register('get_all_users', admin_only=True)
+    def handle_get_all_users(self, data, client_socket):
         """处理获取所有用户（管理员功能）"""
         users = self.db.get_all_users()
         return {'success': True, 'users': users}
     
-    def handle_update_goods_status(self, data):
+    @actions.register('update_goods_status', admin_only=True, write=True, invalidates_catalogue=True)
+    def handle_update_goods_status(self, data, client_socket):
         """处理更新商品状态"""
         goods_id = data.get('goods_id')
         status = data.get('status')
@@ -225,9 +552,12 @@ class Server:
             return {'success': False, 'message': '商品ID和状态不能为空'}
         
         self.db.update_goods_status(goods_id, status)
+        event = {'available': EVENT_GOODS_ADDED, 'sold': EVENT_GOODS_SOLD}.get(status, EVENT_GOODS_REMOVED)
+        self.push_event(event, {'goods_id': goods_id})
         return {'success': True}
     
-    def handle_recharge_balance(self, data):
+    @actions.register('recharge_balance', write=True, idempotent=True)
+    def handle_recharge_balance(self, data, client_socket):
         """处理用户充值"""
         user_id = data.get('user_id')
         amount = data.get('amount')
@@ -236,9 +566,12 @@ class Server:
             return {'success': False, 'message': '用户ID和充值金额不能为空'}
         
         result = self.db.recharge_balance(user_id, amount)
+        if result['success']:
+            self.push_balance(user_id, result['balance'])
         return result
     
-    def handle_purchase_goods(self, data):
+    @actions.register('purchase_goods', write=True, invalidates_catalogue=True, idempotent=True)
+    def handle_purchase_goods(self, data, client_socket):
         """处理购买商品"""
         goods_id = data.get('goods_id')
         buyer_id = data.get('buyer_id')
@@ -246,26 +579,16 @@ class Server:
         if not goods_id or not buyer_id:
             return {'success': False, 'message': '商品ID和买家ID不能为空'}
         
-        # 获取商品信息
-        goods_list = self.db.get_all_goods()
-        target_goods = None
-        for goods in goods_list:
-            if goods['goods_id'] == goods_id:
-                target_goods = goods
-                break
-        
-        if not target_goods:
-            return {'success': False, 'message': '商品不存在'}
-        
-        result = self.db.purchase_goods(
-            goods_id, 
-            buyer_id, 
-            target_goods['seller_id'], 
-            target_goods['price']
-        )
+        # 卖家和价格在购买事务内按主键读取
+        result = self.db.purchase_goods(goods_id, buyer_id)
+        if result['success']:
+            self.push_balance(buyer_id, result['new_balance'])
+            self.push_balance(result['seller_id'], result['seller_balance'])
+            self.push_event(EVENT_GOODS_SOLD, {'goods_id': goods_id})
         return result
     
-    def handle_get_user_balance(self, data):
+    @actions.register('get_user_balance')
+    def handle_get_user_balance(self, data, client_socket):
         """处理获取用户余额"""
         user_id = data.get('user_id')
         
@@ -275,7 +598,8 @@ class Server:
         balance = self.db.get_user_balance(user_id)
         return {'success': True, 'balance': balance}
     
-    def handle_remove_goods(self, data):
+    @actions.register('remove_goods', write=True, invalidates_catalogue=True)
+    def handle_remove_goods(self, data, client_socket):
         """处理下架商品"""
         goods_id = data.get('goods_id')
         
@@ -283,57 +607,227 @@ class Server:
             return {'success': False, 'message': '商品ID不能为空'}
         
         result = self.db.remove_goods(goods_id)
+        if result['success']:
+            self.push_event(EVENT_GOODS_REMOVED, {'goods_id': goods_id})
         return result
     
-    def handle_delete_user(self, data):
+    @actions.register('delete_user', admin_only=True, write=True, invalidates_catalogue=True)
+    def handle_delete_user(self, data, client_socket):
         """处理删除用户"""
         user_id = data.get('user_id')
         
         if not user_id:
             return {'success': False, 'message': '用户ID不能为空'}
         
-        # 检查用户是否在线，如果在线则强制断开连接
-        online_sockets = []
-        for client_socket, user_info in self.clients.items():
-            if user_info and user_info.get('user_id') == user_id:
-                online_sockets.append(client_socket)
-        
         # 删除用户
         result = self.db.delete_user(user_id)
         
-        # 如果删除成功且用户在线，发送强制退出通知
-        if result['success'] and online_sockets:
-            for client_socket in online_sockets:
-                try:
-                    force_logout_response = {
-                        'success': False, 
-                        'message': '您的账户已被管理员删除，即将强制退出',
-                        'force_logout': True
-                    }
-                    response_data = serialize_data(force_logout_response)
-                    client_socket.send(response_data.encode('utf-8'))
-                except Exception as e:
-                    print(f"发送强制退出通知失败: {e}")
+        if result['success']:
+            # 通知在线的被删用户强制退出，并撤销其连接的登录状态
+            self.push_event(EVENT_FORCE_LOGOUT, {'message': '您的账户已被管理员删除，即将强制退出'},
+                            user_id=user_id)
+            for connection in self.sessions.revoke_user(user_id):
+                self.clients.pop(connection, None)
+            self.push_event(EVENT_GOODS_REMOVED, {'seller_id': user_id})
         
         return result
     
-    def handle_get_all_orders(self, data):
+    @actions.register('get_all_orders', admin_only=True)
+    def handle_get_all_orders(self, data, client_socket):
         """处理获取所有订单（管理员功能）"""
         orders = self.db.get_all_orders()
         return {'success': True, 'orders': orders}
     
-    def handle_get_goods_category_stats(self):
+    @actions.register('get_goods_category_stats', admin_only=True)
+    def handle_get_goods_category_stats(self, data, client_socket):
         stats = self.db.get_goods_category_stats()
         return {'success': True, 'stats': stats}
 
-    def handle_get_daily_sales_stats(self):
+    @actions.register('check_category_stats', admin_only=True, write=True)
+    def handle_check_category_stats(self, data, client_socket):
+        """处理类别计数一致性检查（管理员功能），repair=True 时重建有偏差的计数"""
+        return self.db.check_category_counts(repair=bool(data.get('repair')))
+
+    @actions.register('get_system_summary', admin_only=True)
+    def handle_get_system_summary(self, data, client_socket):
+        """处理获取系统概况（用户/商品/订单数量和交易额），读计数表并短时缓存已编码响应"""
+        codec, compress = client_socket.codec, client_socket.compression
+        return self.summary_cache.get_or_build(
+            (codec.name, compress),
+            lambda: self.build_frame({'success': True, 'summary': self.db.get_system_statistics()},
+                                     codec, compress, 'get_system_summary'))
+    
+    @actions.register('get_daily_sales_stats', admin_only=True)
+    def handle_get_daily_sales_stats(self, data, client_socket):
         stats = self.db.get_daily_sales_stats()
         return {'success': True, 'stats': stats}
+
+    @actions.register('get_sales_stats', admin_only=True)
+    def handle_get_sales_stats(self, data, client_socket):
+        """处理按时间范围和粒度（day/week/month）的销售统计，默认最近7天按日"""
+        end = data.get('end') or datetime.date.today().isoformat()
+        start = data.get('start')
+        if not start:
+            try:
+                start = (datetime.date.fromisoformat(end) - datetime.timedelta(days=6)).isoformat()
+            except (TypeError, ValueError):
+                return {'success': False, 'message': '日期格式应为 YYYY-MM-DD'}
+        return self.db.get_sales_stats(start, end, data.get('granularity', 'day'))
+    
+    @actions.register('batch', write=True, timeout=BATCH_TIMEOUT)
+    def handle_batch(self, data, client_socket):
+        """处理批量请求 - 按顺序执行子请求 [{'action', 'data'}, ...]，返回各自的结果
+        
+        子请求与单独发送时一样做登录/权限校验。transactional=True 时所有子请求共用
+        一个数据库事务，任一失败即停止并整体回滚，期间的推送事件只在提交后发出。
+        """
+        requests = data.get('requests')
+        transactional = bool(data.get('transactional'))
+        
+        if not isinstance(requests, list) or not requests:
+            return {'success': False, 'message': '批量请求不能为空'}
+        if len(requests) > BATCH_MAX_REQUESTS:
+            return {'success': False, 'message': f'批量请求最多包含 {BATCH_MAX_REQUESTS} 个子请求'}
+        
+        if not transactional:
+            results = [self.run_batch_item(item, client_socket) for item in requests]
+            failed = sum(1 for result in results if not result.get('success'))
+            return {'success': True, 'results': results,
+                    'succeeded': len(results) - failed, 'failed': failed}
+        
+        results = []
+        touched_catalogue = False
+        self._deferred_events.events = []
+        try:
+            # 事务内读到的数据可能回滚，不读写商品目录缓存
+            with self.catalogue_cache.bypass(), self.db.transaction() as txn:
+                for index, item in enumerate(requests):
+                    spec = actions.get(item.get('action')) if isinstance(item, dict) else None
+                    touched_catalogue = touched_catalogue or (spec is not None and spec.invalidates_catalogue)
+                    result = self.run_batch_item(item, client_socket, invalidate=False)
+                    results.append(result)
+                    if not result.get('success') or txn.failed:
+                        txn.failed = True
+                        break
+        except Exception as e:
+            print(f"批量事务执行失败: {e}")
+            return {'success': False, 'message': f'批量请求失败，已全部回滚: {str(e)}',
+                    'results': results, 'rolled_back': True}
+        finally:
+            events, self._deferred_events.events = self._deferred_events.events, None
+        
+        if txn.failed:
+            message = results[-1].get('message') if results else ''
+            return {'success': False, 'message': f'第 {len(results)} 个子请求失败，已全部回滚: {message}',
+                    'results': results, 'failed_index': len(results) - 1, 'rolled_back': True}
+        if touched_catalogue:
+            self.catalogue_cache.invalidate()
+        for push in events:
+            push()
+        return {'success': True, 'results': results, 'succeeded': len(results), 'failed': 0}
+    
+    def run_batch_item(self, item, client_socket, invalidate=True):
+        """在当前线程执行一个批量子请求，返回响应字典"""
+        if not isinstance(item, dict):
+            return {'success': False, 'message': '子请求格式错误'}
+        spec, error = self.resolve_action(item, client_socket)
+        if error:
+            return error
+        if spec.barrier or spec.name == 'batch':
+            return {'success': False, 'message': f'批量请求中不支持 {spec.name}'}
+        
+        start = time.perf_counter()
+        try:
+            response = spec.handler(self, item.get('data') or {}, client_socket)
+        except Exception as e:
+            self.metrics.record(spec.name, time.perf_counter() - start, False)
+            print(f"处理批量子请求 {spec.name} 时发生错误: {e}")
+            return {'success': False, 'message': f'服务器内部错误: {str(e)}'}
+        
+        if isinstance(response, Frame):
+            # 命中了商品目录缓存，批量结果需要嵌入响应字典
+            response = self.decode_frame(response, client_socket.codec)
+        success = response.get('success', True)
+        self.metrics.record(spec.name, time.perf_counter() - start, success)
+        if invalidate and spec.invalidates_catalogue and success:
+            self.catalogue_cache.invalidate()
+        return response
+    
+    @staticmethod
+    def decode_frame(frame, codec):
+        """把已编码的响应帧还原为字典"""
+        payload = bytes(frame[HEADER_SIZE:])
+        return codec.decode(decompress_payload(payload) if frame.compressed else payload)
+    
+    @actions.register('get_server_stats', admin_only=True)
+    def handle_get_server_stats(self, data, client_socket):
+        """处理获取服务器运行统计（连接池、商品目录缓存、各动作调用次数与延迟直方图）"""
+        return {'success': True, 'stats': {
+            'db_pool': self.db.get_pool_stats(),
+            'timestamp_migration': self.db.get_migration_stats(),
+            'catalogue_cache': self.catalogue_cache.stats(),
+            'summary_cache': self.summary_cache.stats(),
+            'sessions': self.sessions.stats(),
+            'idempotency': self.idempotency.stats(),
+            'actions': self.metrics.snapshot(),
+        }}
+    
+    # =================== 事件推送 ===================
+    
+    def push_event(self, event, data, user_id=None):
+        """向已登录客户端推送事件帧；指定 user_id 时只推送给该用户的连接
+        
+        每种编码设置只编码一次；推送失败（连接已断开）不影响当前请求。
+        批量事务执行中推送的事件先暂存，提交后由 handle_batch 发出。
+        """
+        if self.defer_push(self.push_event, event, data, user_id):
+            return
+        
+        message = make_event(event, data)
+        frames = {}
+        if user_id is None:
+            connections = [connection for connection, user in list(self.clients.items()) if user]
+        else:
+            connections = self.sessions.connections(user_id)
+        for connection in connections:
+            key = (connection.codec.name, connection.compression, connection.request_ids)
+            if key not in frames:
+                frame = self.build_frame(message, connection.codec, connection.compression)
+                if connection.request_ids:
+                    frame = attach_request_id(frame, EVENT_REQUEST_ID)
+                frames[key] = frame
+            try:
+                connection.send(frames[key])
+            except Exception as e:
+                print(f"推送事件 {event} 失败: {e}")
+    
+    def push_balance(self, user_id, balance):
+        """推送余额变化给该用户（同时更新会话中缓存的余额，批量事务中提交后才更新）"""
+        if self.defer_push(self.push_balance, user_id, balance):
+            return
+        self.sessions.update_user(user_id, balance=balance)
+        self.push_event(EVENT_BALANCE_CHANGED, {'user_id': user_id, 'balance': balance}, user_id=user_id)
+    
+    def defer_push(self, func, *args):
+        """当前线程正在执行批量事务时暂存推送，返回 True；事务回滚后暂存的推送被丢弃"""
+        deferred = getattr(self._deferred_events, 'events', None)
+        if deferred is None:
+            return False
+        deferred.append(partial(func, *args))
+        return True
     
     def stop(self):
         """停止服务器"""
         self.running = False
         self.server.close()
+        self.shutdown_workers()
+    
+    def shutdown_workers(self):
+        """关闭读/写线程池、超时监视线程和数据库连接池"""
+        self.timeouts.close()
+        self.read_executor.shutdown(wait=False)
+        self.write_executor.shutdown(wait=False)
+        self.db.close()
 
 if __name__ == "__main__":
     server = Server()
@@ -0,0 +1,171 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from common.config import SESSION_TTL
+
+
+def _user_key(user_id):
+    """会话按数据库中的整数 user_id 索引；请求参数中的 ID 可能是字符串，无法转换时返回 None"""
+    try:
+        return int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+
+class Session:
+    """一个登录会话 - 令牌对应的用户信息及当前附着的连接"""
+
+    __slots__ = ('token', 'user', 'expires_at', 'connections')
+
+    def __init__(self, token, user, expires_at):
+        self.token = token
+        self.user = user
+        self.expires_at = expires_at
+        self.connections = set()
+
+
+class SessionStore:
+    """内存会话表 - 登录时签发令牌，断线重连后凭令牌恢复登录状态，不再查询用户表
+
+    按令牌和按 user_id 各建一个索引：恢复会话、删除用户时撤销其全部会话、向某个用户
+    推送事件都只查索引，不遍历所有连接。
+
+    会话有连接附着时不会过期；最后一个连接断开后 ttl 秒内可以恢复，过期会话在
+    创建新会话时顺带清理。只有没有连接附着的会话才进入空闲队列（按断开先后即过期
+    先后排序），清理只检查队头，不遍历在线会话。
+    """
+
+    def __init__(self, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._by_token = {}             # token -> Session
+        self._idle = OrderedDict()      # token -> Session，没有连接附着的会话，按过期先后排序
+        self._by_user = {}              # user_id -> {token, ...}
+        self._by_connection = {}        # 连接 -> Session
+        self._created = 0
+        self._resumed = 0
+        self._rejected = 0
+        self._expired = 0
+        self._revoked = 0
+
+    def create(self, user, connection):
+        """为登录成功的用户签发新会话并附着到连接，返回 Session"""
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._purge_expired()
+            self._detach(connection)
+            session = Session(token, user, time.monotonic() + self.ttl)
+            self._by_token[token] = session
+            self._by_user.setdefault(user['user_id'], set()).add(token)
+            self._attach(session, connection)
+            self._created += 1
+        return session
+
+    def resume(self, token, connection):
+        """凭令牌把会话附着到（重连后的）连接，令牌无效或已过期返回 None"""
+        with self._lock:
+            session = self._by_token.get(token) if isinstance(token, str) else None
+            if session is not None and not session.connections and time.monotonic() >= session.expires_at:
+                self._remove(session)
+                self._expired += 1
+                session = None
+            if session is None:
+                self._rejected += 1
+                return None
+            self._detach(connection)
+            self._attach(session, connection)
+            self._resumed += 1
+        return session
+
+    def detach(self, connection):
+        """连接断开：会话保留，从此刻起 ttl 秒内可恢复"""
+        with self._lock:
+            self._detach(connection)
+
+    def get(self, connection):
+        """连接当前附着的会话，未登录返回 None"""
+        return self._by_connection.get(connection)
+
+    def revoke(self, connection):
+        """主动退出：撤销连接所附着的会话，返回该会话的全部连接"""
+        with self._lock:
+            session = self._by_connection.get(connection)
+            if session is None:
+                return []
+            self._revoked += 1
+            return self._remove(session)
+
+    def revoke_user(self, user_id):
+        """撤销某个用户的全部会话（如用户被删除），返回这些会话的连接"""
+        with self._lock:
+            connections = []
+            for token in list(self._by_user.get(_user_key(user_id), ())):
+                connections.extend(self._remove(self._by_token[token]))
+                self._revoked += 1
+            return connections
+
+    def connections(self, user_id):
+        """某个用户当前在线的全部连接"""
+        with self._lock:
+            return [connection for token in self._by_user.get(_user_key(user_id), ())
+                    for connection in self._by_token[token].connections]
+
+    def update_user(self, user_id, **fields):
+        """更新该用户各会话中缓存的用户信息（如余额），恢复会话时返回的是最新值"""
+        with self._lock:
+            for token in self._by_user.get(_user_key(user_id), ()):
+                self._by_token[token].user.update(fields)
+
+    def _attach(self, session, connection):
+        self._idle.pop(session.token, None)
+        session.connections.add(connection)
+        self._by_connection[connection] = session
+
+    def _detach(self, connection):
+        session = self._by_connection.pop(connection, None)
+        if session is not None:
+            session.connections.discard(connection)
+            if not session.connections:
+                session.expires_at = time.monotonic() + self.ttl
+                self._idle[session.token] = session
+
+    def _remove(self, session):
+        """从各索引中删除会话，返回其连接"""
+        del self._by_token[session.token]
+        self._idle.pop(session.token, None)
+        tokens = self._by_user.get(session.user['user_id'])
+        if tokens is not None:
+            tokens.discard(session.token)
+            if not tokens:
+                del self._by_user[session.user['user_id']]
+        connections = list(session.connections)
+        for connection in connections:
+            self._by_connection.pop(connection, None)
+        session.connections.clear()
+        return connections
+
+    def _purge_expired(self):
+        """从空闲队列队头清理已过期的会话"""
+        now = time.monotonic()
+        while self._idle:
+            session = next(iter(self._idle.values()))
+            if now < session.expires_at:
+                break
+            self._remove(session)
+            self._expired += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions': len(self._by_token),
+                'idle': len(self._idle),
+                'users': len(self._by_user),
+                'connections': len(self._by_connection),
+                'created': self._created,
+                'resumed': self._resumed,
+                'rejected': self._rejected,
+                'expired': self._expired,
+                'revoked': self._revoked,
+                'ttl': self.ttl,
+            }
@@ -3,23 +3,39 @@
 
 """
 启动服务器脚本
+
+用法：python start_server.py [--engine thread|asyncio] [--backlog N]
 """
 
 import sys
 import os
+import argparse
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 if __name__ == "__main__":
-    from server.server import Server
+    from common.config import SERVER_HOST, SERVER_PORT, SERVER_ENGINE, SERVER_BACKLOG
+
+    parser = argparse.ArgumentParser(description="校园二手交易平台 - 服务器")
+    parser.add_argument('--engine', choices=['thread', 'asyncio'], default=SERVER_ENGINE,
+                        help="服务器引擎：thread（每连接一个线程）或 asyncio（事件循环）")
+    parser.add_argument('--backlog', type=int, default=SERVER_BACKLOG,
+                        help="listen() 等待队列长度")
+    args = parser.parse_args()
+
+    if args.engine == 'asyncio':
+        from server.async_server import AsyncServer as Server
+    else:
+        from server.server import Server
     print("校园二手交易平台 - 服务器启动")
     print("=" * 40)
-    print("服务器地址: localhost:8888")
+    print(f"服务器地址: {SERVER_HOST}:{SERVER_PORT}")
+    print(f"服务器引擎: {args.engine}")
     print("按 Ctrl+C 停止服务器")
     print("=" * 40)
     
-    server = Server()
+    server = Server(backlog=args.backlog)
     try:
         server.start()
     except KeyboardInterrupt: